@@ -1,5 +1,6 @@
 
-YOLOAD R2, 10(R0)
-YOLOAD R3, 20(R0)
-YELLVAL R4
+YOLOAD R1, 10(R0)
+YOLOAD R2, 20(R0)
+ADD R1, R1, R2
+YELLVAL R1
 HALT
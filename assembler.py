@@ -1,137 +1,267 @@
 import sys
 import os
 import re
+from collections import namedtuple
 
-op_codes = {
-    "YOLOAD": "0001",
-    "ADD": "0010",
-    "GREATERTHAN": "0011",
-    "YEET": "0100",
-    "YOLO": "0101",
-    "SAMEBRO": "0110",
-    "MODULOIZE": "0111",
-    "INCREMENT": "1000",
-    "YELLSTR": "1001",
-    "YELLVAL": "1010",
-    "HALT": "1111",
-    "NOTGREATEROREQUAL": "1100"
-}
+from isa import ENCODINGS, ESCAPES, INSTRUCTIONS, NARROW, WIDE
+from debuginfo import write_debug_info
+from ir import Op, format_instruction, parse_operands, register_from_name, register_name
+from mcimage import text_from_word, write_image
+
+op_codes = {instruction.name: f"{instruction.opcode:04b}" for instruction in INSTRUCTIONS}
 
 registers = {f"R{i}": f"{i:03b}" for i in range(8)}
 
-def assemble(asm_file: str, outfile_path: str, op_codes, registers):
+# (kind, shift) of each operand field, in source order, per encoding version
+# (see isa.FORMATS).
+FIELDS = {
+    encoding.version: {
+        instruction.name: tuple((field.kind, field.shift) for field in encoding.formats[instruction.format])
+        for instruction in INSTRUCTIONS
+    }
+    for encoding in ENCODINGS.values()
+}
+ESCAPE_RE = re.compile(r"\\(.)")
+
+
+def unescape(literal):
+    """Decode the C-style escapes of a .STRING literal."""
+    return ESCAPE_RE.sub(lambda match: ESCAPES.get(match.group(1), match.group(0)), literal)
+
+
+# What assemble_source() produces. `words` are left-aligned instruction
+# words, `strings` the string table in definition order and `labels` maps
+# each label to its byte address. `errors` holds one message per problem
+# found, in source order; the program is unusable if there are any. The
+# rest are the records for debuginfo.write_debug_info(); `instruction_lines`
+# is only filled in when asked for.
+Assembly = namedtuple(
+    "Assembly",
+    "words strings labels errors label_lines string_lines instruction_lines line_count trailing_newline",
+)
+
+
+def assemble_source(source, encoding=NARROW, debug=False, op_codes=op_codes, registers=registers):
+    """Assemble in one pass over `source`, in memory.
+
+    `source` is the assembly text or any iterable of its lines. Every line
+    is parsed once, with ir.parse_operands() as ir.parse_instruction()
+    parses it, and encoded straight into an integer word. References to
+    labels and strings not yet defined are recorded as fix-ups and patched
+    in once the whole source has been read. `encoding` is an isa encoding;
+    isa.WIDE lifts the immediate and branch range limits of the default
+    narrow one. With `debug`, the records for a debuginfo sidecar are kept too.
+    """
+    if isinstance(source, str):
+        source = source.splitlines(True)
+    opcode_values = {Op[name]: int(bits, 2) << 28 for name, bits in op_codes.items() if name in Op.__members__}
+    register_values = {register_from_name(name): int(bits, 2) for name, bits in registers.items()}
+    instruction_fields = {op: FIELDS[encoding.version][op.name] for op in Op}
+    immediate_max = (1 << encoding.immediate.bits) - 1
+    address_max = (1 << encoding.address.bits) - 1
     labels = {}
     string_table = {}
-    instructions = []
-    address = 0
-    machine_code = []
+    string_index = {}
+    words = []
+    errors = []
+    label_fixups = []
+    string_fixups = []
+    label_lines = []
+    string_lines = []
+    instruction_lines = []
+    line_number = 0
+    raw_line = "\n"
 
-    # First Pass: Collect labels and string literals
-    try:
-        with open(asm_file, "r") as infile:
-            for line_num, line in enumerate(infile):
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split()
-                if not parts:
-                    continue
-
-                op_code = parts[0]
-
-                if op_code.endswith(":"):
-                    label = op_code[:-1]
-                    labels[label] = address
-                elif op_code.startswith(".STRING"):
-                    label = parts[0]
-                    literal = " ".join(parts[1:]).strip().strip('"')
-                    string_table[label] = literal
-                else:
-                    instructions.append(line)
-                    address += 2 # Assume each instruction is 2 bytes
+    for line_number, raw_line in enumerate(source, 1):
+        line = raw_line.strip()
+        if not line:
+            continue
 
-    except FileNotFoundError:
-        print(f"Error: Input file '{asm_file}' not found.")
-        return
+        label, colon, rest = line.partition(":")
+        if colon and " " not in label and "," not in label:
+            rest = rest.strip()
+            if rest.startswith(".STRING"):
+                literal = rest[len(".STRING"):].strip()
+                string_lines.append((label, literal, line_number))
+                if len(literal) >= 2 and literal[0] == literal[-1] == '"':
+                    literal = literal[1:-1]
+                string_index.setdefault(label, len(string_index))
+                string_table[label] = unescape(literal)
+                continue
+            if label in labels:
+                errors.append(f"Label '{label}' defined more than once")
+            else:
+                labels[label] = len(words) * 2  # Each instruction is 2 bytes
+                label_lines.append((len(words), label, line_number))
+            if not rest:
+                continue
+            line = rest
+
+        try:
+            op, regs, value, symbol = parse_operands(line)
+        except ValueError as e:
+            errors.append(str(e))
+            continue
+        if op not in opcode_values:
+            errors.append(f"Unknown instruction in line: {line}")
+            continue
 
-    # Second Pass: Assemble instructions
-    for instruction in instructions:
-        parts = instruction.split()
-        op_code = parts[0]
-        binary_instruction = ""
-
-        if op_code in op_codes:
-            binary_instruction += op_codes[op_code]
-
-            if op_code == "YOLOAD":
-                match = re.match(r"YOLOAD\s+(R\d+),\s*(\d+)\(R0\)", instruction)
-                if match:
-                    dest_reg_str = match.group(1)
-                    immediate_str = match.group(2)
-                    dest_reg_bin = registers.get(dest_reg_str)
-                    try:
-                        immediate = int(immediate_str)
-                        binary_instruction += dest_reg_bin + "000" + f"{immediate:06b}"
-                    except ValueError:
-                        print(f"Error: Invalid immediate value '{immediate_str}' in line: {instruction}")
-                        continue
+        word = opcode_values[op]
+        regs = iter(regs)
+        try:
+            for kind, shift in instruction_fields[op]:
+                if kind == "reg":
+                    word |= register_values[next(regs)] << shift
+                elif kind == "imm":
+                    if value > immediate_max:
+                        raise ValueError(f"Invalid immediate value '{value}(R0)'")
+                    word |= value << shift
+                elif kind == "label":
+                    label_fixups.append((len(words), symbol, line))
                 else:
-                    print(f"Error: Invalid YOLOAD format in line: {instruction}")
-                    continue
+                    string_fixups.append((len(words), symbol, line))
+        except KeyError as e:
+            errors.append(f"Unknown register '{register_name(e.args[0])}' in line: {line}")
+            continue
+        except ValueError as e:
+            errors.append(f"{e} in line: {line}")
+            continue
+        words.append(word)
+        if debug:
+            instruction_lines.append((line_number, symbol))
 
-            elif op_code == "ADD":
-                dest_reg_str, src1_reg_str, src2_reg_str = [reg.replace(",", "").strip() for reg in parts[1:]]
-                binary_instruction += registers.get(dest_reg_str) + registers.get(src1_reg_str) + registers.get(src2_reg_str) + "000"
+    for index, label, line in label_fixups:
+        address = labels.get(label)
+        if address is None:
+            errors.append(f"Undefined label '{label}' in line: {line}")
+        elif address > address_max:
+            errors.append(f"Label '{label}' at address {address} is out of branch range in line: {line}")
+        else:
+            words[index] |= address << encoding.address.shift
+    for index, label, line in string_fixups:
+        if label in string_index:
+            words[index] |= string_index[label] << encoding.string.shift
+        else:
+            errors.append(f"Undefined string '{label}' in line: {line}")
 
-            elif op_code == "GREATERTHAN":
-                reg1_str, reg2_str, label = [part.replace(",", "").strip() for part in parts[1:]]
-                binary_instruction += registers.get(reg1_str) + registers.get(reg2_str) + f"{labels.get(label, 0):010b}"
+    return Assembly(words, list(string_table.values()), labels, errors, label_lines, string_lines,
+                    instruction_lines, line_number, raw_line.endswith("\n"))
 
-            elif op_code in ["YEET", "YOLO"]:
-                label = parts[1].strip()
-                binary_instruction += "000" + "000" + f"{labels.get(label, 0):010b}"
 
-            elif op_code == "SAMEBRO":
-                reg1_str, reg2_str, label = [part.replace(",", "").strip() for part in parts[1:]]
-                binary_instruction += registers.get(reg1_str) + registers.get(reg2_str) + f"{labels.get(label, 0):010b}"
+def assemble_program(program, encoding=NARROW):
+    """Encode an ir.AsmProgram straight into an Assembly, with no text to parse.
 
-            elif op_code == "MODULOIZE":
-                dest_reg_str, src_reg_str, mod_reg_str = [reg.replace(",", "").strip() for reg in parts[1:]]
-                binary_instruction += registers.get(dest_reg_str) + registers.get(src_reg_str) + registers.get(mod_reg_str) + "000"
+    The labels are laid out first, so every branch is encoded in a single
+    pass over the instructions. Errors read as assemble_source() reports
+    them for the same program written out as text.
+    """
+    fields = {op: FIELDS[encoding.version][op.name] for op in Op}
+    immediate_max = (1 << encoding.immediate.bits) - 1
+    address_max = (1 << encoding.address.bits) - 1
+    string_index = {name: index for index, name in enumerate(program.strings)}
+    errors = []
+    labels = {}
+    address = 0
+    for instruction in program.instructions:
+        if instruction.op is not None:
+            address += 2  # Each instruction is 2 bytes
+        elif instruction.symbol in labels:
+            errors.append(f"Label '{instruction.symbol}' defined more than once")
+        else:
+            labels[instruction.symbol] = address
 
-            elif op_code == "INCREMENT":
-                reg_str = parts[1].strip()
-                binary_instruction += registers.get(reg_str) + "00000000000"
+    words = []
+    for instruction in program.instructions:
+        if instruction.op is None:
+            continue
+        word = instruction.op << 28
+        regs = iter(instruction.regs)
+        for kind, shift in fields[instruction.op]:
+            if kind == "reg":
+                reg = next(regs)
+                if reg >= len(registers):
+                    errors.append(f"Unknown register '{register_name(reg)}' in line: {format_instruction(instruction)}")
+                word |= (reg & 7) << shift
+            elif kind == "imm":
+                if not 0 <= instruction.value <= immediate_max:
+                    errors.append(f"Invalid immediate value '{instruction.value}(R0)' in line: "
+                                  f"{format_instruction(instruction)}")
+                word |= (instruction.value & immediate_max) << shift
+            elif kind == "label":
+                address = labels.get(instruction.symbol)
+                if address is None:
+                    errors.append(f"Undefined label '{instruction.symbol}' in line: {format_instruction(instruction)}")
+                elif address > address_max:
+                    errors.append(f"Label '{instruction.symbol}' at address {address} is out of branch range "
+                                  f"in line: {format_instruction(instruction)}")
+                else:
+                    word |= address << shift
+            elif instruction.symbol in string_index:
+                word |= string_index[instruction.symbol] << shift
+            else:
+                errors.append(f"Undefined string '{instruction.symbol}' in line: {format_instruction(instruction)}")
+        words.append(word)
 
-            elif op_code == "YELLSTR":
-                label = parts[1].strip()
-                string_index = list(string_table.keys()).index(label) if label in string_table else 0
-                binary_instruction += "000" + "000" + f"{string_index:010b}"
+    strings = [unescape(text) for text in program.strings.values()]
+    return Assembly(words, strings, labels, errors, [], [], [], 0, True)
 
-            elif op_code == "YELLVAL":
-                reg_str = parts[1].strip()
-                binary_instruction += registers.get(reg_str) + "00000000000"
 
-            elif op_code == "HALT":
-                binary_instruction += "0000000000000000"
+def assemble(asm_file: str, outfile_path: str, op_codes, registers, symbol_file=None, debug_file=None,
+             encoding=NARROW):
+    """Assemble `asm_file` into `outfile_path` with assemble_source().
 
-            elif op_code == "NOTGREATEROREQUAL":
-                reg1_str, reg2_str, label = [part.replace(",", "").strip() for part in parts[1:]]
-                binary_instruction += registers.get(reg1_str) + registers.get(reg2_str) + f"{labels.get(label, 0):010b}"
+    Problems are printed as "Error: ..." lines. With a `symbol_file`, the
+    labels are also written out as a symbol map, one "<byte address> <label>"
+    line each, for the profiler. With a `debug_file`, a debuginfo sidecar
+    records labels, string definitions, operand names and source lines so
+    the disassembly can be exact.
+    """
+    try:
+        infile = open(asm_file, "r")
+    except FileNotFoundError:
+        print(f"Error: Input file '{asm_file}' not found.")
+        return
 
-            if binary_instruction:
-                machine_code.append(binary_instruction)
+    with infile:
+        result = assemble_source(infile, encoding, debug_file is not None, op_codes, registers)
+    for message in result.errors:
+        print(f"Error: {message}")
 
     try:
-        with open(outfile_path, "w") as outfile:
-            for code in machine_code:
-                outfile.write(code + "\n")
+        if outfile_path.endswith(".bin"):
+            write_image(outfile_path, result.words, result.strings, encoding=encoding)
+        else:
+            with open(outfile_path, "w") as outfile:
+                outfile.writelines(text_from_word(word, encoding) + "\n" for word in result.words)
         print(f"Assembled '{asm_file}' -> '{outfile_path}'")
     except Exception as e:
         print(f"Error writing to output file '{outfile_path}': {e}")
 
+    if symbol_file:
+        try:
+            with open(symbol_file, "w") as outfile:
+                for label, address in sorted(result.labels.items(), key=lambda item: item[1]):
+                    outfile.write(f"0x{address:04x} {label}\n")
+        except Exception as e:
+            print(f"Error writing to symbol file '{symbol_file}': {e}")
+
+    if debug_file is not None:
+        try:
+            write_debug_info(debug_file, result.words, result.strings, result.label_lines,
+                             result.instruction_lines, result.string_lines, result.line_count,
+                             result.trailing_newline)
+        except Exception as e:
+            print(f"Error writing to debug-info file '{debug_file}': {e}")
+
 if __name__ == "__main__":
+    # Binary images by default; --text writes the '0'/'1' .mc form for debugging,
+    # --symbols a .sym label map and --debug a .dbg sidecar next to each output.
+    # --wide selects the 32-bit encoding.
+    encoding = WIDE if "--wide" in sys.argv[1:] else NARROW
+    extension = ".mc" if "--text" in sys.argv[1:] else ".bin"
     asm_files = ["addition.asm", "conditional.asm", "fizzbuzz.asm"]
     for asm_file in asm_files:
-        mc_file = asm_file.replace(".asm", ".mc")
-        assemble(asm_file, mc_file, op_codes, registers)
\ No newline at end of file
+        mc_file = asm_file.replace(".asm", extension)
+        symbol_file = asm_file.replace(".asm", ".sym") if "--symbols" in sys.argv[1:] else None
+        debug_file = asm_file.replace(".asm", ".dbg") if "--debug" in sys.argv[1:] else None
+        assemble(asm_file, mc_file, op_codes, registers, symbol_file, debug_file, encoding)
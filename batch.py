@@ -0,0 +1,133 @@
+import sys
+import io
+import time
+from array import array
+from multiprocessing import shared_memory
+
+from isa import ENCODINGS
+from pool import jobs_option, pool_map, worker_count
+from vm import Machine, OutputBuffer, load_program, program_from_tables, read_snapshot
+
+# Many independent executions of one program, such as a test sweep over
+# initial register states, spread across a process pool.
+#
+# Each execution starts from a Machine.snapshot() blob and ends as one: the
+# final registers, memory, pc and step count, with everything the execution
+# printed as the snapshot's buffered output.
+#
+# The program is decoded once, in the parent. Its tables are copied into a
+# shared memory block that every worker maps, so a worker neither decodes
+# the program nor receives a pickled copy of it:
+#
+#   ops, ra, rb, rc   one byte per instruction each
+#   operand           one array("l") item per instruction
+#
+# The dispatch loops do not run from these views. On its first execution
+# each worker builds its own Program.table() from them, one tuple per
+# instruction, and keeps it for every later execution; that table is a
+# private copy of the program in every worker.
+
+_program = None
+_use_jit = False
+_shared = None
+
+
+def initial_snapshots(program, register_sets):
+    """A start-of-program snapshot of `program` for each set of initial register values."""
+    machine = Machine(program, OutputBuffer(io.BytesIO()))
+    snapshots = []
+    for values in register_sets:
+        machine.registers[:] = list(values) + [0] * (len(machine.registers) - len(values))
+        snapshots.append(machine.snapshot())
+    return snapshots
+
+
+def execute(program, snapshot, use_jit=False):
+    """Run `program` from `snapshot` until HALT or the end; returns the final snapshot."""
+    # Nothing is flushed mid-run, so all of the output ends up in the snapshot.
+    machine = Machine(program, OutputBuffer(io.BytesIO(), flush_threshold=sys.maxsize), use_jit)
+    machine.restore(snapshot)
+    if use_jit:
+        machine.run_jit()
+    else:
+        machine.run_interpreter()
+    return machine.snapshot()
+
+
+def _share(program):
+    """Copy the decoded tables of `program` into a new shared memory block."""
+    count = len(program)
+    block = shared_memory.SharedMemory(create=True, size=max(1, 4 * count + count * program.operand.itemsize))
+    offset = 0
+    for table in (program.ops, program.ra, program.rb, program.rc, program.operand):
+        data = memoryview(table).cast("B")
+        block.buf[offset:offset + len(data)] = data
+        offset += len(data)
+        data.release()
+    return block
+
+
+def _attach(name, count, typecode, strings, encoding_version, use_jit):
+    """Worker initializer: map the shared tables and wrap them in the worker's Program."""
+    global _program, _use_jit, _shared
+    _shared = shared_memory.SharedMemory(name=name)
+    view = _shared.buf
+    ops, ra, rb, rc = (view[index * count:(index + 1) * count] for index in range(4))
+    operand = view[4 * count:4 * count + count * array(typecode).itemsize].cast(typecode)
+    _program = program_from_tables(ops, ra, rb, rc, operand, strings, ENCODINGS[encoding_version])
+    _use_jit = use_jit
+
+
+def _execute_shared(snapshot):
+    return execute(_program, snapshot, _use_jit)
+
+
+def run_batch(program, snapshots, jobs=None, use_jit=False):
+    """Run `program` from every snapshot in `snapshots`; returns (final snapshots, wall time).
+
+    Results come back in input order. With one job the executions run in
+    this process; otherwise they are spread over `jobs` worker processes
+    (default: one per CPU) that share the decoded program.
+    """
+    snapshots = list(snapshots)
+    start = time.perf_counter()
+    workers = worker_count(jobs)
+    if workers == 1 or len(snapshots) <= 1:
+        results = [execute(program, snapshot, use_jit) for snapshot in snapshots]
+        return results, time.perf_counter() - start
+
+    block = _share(program)
+    try:
+        initargs = (block.name, len(program), program.operand.typecode, program.strings,
+                    program.encoding.version, use_jit)
+        results = pool_map(_execute_shared, snapshots, workers, _attach, initargs)
+    finally:
+        block.close()
+        block.unlink()
+    return results, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # batch.py [-j<n>] [--jit] [--runs=<n>] <file.bin | file.mc>
+    # Runs the program --runs times (default 100), with R1 set to the run
+    # number, and prints each distinct output once with how many runs gave it.
+    args = sys.argv[1:]
+    jobs = jobs_option(args)
+    runs = next((int(arg.split("=", 1)[1]) for arg in args if arg.startswith("--runs=")), 100)
+    mc_files = [arg for arg in args if not arg.startswith("-")]
+    if len(mc_files) != 1:
+        print("usage: python batch.py [-j<n>] [--jit] [--runs=<n>] <file.bin | file.mc>")
+        sys.exit(2)
+    program = load_program(mc_files[0])
+    if program is None:
+        sys.exit(1)
+    results, wall_time = run_batch(program, initial_snapshots(program, [[0, run] for run in range(runs)]), jobs,
+                                   "--jit" in args)
+    outputs = {}
+    for result in results:
+        output = read_snapshot(result).output
+        outputs[output] = outputs.get(output, 0) + 1
+    for output, count in outputs.items():
+        print(f"{count} run(s) printed:")
+        sys.stdout.write(output.decode("utf-8"))
+    print(f"{runs} runs in {wall_time:.2f}s ({runs / wall_time if wall_time else 0:,.1f} executions/sec)")
@@ -0,0 +1,61 @@
+"""Lines/second for assemble() on a synthetic 1M-instruction file.
+
+Branch targets are 10-bit byte addresses, so every label sits in the first
+few hundred instructions and later branches refer back to them.
+Run from the repository root:  python -m bench.assembler_throughput [N]
+"""
+import sys
+import os
+import io
+import time
+import random
+import tempfile
+import contextlib
+
+from assembler import assemble, op_codes, registers
+
+LABELS = 64
+
+
+def synthetic_asm(n, seed=0):
+    rng = random.Random(seed)
+    lines = [f'MSG_{i}: .STRING "message {i}\\n"' for i in range(8)]
+    for index in range(n):
+        if index < LABELS * 4 and index % 4 == 0:
+            lines.append(f"L_{index // 4}:")
+        r1, r2, r3 = (f"R{rng.randrange(8)}" for _ in range(3))
+        label = f"L_{rng.randrange(LABELS)}"
+        lines.append(rng.choice((
+            f"YOLOAD {r1}, {rng.randrange(64)}(R0)",
+            f"ADD {r1}, {r2}, {r3}",
+            f"MODULOIZE {r1}, {r2}, {r3}",
+            f"INCREMENT {r1}",
+            f"YELLVAL {r1}",
+            f"YELLSTR MSG_{rng.randrange(8)}",
+            f"SAMEBRO {r1}, {r2}, {label}",
+            f"GREATERTHAN {r1}, {r2}, {label}",
+            f"NOTGREATEROREQUAL {r1}, {r2}, {label}",
+            f"YEET {label}",
+        )))
+    lines.append("HALT")
+    return "\n".join(lines) + "\n"
+
+
+def main(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_file = os.path.join(tmp, "synthetic.asm")
+        with open(asm_file, "w") as outfile:
+            outfile.write(synthetic_asm(n))
+        with open(asm_file) as infile:
+            line_count = sum(1 for _ in infile)
+
+        for extension in (".bin", ".mc"):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                assemble(asm_file, os.path.join(tmp, "synthetic" + extension), op_codes, registers)
+            elapsed = time.perf_counter() - start
+            print(f"{extension:>4}: {line_count} lines in {elapsed:.2f}s -> {line_count / elapsed:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
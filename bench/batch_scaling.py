@@ -0,0 +1,65 @@
+"""Executions/second of batch.run_batch from 1 to N worker processes.
+
+Runs a small loop program (it sums 0..R1-1, printing the total) once per
+initial R1 value, --runs executions in all, first in-process and then with
+2..--jobs workers sharing the decoded program. Every job count must give
+the same final snapshots.
+Run from the repository root:
+python -m bench.batch_scaling [--runs=N] [--jobs=N] [--size=N] [--jit]
+"""
+import sys
+import os
+import random
+
+from assembler import assemble_source
+from batch import initial_snapshots, run_batch
+from vm import Program
+
+SWEEP_ASM = """DONE_MSG: .STRING "done\\n"
+
+YOLOAD R2, 0(R0)
+YOLOAD R3, 0(R0)
+YOLOAD R4, 7(R0)
+LOOP:
+NOTGREATEROREQUAL R2, R1, DONE
+ADD R3, R3, R2
+MODULOIZE R5, R3, R4
+YOSTASH R5, 3(R0)
+INCREMENT R2
+YEET LOOP
+DONE:
+YELLVAL R3
+YELLSTR DONE_MSG
+HALT
+"""
+
+
+def main(argv):
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    runs = int(options.get("runs", 2000))
+    max_jobs = int(options.get("jobs", os.cpu_count() or 1))
+    size = int(options.get("size", 500))
+    use_jit = "--jit" in argv
+
+    assembly = assemble_source(SWEEP_ASM)
+    assert not assembly.errors, assembly.errors
+    program = Program(strings=assembly.strings)
+    program.extend_words(assembly.words)
+    rng = random.Random(0)
+    snapshots = initial_snapshots(program, [[0, rng.randrange(size // 2, size * 3 // 2)] for _ in range(runs)])
+
+    print(f"{runs} executions of about {6 * size} instructions each ({'JIT' if use_jit else 'interpreter'}), "
+          f"{os.cpu_count()} CPUs")
+    expected = single = None
+    for jobs in range(1, max_jobs + 1):
+        results, wall_time = run_batch(program, snapshots, jobs, use_jit)
+        if expected is None:
+            expected, single = results, runs / wall_time
+        assert results == expected, f"{jobs} workers gave different results"
+        rate = runs / wall_time
+        print(f"  {jobs:>3} {'job' if jobs == 1 else 'jobs'}  {rate:>10,.1f} executions/sec  "
+              f"{rate / single:5.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,131 @@
+"""Latency of a cold `python -m toolchain` process against a round trip to the daemon.
+
+Builds addition.c with compile -O2, assemble and disassemble three ways:
+a fresh `python -m toolchain` process per step, a fresh thin-client process
+(`python -m toolchaind`) per step, and a request over a connection kept
+open to a running `python -m toolchaind serve`. The last is what an editor
+integration pays; a thin-client process still pays for starting Python, so
+it saves little over a cold one. The daemon's artifacts must match the
+CLI's byte for byte. Then --clients connections send compile requests at
+once, to show the daemon serving them in parallel.
+Run from the repository root:
+python -m bench.daemon [--runs=N] [--requests=N] [--clients=N] [--jobs=N]
+"""
+import sys
+import os
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from statistics import median
+
+from toolchaind import Client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (command, input file, options, the artifact the CLI writes), in build order.
+STEPS = (
+    ("compile", "addition.c", ["-O2"], ".asm"),
+    ("assemble", "addition.asm", [], ".bin"),
+    ("disassemble", "addition.bin", [], "_disassembled.asm"),
+)
+
+
+def environment():
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # A real install has its bytecode cached
+    return env
+
+
+def process_times(argv, cwd, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=cwd, env=environment(), check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def request_times(client, command, inputs, options, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.request(command, "addition", inputs, options)
+        times.append(time.perf_counter() - start)
+        assert response.ok, response.output
+    return times
+
+
+def summary(times):
+    times = sorted(times)
+    return (f"median {median(times) * 1e3:8.2f} ms  "
+            f"p90 {times[int(len(times) * 0.9)] * 1e3:8.2f} ms  best {times[0] * 1e3:8.2f} ms")
+
+
+def concurrent_throughput(socket_path, inputs, clients, requests):
+    """Compile requests per second with `clients` connections sending `requests` each at once."""
+    barrier = threading.Barrier(clients + 1)
+
+    def work():
+        with Client(socket_path) as client:
+            barrier.wait()
+            for _ in range(requests):
+                client.request("compile", "addition", inputs, ["-O2"])
+
+    threads = [threading.Thread(target=work) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return clients * requests / (time.perf_counter() - start)
+
+
+def main(argv):
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    runs = int(options.get("runs", 20))
+    requests = int(options.get("requests", 200))
+    clients = int(options.get("clients", os.cpu_count() or 1))
+    jobs = int(options.get("jobs", clients))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(ROOT, "addition.c"), tmp)
+        socket_path = os.path.join(tmp, "toolchaind.sock")
+        daemon = subprocess.Popen([sys.executable, "-m", "toolchaind", "serve", f"-j{jobs}", f"--socket={socket_path}"],
+                                  cwd=tmp, env=environment(), stdout=subprocess.PIPE, text=True)
+        try:
+            print(daemon.stdout.readline().strip())
+            with Client(socket_path) as client:
+                for command, source, step_options, artifact in STEPS:
+                    cold = process_times(["-m", "toolchain", command, *step_options, source], tmp, runs)
+                    thin = process_times(["-m", "toolchaind", command, *step_options, f"--socket={socket_path}",
+                                          source], tmp, runs)
+                    with open(os.path.join(tmp, source), "rb") as infile:
+                        inputs = {os.path.splitext(source)[1]: infile.read()}
+                    warm = request_times(client, command, inputs, step_options, requests)
+
+                    with open(os.path.join(tmp, "addition" + artifact), "rb") as infile:
+                        expected = infile.read()
+                    response = client.request(command, "addition", inputs, step_options)
+                    assert response.artifacts[artifact] == expected, f"daemon {command} output differs from the CLI's"
+
+                    print(f"{command}:")
+                    print(f"  cold process   {summary(cold)}")
+                    print(f"  thin client    {summary(thin)}")
+                    print(f"  daemon request {summary(warm)}  ({median(cold) / median(warm):.0f}x faster than cold)")
+
+                with open(os.path.join(tmp, "addition.c"), "rb") as infile:
+                    inputs = {".c": infile.read()}
+            single = concurrent_throughput(socket_path, inputs, 1, requests)
+            parallel = concurrent_throughput(socket_path, inputs, clients, requests)
+            print(f"compile throughput: {single:,.0f} requests/sec on 1 connection, "
+                  f"{parallel:,.0f} on {clients} ({parallel / single:.1f}x, {jobs} workers)")
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
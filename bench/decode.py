@@ -0,0 +1,50 @@
+"""Decode throughput (words/sec) before and after the shared decode table.
+
+Times the frozen string-slicing decoder against dissassmbler's table-driven
+one over the same synthetic image, plus the emulator's program load.
+Run from the repository root:  python -m bench.decode [N]
+"""
+import sys
+import os
+import time
+import tempfile
+from array import array
+from collections import deque
+
+from bench import legacy_disassembler as legacy
+from bench.disassembler_memory import synthetic_words
+from dissassmbler import decode_instructions, read_instructions, scan
+from mcimage import read_image, write_image
+from vm import load_program
+
+
+def timed(label, n, work):
+    start = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<26} {n / elapsed:>12,.0f} words/sec")
+    return elapsed
+
+
+def main(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_file = os.path.join(tmp, "synthetic.bin")
+        write_image(bin_file, array("I", synthetic_words(n)))
+        count, label_targets, _ = scan(bin_file)
+        legacy_count, legacy_targets, _ = legacy.scan(bin_file)
+
+        with read_image(bin_file) as image:
+            before = timed(
+                "disassembler (slicing)", n,
+                lambda: deque(legacy.decode_instructions(image.instruction_strings(), legacy_targets, legacy_count), 0),
+            )
+        after = timed(
+            "disassembler (table)", n,
+            lambda: deque(decode_instructions(read_instructions(bin_file), label_targets, count), 0),
+        )
+        timed("vm load_program (table)", n, lambda: load_program(bin_file))
+    print(f"disassembler decode speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
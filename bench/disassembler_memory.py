@@ -0,0 +1,92 @@
+"""Peak traced memory of disassemble() as the input grows.
+
+Disassembles synthetic .mc and .bin inputs of increasing size under
+tracemalloc; the peak should stay flat rather than track the input. One
+untraced disassembly first fills the lazily built decode table, which
+would otherwise be charged to the smallest input.
+Run from the repository root:  python -m bench.disassembler_memory [N]
+"""
+import sys
+import os
+import io
+import random
+import tempfile
+import tracemalloc
+import contextlib
+from array import array
+
+from assembler import op_codes
+from dissassmbler import disassemble
+from mcimage import WORD_BITS, text_from_word, write_image
+
+# Peaks may differ by allocator noise, not by a factor of the input size.
+TOLERANCE = 2.0
+
+
+def synthetic_words(n, seed=0):
+    rng = random.Random(seed)
+    opcodes = [int(bits, 2) for bits in op_codes.values()]
+    for _ in range(n):
+        opcode = rng.choice(opcodes)
+        bits = WORD_BITS[f"{opcode:04b}"]
+        yield (opcode << (bits - 4) | rng.getrandbits(bits - 4)) << (32 - bits)
+
+
+def every_top_word():
+    """One word per 16-bit decode table index that starts with a real opcode."""
+    opcodes = {int(bits, 2) for bits in op_codes.values()}
+    for top in range(1 << 16):
+        if top >> 12 in opcodes:
+            yield top << 16
+
+
+def warm_decode_table(directory):
+    warm_file = os.path.join(directory, "warm.bin")
+    write_image(warm_file, array("I", every_top_word()), ["message\n"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        disassemble(warm_file, os.path.join(directory, "out.asm"))
+    os.remove(warm_file)
+
+
+def write_inputs(directory, n):
+    mc_file = os.path.join(directory, f"synthetic_{n}.mc")
+    with open(mc_file, "w") as outfile:
+        for word in synthetic_words(n):
+            outfile.write(text_from_word(word) + "\n")
+    bin_file = os.path.join(directory, f"synthetic_{n}.bin")
+    write_image(bin_file, array("I", synthetic_words(n)), ["message\n"])
+    return mc_file, bin_file
+
+
+def peak_memory(mc_file, asm_file):
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        disassemble(mc_file, asm_file)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(largest):
+    # The smaller run already fills several output chunks.
+    sizes = [min(100_000, largest), largest]
+    peaks = {".mc": [], ".bin": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        warm_decode_table(tmp)
+        for n in sizes:
+            mc_file, bin_file = write_inputs(tmp, n)
+            for source in (mc_file, bin_file):
+                extension = os.path.splitext(source)[1]
+                peak = peak_memory(source, os.path.join(tmp, "out.asm"))
+                peaks[extension].append(peak)
+                print(f"{extension:>4}: {n:>9} instructions -> peak {peak / 1024:8.1f} KiB")
+            os.remove(mc_file)
+            os.remove(bin_file)
+
+    flat = all(grown <= small * TOLERANCE for small, grown in peaks.values())
+    print("peak memory flat" if flat else "peak memory grows with input size")
+    return 0 if flat else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000))
@@ -0,0 +1,64 @@
+"""Speed of the tokenizer/parser front end against the old regex cascade.
+
+The front end is compiler.parse() alone: source text to AST. The regex
+cascade has no separate front end, since it matched and emitted each
+statement in one pass, so its whole translation is the baseline. The full
+compile (parse, lowering, register allocation and emission) is shown for
+context.
+Run from the repository root:  python -m bench.frontend [LINES]
+"""
+import sys
+import os
+import time
+import tempfile
+
+from compiler import c_to_asm_final_file, parse
+from bench.legacy_compiler import c_to_asm_final_file as legacy_c_to_asm_final_file
+
+
+def generate_source(lines):
+    """A straight-line C program of roughly `lines` lines both front ends accept."""
+    body = [
+        "    c = a + b;",
+        '    printf("%d\\n", c);',
+        "    for (int i = 1; i <= 10; i++) {",
+        "        b = b + a;",
+        '        printf("Loop\\n");',
+        "    }",
+    ]
+    out = ["int main() {", "    int a = 1;", "    int b = 2;", "    int c = 0;"]
+    while len(out) < lines - 2:
+        out.extend(body)
+    out += ["    return 0;", "}"]
+    return "\n".join(out) + "\n"
+
+
+def best_time(function, argument, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(lines):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "generated.c")
+        source = generate_source(lines)
+        with open(path, "w") as outfile:
+            outfile.write(source)
+
+        results = [
+            ("regex cascade", best_time(legacy_c_to_asm_final_file, path)),
+            ("tokenizer + AST", best_time(parse, source)),
+            ("full compile", best_time(c_to_asm_final_file, path)),
+        ]
+
+    for name, elapsed in results:
+        print(f"{name:>16}: {elapsed:.3f}s  ({lines / elapsed:,.0f} lines/sec)")
+    print(f"front end speedup: {results[0][1] / results[1][1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
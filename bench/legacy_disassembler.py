@@ -0,0 +1,250 @@
+"""Frozen copy of the string-slicing disassembler decoder.
+
+Kept only as the baseline for bench.decode; the toolchain uses dissassmbler.py.
+"""
+import sys
+import os
+import re
+from array import array
+from itertools import islice
+
+from isa import escape
+from mcimage import is_image, read_image
+
+op_codes_reverse = {
+    "0001": "YOLOAD",
+    "0010": "ADD",
+    "0011": "GREATERTHAN",
+    "0100": "YEET",
+    "0101": "YOLO",
+    "0110": "SAMEBRO",
+    "0111": "MODULOIZE",
+    "1000": "INCREMENT",
+    "1001": "YELLSTR",
+    "1010": "YELLVAL",
+    "1111": "HALT",
+    "1100": "NOTGREATEROREQUAL",
+    "1011": "YOSTASH",
+    "1101": "YOGRAB"
+}
+
+registers_reverse = {f"{i:03b}": f"R{i}" for i in range(8)}
+
+CHUNK_LINES = 4096
+BRANCH_OPCODES = ("0011", "0100", "0101", "0110", "1100")
+
+
+def read_instructions(mc_file: str):
+    """Yield the instructions of a .bin image or .mc file one at a time, as '0'/'1' strings."""
+    if is_image(mc_file):
+        with read_image(mc_file) as image:
+            yield from image.instruction_strings()
+    else:
+        with open(mc_file, "r") as infile:
+            for line in infile:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def _mark(bitset: bytearray, index: int):
+    if index >= len(bitset):
+        bitset.extend(bytes(index + 1 - len(bitset)))
+    bitset[index] = 1
+
+
+def scan(mc_file: str):
+    """First pass: collect what the output header and label names depend on.
+
+    Returns the instruction count, the branch targets as a bytearray indexed
+    by byte address, and the string indices in order of first use. Targets
+    and string indices are bounded by their field widths, so memory does not
+    grow with the input.
+    """
+    label_targets = bytearray()
+    strings_seen = bytearray()
+    string_indices = []
+    count = 0
+    for instruction_code in read_instructions(mc_file):
+        count += 1
+        opcode = instruction_code[0:4]
+        if opcode in BRANCH_OPCODES:  # Instructions with a label/address
+            label_address_bin = instruction_code[7:]
+            try:
+                _mark(label_targets, int(label_address_bin, 2) * 2)  # Assuming each instruction is 2 bytes
+            except ValueError:
+                pass  # Handle potential errors in binary conversion
+        elif opcode == "1001":  # YELLSTR
+            try:
+                string_index = int(instruction_code[7:], 2)
+            except ValueError:
+                continue
+            if string_index >= len(strings_seen) or not strings_seen[string_index]:
+                _mark(strings_seen, string_index)
+                string_indices.append(string_index)
+    return count, label_targets, string_indices
+
+
+def decode_instructions(instructions, label_targets: bytearray, count: int):
+    """Second pass: yield assembly lines, with a label line before every branch target.
+
+    Labels are numbered in address order, so a target's name is the number
+    of targets below it and forward references resolve as well as backward ones.
+    """
+    label_numbers = array("I")
+    labels_below = 0
+    for address in range(min(len(label_targets), count * 2)):
+        label_numbers.append(labels_below)
+        labels_below += label_targets[address]
+
+    def label_for(address):
+        if address < len(label_numbers) and label_targets[address]:
+            return f"LABEL_{label_numbers[address]}"
+        return f"LABEL_TARGET_{address // 2}"
+
+    current_address = 0
+    for instruction_code in instructions:
+        opcode = instruction_code[0:4]
+        asm_instruction = ""
+
+        if current_address < len(label_numbers) and label_targets[current_address]:
+            yield f"{label_for(current_address)}:"
+
+        if opcode in op_codes_reverse:
+            instruction_name = op_codes_reverse[opcode]
+            asm_instruction += instruction_name
+
+            if instruction_name in ["YOLOAD", "YOSTASH", "YOGRAB"]:
+                dest_reg_bin = instruction_code[4:7]
+                immediate_bin = instruction_code[10:16]
+                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
+                immediate = int(immediate_bin, 2)
+                asm_instruction += f" {dest_reg}, {immediate}(R0)"
+            elif instruction_name == "ADD":
+                dest_reg_bin = instruction_code[4:7]
+                src1_reg_bin = instruction_code[7:10]
+                src2_reg_bin = instruction_code[10:13]
+                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
+                src1_reg = registers_reverse.get(src1_reg_bin, "UNKNOWN")
+                src2_reg = registers_reverse.get(src2_reg_bin, "UNKNOWN")
+                asm_instruction += f" {dest_reg}, {src1_reg}, {src2_reg}"
+            elif instruction_name == "GREATERTHAN":
+                reg1_bin = instruction_code[4:7]
+                reg2_bin = instruction_code[7:10]
+                label_address_bin = instruction_code[10:]
+                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
+                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
+                try:
+                    label_target_address = int(label_address_bin, 2) * 2
+                    label = label_for(label_target_address)
+                    asm_instruction += f" {reg1}, {reg2}, {label}"
+                except ValueError:
+                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
+            elif instruction_name in ["YEET", "YOLO"]:
+                label_address_bin = instruction_code[7:]
+                try:
+                    label_target_address = int(label_address_bin, 2) * 2
+                    label = label_for(label_target_address)
+                    asm_instruction += f" {label}"
+                except ValueError:
+                    asm_instruction += " UNKNOWN_LABEL"
+            elif instruction_name == "SAMEBRO":
+                reg1_bin = instruction_code[4:7]
+                reg2_bin = instruction_code[7:10]
+                label_address_bin = instruction_code[10:]
+                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
+                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
+                try:
+                    label_target_address = int(label_address_bin, 2) * 2
+                    label = label_for(label_target_address)
+                    asm_instruction += f" {reg1}, {reg2}, {label}"
+                except ValueError:
+                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
+            elif instruction_name == "MODULOIZE":
+                dest_reg_bin = instruction_code[4:7]
+                src_reg_bin = instruction_code[7:10]
+                mod_reg_bin = instruction_code[10:13]
+                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
+                src_reg = registers_reverse.get(src_reg_bin, "UNKNOWN")
+                mod_reg = registers_reverse.get(mod_reg_bin, "UNKNOWN")
+                asm_instruction += f" {dest_reg}, {src_reg}, {mod_reg}"
+            elif instruction_name == "INCREMENT":
+                reg_bin = instruction_code[4:7]
+                reg = registers_reverse.get(reg_bin, "UNKNOWN")
+                asm_instruction += f" {reg}"
+            elif instruction_name == "YELLSTR":
+                string_index_bin = instruction_code[7:]
+                try:
+                    string_index = int(string_index_bin, 2)
+                    string_label = f"STRING_LITERAL_{string_index}"
+                    asm_instruction += f" {string_label}"
+                except ValueError:
+                    asm_instruction += " UNKNOWN_STRING"
+            elif instruction_name == "YELLVAL":
+                reg_bin = instruction_code[4:7]
+                reg = registers_reverse.get(reg_bin, "UNKNOWN")
+                asm_instruction += f" {reg}"
+            elif instruction_name == "HALT":
+                pass # No operands
+            elif instruction_name == "NOTGREATEROREQUAL":
+                reg1_bin = instruction_code[4:7]
+                reg2_bin = instruction_code[7:10]
+                label_address_bin = instruction_code[10:]
+                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
+                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
+                try:
+                    label_target_address = int(label_address_bin, 2) * 2
+                    label = label_for(label_target_address)
+                    asm_instruction += f" {reg1}, {reg2}, {label}"
+                except ValueError:
+                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
+
+            yield asm_instruction
+        else:
+            yield f".UNKNOWN_INSTRUCTION {instruction_code}"
+
+        current_address += 2
+
+
+def disassemble(mc_file: str, outfile_path: str):
+    """Disassemble in two streaming passes, so memory stays flat however large the input."""
+    strings = []
+    try:
+        if is_image(mc_file):
+            with read_image(mc_file) as image:
+                strings = image.strings
+        count, label_targets, string_indices = scan(mc_file)
+    except FileNotFoundError:
+        print(f"Error: Input file '{mc_file}' not found.")
+        return
+
+    # Images carry their string table, so those literals can be restored verbatim.
+    string_literals_discovered = {f"STRING_LITERAL_{i}": f"\"{escape(text)}\"" for i, text in enumerate(strings)}
+    for string_index in string_indices:
+        string_label = f"STRING_LITERAL_{string_index}"
+        if string_label not in string_literals_discovered:
+            string_literals_discovered[string_label] = f"\"UNKNOWN_STRING_{string_index}\\n\""  # Placeholder
+
+    lines = decode_instructions(read_instructions(mc_file), label_targets, count)
+    try:
+        with open(outfile_path, "w") as outfile:
+            # String literals go at the beginning of the disassembled file
+            for label, literal in string_literals_discovered.items():
+                outfile.write(f"{label}: .STRING {literal}\n")
+            outfile.write("\n")
+            while True:
+                chunk = list(islice(lines, CHUNK_LINES))
+                if not chunk:
+                    break
+                outfile.write("\n".join(chunk) + "\n")
+        print(f"Disassembled '{mc_file}' -> '{outfile_path}'")
+    except Exception as e:
+        print(f"Error writing to output file '{outfile_path}': {e}")
+
+if __name__ == "__main__":
+    extension = ".mc" if "--text" in sys.argv[1:] else ".bin"
+    mc_files = ["addition", "conditional", "fizzbuzz"]
+    for name in mc_files:
+        mc_file = name + extension
+        asm_file = name + "_disassembled.asm"
+        disassemble(mc_file, asm_file)
\ No newline at end of file
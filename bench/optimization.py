@@ -0,0 +1,44 @@
+"""Static and executed instruction counts for fizzbuzz.c at each -O level.
+
+The vm executes one instruction per cycle, so executed instructions are the
+emulated cycle count. Run from the repository root:  python -m bench.optimization
+"""
+import sys
+import os
+import io
+import tempfile
+import contextlib
+
+from compiler import c_to_asm_final_file
+from assembler import assemble, op_codes, registers
+from vm import Machine, load_program
+
+
+def measure(c_file, opt_level, tmp):
+    asm = c_to_asm_final_file(c_file, opt_level=opt_level)
+    asm_file = os.path.join(tmp, f"O{opt_level}.asm")
+    bin_file = os.path.join(tmp, f"O{opt_level}.bin")
+    with open(asm_file, "w") as outfile:
+        outfile.write(asm)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assemble(asm_file, bin_file, op_codes, registers)
+    program = load_program(bin_file)
+    machine = Machine(program, io.StringIO())
+    machine.run()
+    return len(program), machine.steps
+
+
+def main(c_file):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [(level, *measure(c_file, level, tmp)) for level in (0, 1, 2)]
+
+    baseline_static, baseline_cycles = results[0][1:]
+    print(f"{c_file}")
+    for level, static, cycles in results:
+        print(f"  -O{level}: {static:4d} instructions, {cycles:6d} cycles"
+              f"  ({100 * (baseline_static - static) / baseline_static:5.1f}% / "
+              f"{100 * (baseline_cycles - cycles) / baseline_cycles:5.1f}% fewer)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "fizzbuzz.c")
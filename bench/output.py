@@ -0,0 +1,57 @@
+"""Per-call vs buffered YELLSTR/YELLVAL output on a scaled FizzBuzz.
+
+Every iteration prints one line, so N=10^6 writes 10^6 lines. Each mode
+writes to a file descriptor; the per-call mode flushes after every
+instruction (one write syscall per line), the buffered mode only when the
+buffer reaches vm.FLUSH_THRESHOLD. Run from the repository root:
+python -m bench.output [N]
+"""
+import sys
+import os
+import io
+import time
+import tempfile
+import contextlib
+
+from assembler import assemble, op_codes, registers
+from bench.vm_dispatch import scaled_fizzbuzz_asm
+from vm import FLUSH_THRESHOLD, Machine, OutputBuffer, load_program
+
+
+def main(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_file = os.path.join(tmp, "fizzbuzz_scaled.asm")
+        bin_file = os.path.join(tmp, "fizzbuzz_scaled.bin")
+        with open(asm_file, "w") as outfile:
+            outfile.write(scaled_fizzbuzz_asm(n))
+        with contextlib.redirect_stdout(io.StringIO()):
+            assemble(asm_file, bin_file, op_codes, registers)
+        program = load_program(bin_file)
+
+        outputs = {}
+        timings = {}
+        for label, threshold, use_jit in (
+            ("per-call", 0, False), ("buffered", FLUSH_THRESHOLD, False),
+            ("per-call jit", 0, True), ("buffered jit", FLUSH_THRESHOLD, True),
+        ):
+            out_file = os.path.join(tmp, label.replace(" ", "_") + ".out")
+            fd = os.open(out_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            try:
+                machine = Machine(program, OutputBuffer(fd=fd, flush_threshold=threshold), use_jit)
+                start = time.perf_counter()
+                machine.run()
+                timings[label] = time.perf_counter() - start
+            finally:
+                os.close(fd)
+            with open(out_file, "rb") as infile:
+                outputs[label] = infile.read()
+            lines = outputs[label].count(b"\n")
+            print(f"{label:<12}: {lines} lines in {timings[label]:.2f}s -> {lines / timings[label]:,.0f} lines/sec")
+
+    assert len(set(outputs.values())) == 1, "outputs differ between modes"
+    print(f"buffered speedup: {timings['per-call'] / timings['buffered']:.2f}x interpreted, "
+          f"{timings['per-call jit'] / timings['buffered jit']:.2f}x with the jit")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10**6)
@@ -0,0 +1,101 @@
+"""Per-program latency of compile -> assemble -> disassemble, through files vs in memory.
+
+Chains c_to_asm_final_file, assemble and disassemble over N small programs
+(the three examples with varied constants), with an .asm, a .bin and a
+disassembly written and read back for each, then does the same with
+compile_source, assemble_source and disassemble_words, which never touch
+the disk, and finally with compile_program and assemble_program, which
+hand the compiler's ir.Instructions to the assembler without formatting
+and re-parsing assembly text. All three disassemblies must match.
+Run from the repository root:  python -m bench.pipeline [N]
+"""
+import sys
+import os
+import io
+import time
+import random
+import tempfile
+import contextlib
+
+from assembler import assemble, assemble_program, assemble_source, op_codes, registers
+from compiler import c_to_asm_final_file, compile_program, compile_source
+from dissassmbler import disassemble, disassemble_words
+
+TEMPLATES = (
+    "int main() {{\n    int a = {0};\n    int b = {1};\n    int sum = a + b;\n"
+    '    printf("%d\\n", sum);\n    return 0;\n}}\n',
+    "int main() {{\n    int x = {0};\n    if (x > {1}) {{\n"
+    '        printf("Positive\\n");\n    }}\n    return 0;\n}}\n',
+    "for (int i = 1; i <= {0}; i++) {{\n    if (i % 3 == 0 && i % 5 == 0) {{\n"
+    '        printf("FizzBuzz\\n");\n    }} else if (i % 3 == 0) {{\n        printf("Fizz\\n");\n'
+    '    }} else if (i % 5 == 0) {{\n        printf("Buzz\\n");\n    }} else {{\n'
+    '        printf("%d\\n", i);\n    }}\n}}\n',
+)
+
+
+def small_programs(n, seed=0):
+    rng = random.Random(seed)
+    return [TEMPLATES[index % len(TEMPLATES)].format(rng.randrange(1, 60), rng.randrange(0, 60)) for index in range(n)]
+
+
+def through_files(sources, tmp):
+    listings = []
+    for index, source in enumerate(sources):
+        base = os.path.join(tmp, f"program_{index}")
+        asm_code = c_to_asm_final_file(base + ".c")
+        with open(base + ".asm", "w") as outfile:
+            outfile.write(asm_code)
+        assemble(base + ".asm", base + ".bin", op_codes, registers)
+        disassemble(base + ".bin", base + "_disassembled.asm")
+        with open(base + "_disassembled.asm") as infile:
+            listings.append(infile.read())
+    return listings
+
+
+def in_memory(sources):
+    listings = []
+    for source in sources:
+        assembly = assemble_source(compile_source(source))
+        listings.append("\n".join(disassemble_words(assembly.words, assembly.strings)) + "\n")
+    return listings
+
+
+def in_memory_ir(sources):
+    listings = []
+    for source in sources:
+        assembly = assemble_program(compile_program(source))
+        listings.append("\n".join(disassemble_words(assembly.words, assembly.strings)) + "\n")
+    return listings
+
+
+def main(n):
+    sources = small_programs(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        for index, source in enumerate(sources):
+            with open(os.path.join(tmp, f"program_{index}.c"), "w") as outfile:
+                outfile.write(source)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            file_listings = through_files(sources, tmp)
+        files = time.perf_counter() - start
+
+    start = time.perf_counter()
+    memory_listings = in_memory(sources)
+    memory = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ir_listings = in_memory_ir(sources)
+    ir = time.perf_counter() - start
+
+    assert file_listings == memory_listings, "in-memory disassembly differs from the file-based one"
+    assert memory_listings == ir_listings, "disassembly of the IR path differs from the text one"
+    print(f"through files: {n} programs in {files:.2f}s -> {files / n * 1e6:8.1f} us/program")
+    print(f"    in memory: {n} programs in {memory:.2f}s -> {memory / n * 1e6:8.1f} us/program")
+    print(f"in memory, IR: {n} programs in {ir:.2f}s -> {ir / n * 1e6:8.1f} us/program")
+    print(f"in memory saved {(files - memory) / n * 1e6:.1f} us/program ({files / memory:.2f}x); "
+          f"the IR a further {(memory - ir) / n * 1e6:.1f} us/program ({memory / ir:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,91 @@
+"""Cold-start cost of short `python -m toolchain` invocations, against a budget.
+
+Takes addition.c through compile, assemble, disassemble and run, each a
+fresh process as a build script would start it, --repeat times. Reports
+the best wall time and the time spent importing modules beyond what a bare
+`python -c pass` loads, read from `python -X importtime`; importing every
+tool up front is shown for comparison. Exits non-zero when any command's
+imports take longer than --budget milliseconds (default 30).
+Run from the repository root:  python -m bench.startup [--repeat=N] [--budget=MS]
+"""
+import sys
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_MS = 30.0
+
+# Run in this order: each command reads what the one before it wrote.
+COMMANDS = (
+    ("compile", ["-m", "toolchain", "compile", "-O2", "addition.c"]),
+    ("assemble", ["-m", "toolchain", "assemble", "addition.asm"]),
+    ("disassemble", ["-m", "toolchain", "disassemble", "addition.bin"]),
+    ("run", ["-m", "toolchain", "run", "addition.bin"]),
+)
+EAGER = ("all tools, eager", ["-c", "import compiler, assembler, dissassmbler, vm"])
+BARE = ["-c", "pass"]
+
+
+def top_level_imports(report):
+    """{module: cumulative microseconds} for the outermost imports in -X importtime output."""
+    imports = {}
+    for line in report.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit() or fields[2].startswith("  "):
+            continue  # The header, a nested import or something else on stderr
+        imports[fields[2].strip()] = int(fields[1])
+    return imports
+
+
+def launch(argv, cwd, importtime=False):
+    """Run the interpreter with `argv`; returns (wall seconds, stderr)."""
+    flags = ["-X", "importtime"] if importtime else []
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # Timing recompiles from source would measure the wrong thing
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *flags, *argv], cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"'python {' '.join(argv)}' failed:\n{result.stdout}{result.stderr}")
+    return elapsed, result.stderr
+
+
+def cold_start(argv, cwd, preloaded, repeat):
+    """Best wall time and best import time beyond `preloaded`, both in milliseconds."""
+    wall = imports = float("inf")
+    for _ in range(repeat):
+        wall = min(wall, launch(argv, cwd)[0])
+        report = top_level_imports(launch(argv, cwd, importtime=True)[1])
+        imports = min(imports, sum(us for name, us in report.items() if name not in preloaded) / 1e3)
+    return wall * 1e3, imports
+
+
+def main(argv):
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    repeat = int(options.get("repeat", 10))
+    budget = float(options.get("budget", DEFAULT_BUDGET_MS))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(os.path.join(ROOT, "addition.c"), tmp)
+        for _, command in COMMANDS:
+            launch(command, tmp)  # Writes the inputs of the next command; warms __pycache__
+
+        preloaded = set(top_level_imports(launch(BARE, tmp, importtime=True)[1]))
+        bare = cold_start(BARE, tmp, preloaded, repeat)[0]
+        print(f"{'python -c pass':<18} {bare:8.1f} ms wall")
+        over_budget = []
+        for name, command in COMMANDS + (EAGER,):
+            wall, imports = cold_start(command, tmp, preloaded, repeat)
+            print(f"{name:<18} {wall:8.1f} ms wall ({wall - bare:+6.1f} ms), {imports:6.1f} ms importing")
+            if imports > budget and (name, command) != EAGER:
+                over_budget.append(name)
+
+    print(f"import budget {budget:.1f} ms: " + (f"exceeded by {', '.join(over_budget)}" if over_budget else "met"))
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,244 @@
+"""Scaled workloads for every stage of the toolchain, with JSON results.
+
+Generates inputs of a given scale N: a C program of N units (a variable, a
+counted loop and printfs each), a synthetic assembly file and .mc / .bin
+images of N * WORDS_PER_UNIT instructions, with labels and strings, then times
+c_to_asm_final_file, assemble, disassemble and the emulator (with and
+without the JIT) on them. Each benchmark records its best time over
+--repeat runs, its throughput and its traced peak memory (from one extra
+run under tracemalloc, so tracing never skews the timings).
+
+--output=<file> writes the results as JSON; --baseline=<file> compares
+against an earlier run and exits non-zero when any throughput drops, or
+peak memory grows, by more than --threshold (a fraction, default 0.25).
+Run from the repository root:
+python -m bench.suite [--scale=N] [--repeat=N] [--output=results.json] [--baseline=old.json] [--threshold=0.25]
+"""
+import sys
+import os
+import io
+import gc
+import json
+import time
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from array import array
+
+from assembler import assemble, op_codes, registers
+from bench.assembler_throughput import synthetic_asm
+from bench.disassembler_memory import synthetic_words
+from compiler import c_to_asm_final_file
+from dissassmbler import disassemble
+from isa import WIDE
+from mcimage import text_from_word, write_image
+from vm import Machine, load_program
+
+FORMAT_VERSION = 1
+DEFAULT_SCALE = 500
+DEFAULT_THRESHOLD = 0.25
+OPT_LEVEL = 2
+LOOP_ITERATIONS = 200
+# The assembler and disassembler are much faster per unit than the compiler;
+# their inputs are this many times larger so every stage runs long enough to time.
+WORDS_PER_UNIT = 200
+
+
+def generate_c(n, iterations=LOOP_ITERATIONS):
+    """A C program of `n` units, each a variable, a counted loop over it and one or two printfs."""
+    lines = ["int main() {"]
+    for unit in range(n):
+        lines += [
+            f"    int v{unit} = {unit % 50};",
+            f"    for (int j{unit} = 0; j{unit} < {iterations}; j{unit}++) {{",
+            f"        v{unit} = v{unit} + j{unit};",
+            "    }",
+            f'    printf("%d\\n", v{unit});',
+        ]
+        if unit % 4 == 0:
+            lines.append(f'    printf("unit {unit}\\n");')
+    lines += ["    return 0;", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def expected_output(n, iterations=LOOP_ITERATIONS):
+    """What the program from generate_c() prints."""
+    lines = []
+    for unit in range(n):
+        lines.append(f"{unit % 50 + sum(range(iterations))}\n")
+        if unit % 4 == 0:
+            lines.append(f"unit {unit}\n")
+    return "".join(lines)
+
+
+def measure(work, repeat):
+    """(best seconds, traced peak bytes, result of the last run) for `work()`.
+
+    Like timeit, the timed runs hold off the cyclic collector, whose pauses
+    land wherever the heap happens to cross a threshold.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = work()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            work()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def execute(program, use_jit):
+    out = io.StringIO()
+    machine = Machine(program, out, use_jit)
+    machine.run()
+    return machine.steps, out.getvalue()
+
+
+def run_suite(scale, repeat):
+    """Run every benchmark at `scale` and return {name: result}."""
+    results = {}
+
+    def record(name, size, unit, seconds, peak):
+        results[name] = {
+            "size": size,
+            "unit": unit,
+            "seconds": seconds,
+            "throughput": size / seconds,
+            "peak_bytes": peak,
+        }
+        print(f"{name:<18} {size:>9} {unit:<12} {seconds:8.3f}s  {size / seconds:>14,.0f} {unit}/sec  "
+              f"peak {peak / 1024:10.1f} KiB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # C source -> assembly. The wide encoding keeps large programs in branch range.
+        c_file = os.path.join(tmp, "generated.c")
+        with open(c_file, "w") as outfile:
+            outfile.write(generate_c(scale))
+        with open(c_file) as infile:
+            c_lines = sum(1 for _ in infile)
+        seconds, peak, asm_code = measure(lambda: c_to_asm_final_file(c_file, None, OPT_LEVEL, WIDE), repeat)
+        record("compile", c_lines, "lines", seconds, peak)
+
+        # The compiled program, assembled and run; its output is checked against the source.
+        compiled_asm = os.path.join(tmp, "generated.asm")
+        compiled_bin = os.path.join(tmp, "generated.bin")
+        with open(compiled_asm, "w") as outfile:
+            outfile.write(asm_code)
+        with contextlib.redirect_stdout(io.StringIO()):
+            assemble(compiled_asm, compiled_bin, op_codes, registers, encoding=WIDE)
+        program = load_program(compiled_bin)
+        for name, use_jit in (("execute", False), ("execute_jit", True)):
+            seconds, peak, (steps, output) = measure(lambda: execute(program, use_jit), repeat)
+            assert output == expected_output(scale), f"{name}: generated program printed the wrong output"
+            record(name, steps, "instructions", seconds, peak)
+
+        # Synthetic assembly with labels and strings -> image.
+        asm_file = os.path.join(tmp, "synthetic.asm")
+        with open(asm_file, "w") as outfile:
+            outfile.write(synthetic_asm(scale * WORDS_PER_UNIT))
+        with open(asm_file) as infile:
+            asm_lines = sum(1 for _ in infile)
+        bin_file = os.path.join(tmp, "synthetic.bin")
+        seconds, peak, _ = measure(lambda: assemble(asm_file, bin_file, op_codes, registers), repeat)
+        record("assemble", asm_lines, "lines", seconds, peak)
+
+        # .mc and .bin images of random words -> assembly.
+        words = scale * WORDS_PER_UNIT
+        mc_file = os.path.join(tmp, "synthetic_words.mc")
+        with open(mc_file, "w") as outfile:
+            outfile.writelines(text_from_word(word) + "\n" for word in synthetic_words(words))
+        image_file = os.path.join(tmp, "synthetic_words.bin")
+        write_image(image_file, array("I", synthetic_words(words)), ["message\n"])
+        out_file = os.path.join(tmp, "out.asm")
+        for name, source in (("disassemble_mc", mc_file), ("disassemble_bin", image_file)):
+            seconds, peak, _ = measure(lambda: disassemble(source, out_file), repeat)
+            record(name, words, "words", seconds, peak)
+
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, threshold):
+    """Print each benchmark against `baseline` and return the names that regressed."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<18} (not in baseline)")
+            continue
+        speed = result["throughput"] / before["throughput"]
+        memory = result["peak_bytes"] / before["peak_bytes"] if before["peak_bytes"] else 1.0
+        failed = speed < 1 - threshold or memory > 1 + threshold
+        print(f"{name:<18} throughput {speed:6.2f}x  peak memory {memory:6.2f}x  {'FAIL' if failed else 'ok'}")
+        if failed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv):
+    options = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    scale = int(options.get("scale", DEFAULT_SCALE))
+    repeat = int(options.get("repeat", 3))
+    threshold = float(options.get("threshold", DEFAULT_THRESHOLD))
+
+    baseline = None
+    if "baseline" in options:
+        try:
+            with open(options["baseline"]) as infile:
+                baseline = json.load(infile)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline '{options['baseline']}': {e}")
+            return 2
+        if baseline.get("version") != FORMAT_VERSION or baseline.get("scale") != scale:
+            print(f"Error: baseline '{options['baseline']}' was recorded with a different format or scale "
+                  f"(scale {baseline.get('scale')}, expected {scale})")
+            return 2
+
+    report = {
+        "version": FORMAT_VERSION,
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "scale": scale,
+        "repeat": repeat,
+        "results": run_suite(scale, repeat),
+    }
+
+    if "output" in options:
+        try:
+            with open(options["output"], "w") as outfile:
+                json.dump(report, outfile, indent=2)
+                outfile.write("\n")
+            print(f"Results written to '{options['output']}'")
+        except OSError as e:
+            print(f"Error writing to output file '{options['output']}': {e}")
+
+    if baseline is None:
+        return 0
+    print(f"\nagainst {options['baseline']} (commit {baseline.get('commit')}), threshold {threshold:.0%}:")
+    regressions = compare(baseline["results"], report["results"], threshold)
+    print(f"{len(regressions)} regression(s): {', '.join(regressions)}" if regressions else "no regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
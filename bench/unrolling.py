@@ -0,0 +1,57 @@
+"""Executed instructions of FizzBuzz loops with and without unrolling.
+
+The counted loop's `i % 3` / `i % 5` tests are folded away once the loop
+is unrolled by a multiple of 15 (or fully), so most of the per-iteration
+work disappears. Run from the repository root:  python -m bench.unrolling
+"""
+import os
+import io
+import tempfile
+import contextlib
+
+from assembler import assemble, op_codes, registers
+from compiler import generate, parse
+from isa import NARROW, WIDE
+from vm import Machine, load_program
+
+FACTORS = (1, 4, 15, 30)
+
+
+def measure(source, opt_level, unroll, encoding, tmp):
+    asm_file = os.path.join(tmp, "loop.asm")
+    bin_file = os.path.join(tmp, "loop.bin")
+    with open(asm_file, "w") as outfile:
+        outfile.write(generate(parse(source), opt_level=opt_level, encoding=encoding, unroll=unroll))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assemble(asm_file, bin_file, op_codes, registers, encoding=encoding)
+    program = load_program(bin_file)
+    out = io.StringIO()
+    machine = Machine(program, out)
+    machine.run()
+    return len(program), machine.steps, out.getvalue()
+
+
+def main():
+    with open("fizzbuzz.c") as infile:
+        fizzbuzz = infile.read()
+    cases = [
+        ("fizzbuzz.c (1..10)", fizzbuzz, NARROW),
+        ("fizzbuzz 1..60", fizzbuzz.replace("i <= 10", "i <= 60"), NARROW),
+        ("fizzbuzz 1..100, wide", fizzbuzz.replace("i <= 10", "i <= 100"), WIDE),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, source, encoding in cases:
+            print(name)
+            for opt_level in (0, 2):
+                baseline = None
+                for unroll in FACTORS:
+                    static, cycles, output = measure(source, opt_level, unroll, encoding, tmp)
+                    if baseline is None:
+                        baseline = cycles, output
+                    assert output == baseline[1], f"--unroll={unroll} changed the output"
+                    print(f"  -O{opt_level} --unroll={unroll:<3} {static:4d} instructions, {cycles:6d} cycles"
+                          f"  ({100 * (baseline[0] - cycles) / baseline[0]:5.1f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()
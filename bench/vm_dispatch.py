@@ -0,0 +1,84 @@
+"""Instructions/second for the vm dispatch loop and the JIT on a scaled FizzBuzz.
+
+Run from the repository root:  python -m bench.vm_dispatch [N]
+"""
+import sys
+import os
+import time
+import tempfile
+
+from assembler import assemble, op_codes, registers
+from vm import Machine, load_program
+
+
+def load_constant(reg, value, one_reg="R6"):
+    """YOLOAD only takes 6-bit immediates, so build larger constants by doubling."""
+    lines = [f"YOLOAD {one_reg}, 1(R0)", f"YOLOAD {reg}, 0(R0)"]
+    for bit in f"{value:b}":
+        lines.append(f"ADD {reg}, {reg}, {reg}")
+        if bit == "1":
+            lines.append(f"ADD {reg}, {reg}, {one_reg}")
+    return lines
+
+
+def scaled_fizzbuzz_asm(n):
+    lines = [
+        'FIZZBUZZ_MSG: .STRING "FizzBuzz\\n"',
+        'FIZZ_MSG: .STRING "Fizz\\n"',
+        'BUZZ_MSG: .STRING "Buzz\\n"',
+        "",
+        "YOLOAD R1, 1(R0)",
+    ]
+    lines += load_constant("R7", n)
+    lines += [
+        "YOLOAD R5, 3(R0)",
+        "YOLOAD R6, 5(R0)",
+        "LOOP_START_1:",
+        "MODULOIZE R2, R1, R5",
+        "MODULOIZE R3, R1, R6",
+        "SAMEBRO R2, R0, DIV3_1",
+        "SAMEBRO R3, R0, BUZZ_1",
+        "YELLVAL R1",
+        "YEET NEXT_1",
+        "DIV3_1:",
+        "SAMEBRO R3, R0, FIZZBUZZ_1",
+        "YELLSTR FIZZ_MSG",
+        "YEET NEXT_1",
+        "FIZZBUZZ_1:",
+        "YELLSTR FIZZBUZZ_MSG",
+        "YEET NEXT_1",
+        "BUZZ_1:",
+        "YELLSTR BUZZ_MSG",
+        "NEXT_1:",
+        "NOTGREATEROREQUAL R1, R7, LOOP_END_1",
+        "INCREMENT R1",
+        "YOLO LOOP_START_1",
+        "LOOP_END_1:",
+        "HALT",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def main(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_file = os.path.join(tmp, "fizzbuzz_scaled.asm")
+        mc_file = os.path.join(tmp, "fizzbuzz_scaled.mc")
+        with open(asm_file, "w") as outfile:
+            outfile.write(scaled_fizzbuzz_asm(n))
+        assemble(asm_file, mc_file, op_codes, registers)
+        program = load_program(mc_file, ["FizzBuzz\n", "Fizz\n", "Buzz\n"])
+
+    timings = {}
+    for label, use_jit in (("interpreter", False), ("jit", True)):
+        with open(os.devnull, "w") as sink:
+            machine = Machine(program, sink, use_jit)
+            start = time.perf_counter()
+            steps = machine.run()
+            elapsed = time.perf_counter() - start
+        timings[label] = elapsed
+        print(f"N={n} {label:<11}: {steps} instructions in {elapsed:.2f}s -> {steps / elapsed:,.0f} instructions/sec")
+    print(f"jit speedup: {timings['interpreter'] / timings['jit']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10**7)
@@ -0,0 +1,160 @@
+import sys
+import os
+import io
+import glob
+import time
+import contextlib
+from collections import namedtuple
+
+from assembler import assemble, op_codes, registers
+from buildcache import DEFAULT_DIR, BuildCache
+from compiler import c_to_asm_final_file
+from dissassmbler import disassemble
+from isa import NARROW, WIDE
+from pool import jobs_option, pool_map, worker_count
+
+STAGES = ("cache", "compile", "assemble", "disassemble")
+
+# Outcome of building one source file. `times` maps each stage that ran to
+# its wall time; `messages` is whatever the stages printed; `cache` is
+# "hit" or "miss", or None when the build cache is off.
+Result = namedtuple("Result", "source ok times outputs messages error cache", defaults=(None,))
+
+
+def collect_sources(patterns):
+    """Expand directories (searched recursively for .c files), globs and plain paths."""
+    sources = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            sources.extend(sorted(glob.glob(os.path.join(pattern, "**", "*.c"), recursive=True)))
+        else:
+            sources.extend(sorted(glob.glob(pattern, recursive=True)) or [pattern])
+    return list(dict.fromkeys(sources))
+
+
+def build_file(c_file, opt_level=0, binary=True, with_disassembly=False, cache=None, encoding=NARROW, unroll=1):
+    """Compile, assemble and optionally disassemble one file; never raises.
+
+    The stages report problems by printing "Error: ..." lines, so their
+    output is captured and a stage that printed one fails the file. With a
+    BuildCache, a source already built with the same options and toolchain
+    has its .asm, machine code and .dbg copied from the cache instead. The
+    .dbg sidecar makes the disassembly reproduce the .asm exactly.
+    """
+    base = os.path.splitext(c_file)[0]
+    asm_file = base + ".asm"
+    mc_file = base + (".bin" if binary else ".mc")
+    debug_file = base + ".dbg"
+    times = {}
+    outputs = []
+    log = io.StringIO()
+    artifacts = {".asm": asm_file, os.path.splitext(mc_file)[1]: mc_file, ".dbg": debug_file}
+    key = cache_state = None
+    if cache is not None:
+        try:
+            with open(c_file, "rb") as infile:
+                key = cache.key(infile.read(), opt_level, binary, encoding.version, unroll)
+        except OSError:
+            pass  # The compile stage reports the missing file
+
+    def run_stage(stage, work):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            result = work()
+        times[stage] = time.perf_counter() - start
+        return result and not any(line.startswith("Error") for line in log.getvalue().splitlines())
+
+    def compile_stage():
+        assembly = c_to_asm_final_file(c_file, None, opt_level, encoding, unroll)
+        if assembly is None:
+            return False
+        with open(asm_file, "w") as outfile:
+            outfile.write(assembly)
+        return True
+
+    try:
+        if key is not None and run_stage("cache", lambda: cache.fetch(key, artifacts)):
+            cache_state = "hit"
+            outputs.extend(artifacts.values())
+        else:
+            cache_state = "miss" if key is not None else None
+            if not run_stage("compile", compile_stage):
+                return Result(c_file, False, times, outputs, log.getvalue(), "compile failed", cache_state)
+            outputs.append(asm_file)
+            if not run_stage("assemble", lambda: assemble(asm_file, mc_file, op_codes, registers, None, debug_file, encoding) or True):
+                return Result(c_file, False, times, outputs, log.getvalue(), "assemble failed", cache_state)
+            outputs += [mc_file, debug_file]
+            if key is not None:
+                cache.store(key, artifacts)
+        if with_disassembly:
+            disassembled_file = base + "_disassembled.asm"
+            if not run_stage("disassemble", lambda: disassemble(mc_file, disassembled_file) or True):
+                return Result(c_file, False, times, outputs, log.getvalue(), "disassemble failed", cache_state)
+            outputs.append(disassembled_file)
+    except Exception as e:
+        return Result(c_file, False, times, outputs, log.getvalue(), f"{type(e).__name__}: {e}", cache_state)
+    return Result(c_file, True, times, outputs, log.getvalue(), None, cache_state)
+
+
+def _build_star(args):
+    return build_file(*args)
+
+
+def build(sources, jobs=None, opt_level=0, binary=True, with_disassembly=False, cache=None, encoding=NARROW,
+          unroll=1):
+    """Build every source across a process pool; returns (results, wall time).
+
+    Results come back in source order. Each file is built independently, so
+    one failure is recorded in its Result and the rest of the batch carries on.
+    """
+    tasks = [(source, opt_level, binary, with_disassembly, cache, encoding, unroll) for source in sources]
+    start = time.perf_counter()
+    workers = worker_count(jobs)
+    if workers == 1 or len(tasks) <= 1:
+        results = [build_file(*task) for task in tasks]
+    else:
+        results = pool_map(_build_star, tasks, workers)
+    return results, time.perf_counter() - start
+
+
+def report(results, wall_time, evicted=0):
+    for result in results:
+        if not result.ok:
+            print(f"FAILED {result.source}: {result.error}")
+            for line in result.messages.splitlines():
+                if line.startswith("Error"):
+                    print(f"    {line}")
+
+    built = sum(result.ok for result in results)
+    print(f"Built {built}/{len(results)} files in {wall_time:.2f}s "
+          f"({len(results) / wall_time if wall_time else 0:,.1f} files/sec)")
+    for stage in STAGES:
+        stage_times = [result.times[stage] for result in results if stage in result.times]
+        if stage_times:
+            total = sum(stage_times)
+            print(f"  {stage:<12} {len(stage_times):>6} files  {total:8.2f}s total  "
+                  f"{len(stage_times) / total if total else 0:>10,.1f} files/sec per process")
+    hits = sum(result.cache == "hit" for result in results)
+    misses = sum(result.cache == "miss" for result in results)
+    if hits or misses:
+        print(f"  cache: {hits} hits, {misses} misses ({100 * hits / (hits + misses):.1f}% hit rate), "
+              f"{evicted} evicted")
+    return built == len(results)
+
+
+if __name__ == "__main__":
+    # build.py [-O<n>] [-j<n>] [--unroll=<n>] [--text] [--wide] [--disassemble] [--no-cache] [--cache-dir=<dir>]
+    #          <directory | glob | file>...
+    args = sys.argv[1:]
+    opt_level = next((int(arg[2:]) for arg in args if arg.startswith("-O")), 0)
+    jobs = jobs_option(args)
+    cache_dir = next((arg.split("=", 1)[1] for arg in args if arg.startswith("--cache-dir=")), DEFAULT_DIR)
+    cache = None if "--no-cache" in args else BuildCache(cache_dir)
+    encoding = WIDE if "--wide" in args else NARROW
+    unroll = next((int(arg.split("=", 1)[1]) for arg in args if arg.startswith("--unroll=")), 1)
+    patterns = [arg for arg in args if not arg.startswith("-")] or ["addition.c", "conditional.c", "fizzbuzz.c"]
+    sources = collect_sources(patterns)
+    results, wall_time = build(sources, jobs, opt_level, "--text" not in args, "--disassemble" in args, cache,
+                               encoding, unroll)
+    evicted = cache.evict() if cache is not None else 0
+    sys.exit(0 if report(results, wall_time, evicted) else 1)
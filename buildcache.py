@@ -0,0 +1,105 @@
+import os
+import shutil
+import hashlib
+import tempfile
+
+# Content-addressed store for build artifacts. An entry is keyed by a hash
+# of the source text, the build options and the toolchain itself, so any
+# edit to the compiler or assembler invalidates every entry at once:
+#
+#   <cache dir>/<key[:2]>/<key>/artifact.asm
+#                               artifact.bin   (or artifact.mc)
+#                               artifact.dbg
+#
+# Entries are written to a temporary directory and renamed into place, so
+# concurrent build workers never see a half-written entry. A hit refreshes
+# the entry's mtime, which is what evict() uses as its LRU order.
+DEFAULT_DIR = ".build-cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+TOOLCHAIN_FILES = ("compiler.py", "optimizer.py", "assembler.py", "isa.py", "ir.py", "mcimage.py", "debuginfo.py")
+
+_toolchain_version = None
+
+
+def toolchain_version():
+    """Hash of the toolchain sources; part of every cache key."""
+    global _toolchain_version
+    if _toolchain_version is None:
+        digest = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in TOOLCHAIN_FILES:
+            with open(os.path.join(here, name), "rb") as infile:
+                digest.update(name.encode() + b"\0" + infile.read() + b"\0")
+        _toolchain_version = digest.hexdigest()
+    return _toolchain_version
+
+
+class BuildCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source: bytes, *options) -> str:
+        digest = hashlib.sha256(toolchain_version().encode())
+        digest.update(repr(options).encode() + b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key, destinations) -> bool:
+        """Copy a cached entry's artifacts to `destinations` ({suffix: path}).
+
+        Returns False, copying nothing, unless every artifact is cached.
+        """
+        entry = self._entry(key)
+        artifacts = {suffix: os.path.join(entry, "artifact" + suffix) for suffix in destinations}
+        if not all(os.path.isfile(path) for path in artifacts.values()):
+            return False
+        for suffix, path in artifacts.items():
+            shutil.copyfile(path, destinations[suffix])
+        try:
+            os.utime(entry)
+        except OSError:
+            pass  # Evicted meanwhile; the copies above are already complete
+        return True
+
+    def store(self, key, artifacts):
+        """Add the files in `artifacts` ({suffix: path}) under `key`."""
+        entry = self._entry(key)
+        if os.path.isdir(entry):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(entry))
+        try:
+            for suffix, path in artifacts.items():
+                shutil.copyfile(path, os.path.join(staging, "artifact" + suffix))
+            os.rename(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)  # Another worker stored it first
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits max_bytes; returns how many."""
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".staging-"):
+                    continue
+                size = sum(artifact.stat().st_size for artifact in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total += size
+
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        return evicted
@@ -1,15 +1,526 @@
 import re
 import sys
 import os
+from collections import namedtuple
+from math import gcd
 
-def c_to_asm_final_file(input_filename):
-    try:
-        with open(input_filename, 'r') as infile:
-            c_code = infile.read()
-    except FileNotFoundError:
-        print(f"Error: Input file '{input_filename}' not found.")
+from ir import R0, AsmProgram, Instruction, Op, format_program, is_virtual, label, virtual
+from isa import NARROW, WIDE
+from optimizer import IMMEDIATE_MAX, block_liveness, build_blocks, defs_and_uses, is_move, loop_depths, optimize
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+KEYWORDS = ("int", "if", "else", "for", "while", "return", "printf")
+OPERATORS = ("++", "&&", "||", "<=", ">=", "==", "!=") + tuple("-+*/%<>=!;,(){}")
+
+# findall() skips anything unmatched, so spaces and tabs never produce tokens;
+# newlines are matched only to count lines and `\S` catches stray characters.
+TOKEN_RE = re.compile(r"""
+    //[^\n]*|/\*.*?\*/
+  | \d+
+  | [A-Za-z_]\w*
+  | "(?:[^"\\\n]|\\.)*"
+  | \+\+|&&|\|\||<=|>=|==|!=|[-+*/%<>=!;,(){}]
+  | \n
+  | \S
+""", re.VERBOSE | re.DOTALL)
+
+# Keywords and operators are their own token kind.
+FIXED_KINDS = {value: value for value in KEYWORDS + OPERATORS}
+
+
+def tokenize(c_code):
+    """Split C source into (kind, value, line) tokens in a single left-to-right scan."""
+    line = 1
+    tokens = []
+    append = tokens.append
+    fixed_kinds = FIXED_KINDS
+    for value in TOKEN_RE.findall(c_code):
+        kind = fixed_kinds.get(value)
+        if kind is None:
+            first = value[0]
+            if first == "\n":
+                line += 1
+                continue
+            if first.isdigit():
+                kind = "NUMBER"
+            elif first.isalpha() or first == "_":
+                kind = "NAME"
+            elif first == '"':
+                kind = "STRING"
+            elif value.startswith(("//", "/*")):
+                line += value.count("\n")
+                continue
+            else:
+                raise ValueError(f"Line {line}: unexpected character {value!r}")
+        append((kind, value, line))
+    append(("EOF", "", line))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+
+Block = namedtuple("Block", "statements")
+Function = namedtuple("Function", "name body")
+VarDecl = namedtuple("VarDecl", "name value line")
+Assign = namedtuple("Assign", "name value line")
+Increment = namedtuple("Increment", "name line")
+Printf = namedtuple("Printf", "text arg line")
+If = namedtuple("If", "cond then otherwise")
+For = namedtuple("For", "init cond step body")
+While = namedtuple("While", "cond body")
+Return = namedtuple("Return", "value")
+
+Num = namedtuple("Num", "value")
+Var = namedtuple("Var", "name line")
+BinOp = namedtuple("BinOp", "op left right line")
+Not = namedtuple("Not", "operand")
+
+# Binary operator binding strength; higher binds tighter.
+PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "==": 3, "!=": 3,
+    "<": 4, "<=": 4, ">": 4, ">=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6, "%": 6,
+}
+
+
+class Parser:
+    """Recursive-descent parser for the C subset the toolchain understands.
+
+    Tokens are (kind, value, line) tuples; their kinds are also kept in a
+    separate list so lookahead is a single index.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.kinds = [token[0] for token in tokens]
+        self.pos = 0
+
+    def peek(self, offset=0):
+        """The kind of the token `offset` places ahead; "EOF" past the end."""
+        index = self.pos + offset
+        return self.kinds[index] if index < len(self.kinds) else "EOF"
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def accept(self, kind):
+        if self.kinds[self.pos] == kind:
+            self.pos += 1
+            return self.tokens[self.pos - 1]
         return None
 
+    def expect(self, kind):
+        if self.kinds[self.pos] != kind:
+            _, value, line = self.tokens[self.pos]
+            raise ValueError(f"Line {line}: expected '{kind}' but found '{value or 'end of file'}'")
+        self.pos += 1
+        return self.tokens[self.pos - 1]
+
+    def parse_program(self):
+        statements = []
+        kinds = self.kinds
+        while kinds[self.pos] != "EOF":
+            # `int main() { ... }`: the toolchain has no calls, so functions
+            # simply run in source order.
+            if kinds[self.pos] == "int" and self.peek(2) == "(":
+                self.pos += 1
+                name = self.expect("NAME")[1]
+                self.expect("(")
+                self.expect(")")
+                statements.append(Function(name, self.parse_block()))
+            else:
+                statements.append(self.parse_statement())
+        return Block(statements)
+
+    def parse_block(self):
+        self.expect("{")
+        statements = []
+        kinds = self.kinds
+        while kinds[self.pos] != "}":
+            if kinds[self.pos] == "EOF":
+                self.expect("}")
+            statements.append(self.parse_statement())
+        self.pos += 1
+        return Block(statements)
+
+    def parse_statement(self):
+        kind = self.kinds[self.pos]
+        if kind == "{":
+            return self.parse_block()
+        if kind == "if":
+            return self.parse_if()
+        if kind == "for":
+            return self.parse_for()
+        if kind == "while":
+            self.pos += 1
+            self.expect("(")
+            cond = self.parse_expression()
+            self.expect(")")
+            return While(cond, self.parse_statement())
+        if kind == "return":
+            self.pos += 1
+            value = None if self.kinds[self.pos] == ";" else self.parse_expression()
+            self.expect(";")
+            return Return(value)
+        if kind == "printf":
+            statement = self.parse_printf()
+        else:
+            statement = self.parse_simple()
+        self.expect(";")
+        return statement
+
+    def parse_simple(self):
+        """Declarations, assignments and increments: the pieces a for header reuses."""
+        declaration = self.accept("int")
+        _, name, line = self.expect("NAME")
+        if declaration:
+            value = self.parse_expression() if self.accept("=") else None
+            return VarDecl(name, value, line)
+        if self.accept("++"):
+            return Increment(name, line)
+        self.expect("=")
+        return Assign(name, self.parse_expression(), line)
+
+    def parse_printf(self):
+        line = self.advance()[2]
+        self.expect("(")
+        text = self.expect("STRING")[1][1:-1]
+        arg = self.parse_expression() if self.accept(",") else None
+        self.expect(")")
+        return Printf(text, arg, line)
+
+    def parse_if(self):
+        self.pos += 1
+        self.expect("(")
+        cond = self.parse_expression()
+        self.expect(")")
+        then = self.parse_statement()
+        otherwise = self.parse_statement() if self.accept("else") else None
+        return If(cond, then, otherwise)
+
+    def parse_for(self):
+        self.pos += 1
+        self.expect("(")
+        init = None if self.kinds[self.pos] == ";" else self.parse_simple()
+        self.expect(";")
+        cond = None if self.kinds[self.pos] == ";" else self.parse_expression()
+        self.expect(";")
+        step = None if self.kinds[self.pos] == ")" else self.parse_simple()
+        self.expect(")")
+        return For(init, cond, step, self.parse_statement())
+
+    def parse_expression(self, min_precedence=1):
+        """Precedence climbing: one call per operand rather than one per level."""
+        left = self.parse_unary()
+        kinds = self.kinds
+        while True:
+            precedence = PRECEDENCE.get(kinds[self.pos])
+            if precedence is None or precedence < min_precedence:
+                return left
+            _, op, line = self.advance()
+            right = self.parse_expression(precedence + 1)
+            left = BinOp(op, left, right, line)
+
+    def parse_unary(self):
+        if self.accept("!"):
+            return Not(self.parse_unary())
+        kind, value, line = self.advance()
+        if kind == "NUMBER":
+            return Num(int(value))
+        if kind == "NAME":
+            return Var(value, line)
+        if kind == "(":
+            expr = self.parse_expression()
+            self.expect(")")
+            return expr
+        raise ValueError(f"Line {line}: expected an expression but found '{value or 'end of file'}'")
+
+
+def parse(c_code):
+    return Parser(tokenize(c_code)).parse_program()
+
+
+# ---------------------------------------------------------------------------
+# Loop transformations
+# ---------------------------------------------------------------------------
+
+# Counted loops, `for (i = a; i < b; i++)` (or `<=`) whose body never writes
+# `i`, are rewritten on the AST before code generation:
+#
+#   unrolling            with constant bounds and an unroll factor above 1,
+#                        loops of at most that many iterations are copied out
+#                        in full with `i` replaced by its value; longer ones
+#                        run a loop of several copies per test, then the
+#                        leftover iterations as constant copies
+#   strength reduction   `i % k` in the body becomes a rolling counter that
+#                        is bumped alongside `i`, or a constant per copy when
+#                        the unrolled loop steps by a multiple of k
+#
+# Substituted constants are folded, and an `if` whose condition folds away
+# keeps only the branch that runs.
+
+FOLDABLE = {
+    "+": lambda a, b: a + b,
+    "%": lambda a, b: a % b if b else None,
+    "<": lambda a, b: int(a < b),
+    "<=": lambda a, b: int(a <= b),
+    ">": lambda a, b: int(a > b),
+    ">=": lambda a, b: int(a >= b),
+    "==": lambda a, b: int(a == b),
+    "!=": lambda a, b: int(a != b),
+    "&&": lambda a, b: int(bool(a and b)),
+    "||": lambda a, b: int(bool(a or b)),
+}
+
+
+def rewrite_expression(node, replace, immediate_max):
+    """Apply `replace` to every subexpression, innermost first, folding constants up to `immediate_max`."""
+    if isinstance(node, BinOp):
+        node = node._replace(left=rewrite_expression(node.left, replace, immediate_max),
+                             right=rewrite_expression(node.right, replace, immediate_max))
+    elif isinstance(node, Not):
+        node = node._replace(operand=rewrite_expression(node.operand, replace, immediate_max))
+    replaced = replace(node)
+    node = node if replaced is None else replaced
+    if isinstance(node, Not) and isinstance(node.operand, Num):
+        return Num(int(not node.operand.value))
+    if isinstance(node, BinOp) and isinstance(node.left, Num) and isinstance(node.right, Num) and node.op in FOLDABLE:
+        value = FOLDABLE[node.op](node.left.value, node.right.value)
+        if value is not None and value <= immediate_max:
+            return Num(value)
+    return node
+
+
+def rewrite_statement(node, replace, immediate_max):
+    """rewrite_expression() over every expression of a statement tree, dropping dead `if` branches."""
+    def statement(node):
+        return None if node is None else rewrite_statement(node, replace, immediate_max)
+
+    def expression(node):
+        return rewrite_expression(node, replace, immediate_max)
+
+    if isinstance(node, Block):
+        return Block([statement(child) for child in node.statements])
+    if isinstance(node, (VarDecl, Assign)) and node.value is not None:
+        return node._replace(value=expression(node.value))
+    if isinstance(node, Printf) and node.arg is not None:
+        return node._replace(arg=expression(node.arg))
+    if isinstance(node, Return) and node.value is not None:
+        return node._replace(value=expression(node.value))
+    if isinstance(node, If):
+        cond = expression(node.cond)
+        if isinstance(cond, Num):
+            taken = node.then if cond.value else node.otherwise
+            return statement(taken) if taken is not None else Block([])
+        return If(cond, statement(node.then), statement(node.otherwise))
+    if isinstance(node, For):
+        cond = None if node.cond is None else expression(node.cond)
+        return For(statement(node.init), cond, statement(node.step), statement(node.body))
+    if isinstance(node, While):
+        return While(expression(node.cond), statement(node.body))
+    return node
+
+
+def walk(node):
+    """Every statement and expression node under `node`, itself included."""
+    if node is None:
+        return
+    yield node
+    if isinstance(node, (Block, Function)):
+        children = node.statements if isinstance(node, Block) else [node.body]
+    elif isinstance(node, BinOp):
+        children = [node.left, node.right]
+    else:
+        children = [getattr(node, field) for field in node._fields
+                    if field in ("value", "arg", "cond", "then", "otherwise", "init", "step", "body", "operand")]
+    for child in children:
+        if isinstance(child, tuple):
+            yield from walk(child)
+
+
+def is_modulo_of(node, name):
+    return (isinstance(node, BinOp) and node.op == "%" and isinstance(node.left, Var) and node.left.name == name
+            and isinstance(node.right, Num) and node.right.value > 0)
+
+
+def counted_loop(node):
+    """(variable, start, exclusive limit or None) for a counted loop, else None.
+
+    The limit is only known when both bounds are constants.
+    """
+    init, cond, step = node.init, node.cond, node.step
+    if not isinstance(init, (VarDecl, Assign)) or init.value is None:
+        return None
+    name = init.name
+    if not (isinstance(step, Increment) and step.name == name):
+        return None
+    if not (isinstance(cond, BinOp) and cond.op in ("<", "<=") and isinstance(cond.left, Var)
+            and cond.left.name == name):
+        return None
+    if any(isinstance(child, (VarDecl, Assign, Increment)) and child.name == name for child in walk(node.body)):
+        return None
+    limit = None
+    if isinstance(init.value, Num) and isinstance(cond.right, Num):
+        limit = cond.right.value + (cond.op == "<=")
+    return name, init.value, limit
+
+
+def transform_loops(node, unroll=1, reduce_modulo=False, immediate_max=IMMEDIATE_MAX):
+    """Unroll counted loops by up to `unroll` copies and, with `reduce_modulo`, strength-reduce `i % k`.
+
+    Constants are only introduced up to `immediate_max`, so everything
+    still loads with a single YOLOAD.
+    """
+    def transform(node):
+        return None if node is None else transform_loops(node, unroll, reduce_modulo, immediate_max)
+
+    if isinstance(node, Block):
+        return Block([transform(statement) for statement in node.statements])
+    if isinstance(node, Function):
+        return node._replace(body=transform(node.body))
+    if isinstance(node, If):
+        return If(node.cond, transform(node.then), transform(node.otherwise))
+    if isinstance(node, While):
+        return node._replace(body=transform(node.body))
+    if not isinstance(node, For):
+        return node
+
+    has_inner_loop = any(isinstance(child, (For, While)) for child in walk(node.body))
+    node = node._replace(body=transform(node.body))
+    loop = counted_loop(node)
+    if loop is None:
+        return node
+    name, start, limit = loop
+    moduli = {}
+    for child in walk(node.body):
+        if is_modulo_of(child, name):
+            moduli[child.right.value] = moduli.get(child.right.value, 0) + 1
+
+    def constant_copy(value):
+        return rewrite_statement(node.body, lambda expr: Num(value) if isinstance(expr, Var) and expr.name == name
+                                 else None, immediate_max)
+
+    if unroll > 1 and limit is not None and not has_inner_loop and max(limit, start.value) <= immediate_max:
+        start = start.value
+        count = max(0, limit - start)
+        if count <= unroll:
+            return Block([constant_copy(start + offset) for offset in range(count)]
+                         + [node.init._replace(value=Num(start + count))])
+
+        # A step that is a multiple of every modulus gives each copy constant remainders.
+        period = 1
+        for modulus in moduli:
+            period = period * modulus // gcd(period, modulus)
+        stride = unroll // period * period if period <= unroll else unroll
+        remainders = stride % period == 0
+        counters = {} if remainders or not reduce_modulo else rolling_counters(name, moduli)
+        main_count = count // stride * stride
+
+        copies = []
+        bump = bump_counters(node.step, counters)
+        for offset in range(stride):
+            if remainders:
+                residues = {modulus: Num((start + offset) % modulus) for modulus in moduli}
+            else:
+                residues = {modulus: Var(counter, None) for modulus, counter in counters.items()}
+            copies.append(replace_modulo(node.body, name, residues, immediate_max))
+            if offset < stride - 1:
+                copies.append(bump)
+        main = For(Block([node.init] + counter_inits(name, counters)),
+                   BinOp("<", Var(name, None), Num(start + main_count), None), bump, Block(copies))
+        leftover = [constant_copy(start + offset) for offset in range(main_count, count)]
+        if leftover:
+            leftover.append(Assign(name, Num(start + count), None))
+        return Block([main] + leftover)
+
+    if reduce_modulo:
+        counters = rolling_counters(name, moduli)
+        if counters:
+            residues = {modulus: Var(counter, None) for modulus, counter in counters.items()}
+            return For(Block([node.init] + counter_inits(name, counters)), node.cond,
+                       bump_counters(node.step, counters), replace_modulo(node.body, name, residues, immediate_max))
+    return node
+
+
+def rolling_counters(name, moduli):
+    """Counter variables for the moduli worth one.
+
+    A counter costs an increment and a test every iteration and saves one
+    MODULOIZE per use, so it only pays off for a remainder the body
+    computes at least three times.
+    """
+    return {modulus: f"{name}%{modulus}" for modulus, uses in sorted(moduli.items()) if uses >= 3}
+
+
+def counter_inits(name, counters):
+    return [VarDecl(counter, BinOp("%", Var(name, None), Num(modulus), None), None)
+            for modulus, counter in counters.items()]
+
+
+def bump_counters(step, counters):
+    """The loop step followed by `c++; if (c >= k) c = 0;` for every counter."""
+    statements = [step]
+    for modulus, counter in counters.items():
+        statements += [Increment(counter, None),
+                       If(BinOp(">=", Var(counter, None), Num(modulus), None), Assign(counter, Num(0), None), None)]
+    return Block(statements) if counters else step
+
+
+def replace_modulo(body, name, residues, immediate_max):
+    return rewrite_statement(body, lambda expr: residues.get(expr.right.value) if is_modulo_of(expr, name) else None,
+                             immediate_max)
+
+
+# ---------------------------------------------------------------------------
+# Code generation
+# ---------------------------------------------------------------------------
+
+# Branch instruction and operand order taking the jump when `a <op> b` holds.
+# `!=` has no single-instruction form and is lowered as a skipped SAMEBRO.
+BRANCHES = {
+    ">": (Op.GREATERTHAN, False),
+    "<": (Op.GREATERTHAN, True),
+    ">=": (Op.NOTGREATEROREQUAL, False),
+    "<=": (Op.NOTGREATEROREQUAL, True),
+    "==": (Op.SAMEBRO, False),
+}
+NEGATED = {">": "<=", "<": ">=", ">=": "<", "<=": ">", "==": "!=", "!=": "=="}
+ARITHMETIC = {"+": Op.ADD, "%": Op.MODULOIZE}
+TOP_LEVEL = "<top level>"
+
+
+def generate(program, stats=None, opt_level=0, encoding=NARROW, unroll=1):
+    """Lower an AST to assembly text; see lower()."""
+    return format_program(lower(program, stats, opt_level, encoding, unroll))
+
+
+def lower(program, stats=None, opt_level=0, encoding=NARROW, unroll=1):
+    """Lower an AST to an ir.AsmProgram. R0 is kept at zero throughout.
+
+    Code is emitted as ir.Instructions, never as text, over unlimited
+    virtual registers (V1, V2, ...) which allocate_registers() then maps
+    onto R1..R7, one function at a time; statements outside any function
+    form their own unit. If `stats`
+    is a dict it receives the allocator's report keyed by function name.
+    `opt_level` selects the optimizer.optimize() pipeline run on the
+    virtual-register code before allocation. `encoding` is the isa encoding
+    the output will be assembled with; it bounds the constants a YOLOAD
+    can load. Counted loops are unrolled up to `unroll` copies, and -O2
+    strength-reduces their `i % k` (see transform_loops()).
+    """
+    immediate_max = (1 << encoding.immediate.bits) - 1
+    if unroll > 1 or opt_level >= 2:
+        program = transform_loops(program, unroll, opt_level >= 2, immediate_max)
     asm_code = []
     var_to_reg = {}
     next_reg = 1
@@ -18,229 +529,392 @@ def c_to_asm_final_file(input_filename):
 
     def get_free_register():
         nonlocal next_reg
-        if next_reg <= 7:
-            reg = f"R{next_reg}"
-            next_reg += 1
-            return reg
-        else:
-            raise ValueError("Out of registers!")
+        reg = virtual(next_reg)
+        next_reg += 1
+        return reg
 
-    def get_variable_register(var_name):
-        if var_name not in var_to_reg:
-            var_to_reg[var_name] = get_free_register()
-        return var_to_reg[var_name]
+    def get_variable_register(name, line):
+        if name not in var_to_reg:
+            raise ValueError(f"Line {line}: '{name}' is not declared")
+        return var_to_reg[name]
 
     def create_label(prefix="LABEL"):
         nonlocal label_counter
         label_counter += 1
         return f"{prefix}_{label_counter}"
 
-    lines = [l.strip() for l in c_code.strip().splitlines() if l.strip()]
-    loop_stack = []
-    if_stack = []
-
-    # Add standard string literals for FizzBuzz ONLY if processing fizzbuzz.c
-    if "fizzbuzz.c" in input_filename:
-        string_literals.update({
-            'FIZZBUZZ_MSG': 'FizzBuzz\n',
-            'FIZZ_MSG': 'Fizz\n',
-            'BUZZ_MSG': 'Buzz\n'
-        })
-
-    for line in lines:
-        line = line.strip(';').strip()
-
-        # Variable declaration with initialization
-        var_init_match = re.match(r'int\s+(\w+)\s*=\s*(\d+)', line)
-        if var_init_match:
-            var, value = var_init_match.groups()
-            reg = get_variable_register(var)
-            asm_code.append(f"YOLOAD {reg}, {value}(R0)")
-            continue
-
-        # Variable declaration without initialization
-        var_decl_match = re.match(r'int\s+(\w+)', line)
-        if var_decl_match:
-            var = var_decl_match.groups()[0]
-            get_variable_register(var)
-            continue
+    def gen_expr(node, dest=None):
+        """Emit code computing `node`; return the register holding the result."""
+        if isinstance(node, Num):
+            if node.value == 0 and dest is None:
+                return R0
+            if node.value > immediate_max:
+                raise ValueError(f"Constant {node.value} does not fit a {encoding.immediate.bits}-bit immediate "
+                                 f"in the {encoding.name} encoding")
+            reg = dest if dest is not None else get_free_register()
+            asm_code.append(Instruction(Op.YOLOAD, (reg,), node.value))
+            return reg
+        if isinstance(node, Var):
+            reg = get_variable_register(node.name, node.line)
+            if dest is not None and dest != reg:
+                asm_code.append(Instruction(Op.ADD, (dest, reg, R0)))
+                return dest
+            return reg
+        if isinstance(node, BinOp) and node.op in ARITHMETIC:
+            left = gen_expr(node.left)
+            right = gen_expr(node.right)
+            reg = dest if dest is not None else get_free_register()
+            asm_code.append(Instruction(ARITHMETIC[node.op], (reg, left, right)))
+            return reg
+        line = getattr(node, "line", "?")
+        raise ValueError(f"Line {line}: expression cannot be computed into a register")
 
-        # Addition
-        add_match = re.match(r'(\w+)\s*=\s*(\w+)\s*\+\s*(\w+)', line)
-        if add_match:
-            dest, src1, src2 = add_match.groups()
-            reg_dest = get_variable_register(dest)
-            reg_src1 = get_variable_register(src1)
-            reg_src2 = get_variable_register(src2)
-            asm_code.append(f"ADD {reg_dest}, {reg_src1}, {reg_src2}")
-            continue
+    def gen_branch(cond, target, when=True):
+        """Jump to `target` when `cond` evaluates to `when`; fall through otherwise."""
+        if isinstance(cond, Not):
+            gen_branch(cond.operand, target, not when)
+            return
+        if isinstance(cond, BinOp) and cond.op in ("&&", "||"):
+            # A && B jumps on true only if both hold; on false if either fails.
+            short_circuit_on = cond.op == "||"
+            if when == short_circuit_on:
+                gen_branch(cond.left, target, when)
+                gen_branch(cond.right, target, when)
+            else:
+                skip = create_label("SKIP")
+                gen_branch(cond.left, skip, not when)
+                gen_branch(cond.right, target, when)
+                asm_code.append(label(skip))
+            return
+        if isinstance(cond, BinOp) and cond.op in NEGATED:
+            op, left, right = cond.op, cond.left, cond.right
+        else:
+            op, left, right = "!=", cond, Num(0)
+        if not when:
+            op = NEGATED[op]
 
-        # If statement (single condition)
-        if_match = re.match(r'if\s*\(\s*(\w+)\s*>\s*(\d+)\s*\)', line)
-        if if_match:
-            var, value = if_match.groups()
-            reg = get_variable_register(var)
-            compare_reg = get_free_register()
-            if_body_label = create_label("IF_BODY")
-            if_end_label = create_label("END_IF")
-            if_stack.append(if_end_label)
-            asm_code.append(f"YOLOAD {compare_reg}, {value}(R0)")
-            asm_code.append(f"GREATERTHAN {reg}, {compare_reg}, {if_body_label}")
-            asm_code.append(f"YEET {if_end_label}")
-            asm_code.append(f"{if_body_label}:")
-            continue
+        left_reg = gen_expr(left)
+        right_reg = gen_expr(right)
+        if op == "!=":
+            skip = create_label("SKIP")
+            asm_code.append(Instruction(Op.SAMEBRO, (left_reg, right_reg), symbol=skip))
+            asm_code.append(Instruction(Op.YEET, symbol=target))
+            asm_code.append(label(skip))
+            return
+        instruction, swap = BRANCHES[op]
+        if swap:
+            left_reg, right_reg = right_reg, left_reg
+        asm_code.append(Instruction(instruction, (left_reg, right_reg), symbol=target))
 
-        # printf
-        print_match = re.match(r'printf\s*\(\s*"([^"]+)"(?:,\s*(\w+))?\s*\)', line)
-        if print_match:
-            text, var = print_match.groups()
-            if "%d" in text and var:
-                reg = get_variable_register(var)
-                asm_code.append(f"YELLVAL {reg}")
+    def gen_statement(node):
+        if isinstance(node, Block):
+            for statement in node.statements:
+                gen_statement(statement)
+        elif isinstance(node, VarDecl):
+            if node.name not in var_to_reg:
+                var_to_reg[node.name] = get_free_register()
+            if node.value is not None:
+                gen_expr(node.value, var_to_reg[node.name])
+        elif isinstance(node, Assign):
+            gen_expr(node.value, get_variable_register(node.name, node.line))
+        elif isinstance(node, Increment):
+            asm_code.append(Instruction(Op.INCREMENT, (get_variable_register(node.name, node.line),)))
+        elif isinstance(node, Printf):
+            if "%d" in node.text and node.arg is not None:
+                asm_code.append(Instruction(Op.YELLVAL, (gen_expr(node.arg),)))
             else:
-                if text not in string_literals.values():
+                if node.text not in string_literals.values():
                     label_name = f"CUSTOM_MSG_{len(string_literals)}"
-                    string_literals[label_name] = text
+                    string_literals[label_name] = node.text
                 else:
-                    label_name = next(k for k, v in string_literals.items() if v == text)
-                asm_code.append(f"YELLSTR {label_name}")
-            continue
-
-        # For loop (FizzBuzz)
-        for_match = re.match(r'for\s*\(\s*int\s+(\w+)\s*=\s*(\d+)\s*;\s*\1\s*(<=|<)\s*(\d+)\s*;\s*\1\+\+\s*\)', line)
-        if for_match:
-            var, start, op, end = for_match.groups()
-            var_reg = get_variable_register(var)
+                    label_name = next(k for k, v in string_literals.items() if v == node.text)
+                asm_code.append(Instruction(Op.YELLSTR, symbol=label_name))
+        elif isinstance(node, If):
+            end_if = create_label("END_IF")
+            if node.otherwise is None:
+                gen_branch(node.cond, end_if, False)
+                gen_statement(node.then)
+            else:
+                else_label = create_label("ELSE")
+                gen_branch(node.cond, else_label, False)
+                gen_statement(node.then)
+                asm_code.append(Instruction(Op.YEET, symbol=end_if))
+                asm_code.append(label(else_label))
+                gen_statement(node.otherwise)
+            asm_code.append(label(end_if))
+        elif isinstance(node, (For, While)):
             loop_start = create_label("LOOP_START")
             loop_end = create_label("LOOP_END")
-            loop_stack.append((var, var_reg, op, end, loop_start, loop_end))
-            asm_code.append(f"YOLOAD {var_reg}, {start}(R0)")
-            asm_code.append(f"{loop_start}:")
-            continue
+            if isinstance(node, For) and node.init is not None:
+                gen_statement(node.init)
+            asm_code.append(label(loop_start))
+            if node.cond is not None:
+                gen_branch(node.cond, loop_end, False)
+            gen_statement(node.body)
+            if isinstance(node, For) and node.step is not None:
+                gen_statement(node.step)
+            asm_code.append(Instruction(Op.YOLO, symbol=loop_start))
+            asm_code.append(label(loop_end))
+        elif isinstance(node, Return):
+            asm_code.append(Instruction(Op.HALT))
 
-        # If with && logic (FizzBuzz)
-        if_match_fizzbuzz = re.match(r'if\s*\(\s*(\w+)\s*%\s*(\d+)\s*==\s*0\s*&&\s*(\w+)\s*%\s*(\d+)\s*==\s*0\s*\)', line)
-        if if_match_fizzbuzz:
-            var1, mod1, var2, mod2 = if_match_fizzbuzz.groups()
-            reg = get_variable_register(var1)
-            temp1 = get_free_register()
-            temp2 = get_free_register()
-            fizzbuzz_label = create_label("FIZZBUZZ")
-            skip_fizzbuzz = create_label("SKIP_FIZZBUZZ")
-            end_if = create_label("END_IF")
-            if_stack.append(end_if)
-
-            # First condition (i % 3 == 0)
-            asm_code.append(f"YOLOAD R0, {mod1}(R0)")
-            asm_code.append(f"MODULOIZE {temp1}, {reg}, R0")
-            asm_code.append(f"SAMEBRO {temp1}, R0, {create_label('CHECK_SECOND')}")
-            asm_code.append(f"YEET {skip_fizzbuzz}")
-            asm_code.append(f"{asm_code[-2].split()[-1]}:")
-
-            # Second condition (i % 5 == 0)
-            asm_code.append(f"YOLOAD R0, {mod2}(R0)")
-            asm_code.append(f"MODULOIZE {temp2}, {reg}, R0")
-            asm_code.append(f"SAMEBRO {temp2}, R0, {fizzbuzz_label}")
-            asm_code.append(f"YEET {skip_fizzbuzz}")
-            asm_code.append(f"{fizzbuzz_label}:")
-            asm_code.append(f"YELLSTR FIZZBUZZ_MSG")
-            asm_code.append(f"YEET {end_if}")
-            asm_code.append(f"{skip_fizzbuzz}:")
-            next_reg -= 2
-            continue
+    # Group top-level statements into allocation units.
+    units = []
+    for node in program.statements:
+        if isinstance(node, Function):
+            units.append((node.name, [node.body]))
+        elif units and units[-1][0] == TOP_LEVEL:
+            units[-1][1].append(node)
+        else:
+            units.append((TOP_LEVEL, [node]))
 
-        # Else if (divisible by 3)
-        elif_match_fizz = re.match(r'else\s+if\s*\(\s*(\w+)\s*%\s*3\s*==\s*0\s*\)', line)
-        if elif_match_fizz:
-            var = elif_match_fizz.group(1)
-            reg = get_variable_register(var)
-            temp = get_free_register()
-            fizz_label = create_label("FIZZ")
-            skip_fizz = create_label("SKIP_FIZZ")
-            end_if = if_stack[-1] if if_stack else create_label("END_IF")
-
-            asm_code.append(f"YOLOAD R0, 3(R0)")
-            asm_code.append(f"MODULOIZE {temp}, {reg}, R0")
-            asm_code.append(f"SAMEBRO {temp}, R0, {fizz_label}")
-            asm_code.append(f"YEET {skip_fizz}")
-            asm_code.append(f"{fizz_label}:")
-            asm_code.append(f"YELLSTR FIZZ_MSG")
-            asm_code.append(f"YEET {end_if}")
-            asm_code.append(f"{skip_fizz}:")
-            next_reg -= 1
-            continue
+    allocated = []
+    for name, statements in units:
+        asm_code.clear()
+        var_to_reg.clear()
+        for statement in statements:
+            gen_statement(statement)
+        unit_stats = {}
+        allocated += allocate_registers(optimize(asm_code, opt_level, immediate_max), unit_stats,
+                                        1 << encoding.immediate.bits)
+        if stats is not None:
+            stats[name] = unit_stats
+
+    return AsmProgram(string_literals, allocated)
 
-        # Else if (divisible by 5)
-        elif_match_buzz = re.match(r'else\s+if\s*\(\s*(\w+)\s*%\s*5\s*==\s*0\s*\)', line)
-        if elif_match_buzz:
-            var = elif_match_buzz.group(1)
-            reg = get_variable_register(var)
-            temp = get_free_register()
-            buzz_label = create_label("BUZZ")
-            skip_buzz = create_label("SKIP_BUZZ")
-            end_if = if_stack[-1] if if_stack else create_label("END_IF")
-
-            asm_code.append(f"YOLOAD R0, 5(R0)")
-            asm_code.append(f"MODULOIZE {temp}, {reg}, R0")
-            asm_code.append(f"SAMEBRO {temp}, R0, {buzz_label}")
-            asm_code.append(f"YEET {skip_buzz}")
-            asm_code.append(f"{buzz_label}:")
-            asm_code.append(f"YELLSTR BUZZ_MSG")
-            asm_code.append(f"YEET {end_if}")
-            asm_code.append(f"{skip_buzz}:")
-            next_reg -= 1
+
+# ---------------------------------------------------------------------------
+# Register allocation
+# ---------------------------------------------------------------------------
+
+ALLOCATABLE = list(range(1, 8))  # R1..R7
+SPILL_SLOTS = 1 << NARROW.immediate.bits  # YOSTASH/YOGRAB name a memory slot in their immediate field
+
+
+def virtual_defs_and_uses(instructions):
+    """Per instruction, the virtual registers it writes and reads (None for labels)."""
+    result = []
+    for instruction in instructions:
+        if instruction.op is None:
+            result.append(None)
             continue
+        defs, uses = defs_and_uses(instruction)
+        result.append(([d for d in defs if is_virtual(d)], [u for u in uses if is_virtual(u)]))
+    return result
+
 
-        # Else
-        elif line.startswith("else"):
-            if not loop_stack:
+def analyze(instructions):
+    """Liveness over basic blocks, then an interference graph from a backward walk.
+
+    Returns (interference, moves, pressure): neighbour sets per virtual
+    register, move partners per register, and the most registers live at once.
+    """
+    blocks, successors = build_blocks(instructions)
+    registers_used = virtual_defs_and_uses(instructions)
+    live_out = block_liveness(blocks, successors, registers_used)[1]
+
+    interference = {}
+    moves = {}
+    pressure = 0
+    for number, (start, end) in enumerate(blocks):
+        live = set(live_out[number])
+        for reg in live:
+            interference.setdefault(reg, set())
+        pressure = max(pressure, len(live))
+        for index in range(end - 1, start - 1, -1):
+            entry = registers_used[index]
+            if entry is None:
                 continue
-            reg = get_variable_register(loop_stack[-1][0])
-            asm_code.append(f"YELLVAL {reg}")
-            if if_stack:
-                asm_code.append(f"YEET {if_stack[-1]}")
-            continue
+            defs, uses = entry
+            move_source = None
+            instruction = instructions[index]
+            if uses and is_move(instruction) and defs:
+                move_source = instruction.regs[1]
+                moves.setdefault(instruction.regs[0], set()).add(move_source)
+                moves.setdefault(move_source, set()).add(instruction.regs[0])
+            for d in defs:
+                neighbours = interference.setdefault(d, set())
+                for other in live:
+                    if other != d and other != move_source:
+                        neighbours.add(other)
+                        interference[other].add(d)
+                live.discard(d)
+            for u in uses:
+                if u not in live:
+                    live.add(u)
+                    interference.setdefault(u, set())
+            pressure = max(pressure, len(live))
+    return interference, moves, pressure
 
-        # Increment (in loop)
-        inc_match = re.match(r'(\w+)\+\+', line)
-        if inc_match and loop_stack:
-            var = inc_match.group(1)
-            reg = get_variable_register(var)
-            asm_code.append(f"INCREMENT {reg}")
-            continue
 
-        # End block
-        elif line == "}":
-            if loop_stack:
-                var, reg, op, end, loop_start, loop_end = loop_stack.pop()
-                temp = get_free_register()
-                asm_code.append(f"YOLOAD {temp}, {end}(R0)")
-                comparison = "NOTGREATEROREQUAL" if op == "<=" else "NOTGREATER"
-                asm_code.append(f"{comparison} {reg}, {temp}, {loop_end}")
-                asm_code.append(f"INCREMENT {reg}")
-                asm_code.append(f"YOLO {loop_start}")
-                asm_code.append(f"{loop_end}:")
-                next_reg -= 1
-            elif if_stack:
-                end_label = if_stack.pop()
-                asm_code.append(f"{end_label}:")
-            continue
+def color_graph(interference, moves, costs):
+    """Chaitin-Briggs simplify/select; returns (colors, registers that must spill)."""
+    k = len(ALLOCATABLE)
+    # Registers are visited in number order, never in set order, so the
+    # colouring does not change with string hashing between runs.
+    order = sorted(interference)
+    degree = {reg: len(neighbours) for reg, neighbours in interference.items()}
+    remaining = set(interference)
+    low = [reg for reg in order if degree[reg] < k]
+    stack = []
+
+    def remove(reg):
+        remaining.discard(reg)
+        stack.append(reg)
+        for neighbour in sorted(interference[reg]):
+            if neighbour in remaining:
+                degree[neighbour] -= 1
+                if degree[neighbour] == k - 1:
+                    low.append(neighbour)
+
+    while remaining:
+        while low:
+            reg = low.pop()
+            if reg in remaining:
+                remove(reg)
+        if remaining:
+            # Optimistically push the cheapest candidate; it may still get a colour.
+            remove(min((reg for reg in order if reg in remaining),
+                       key=lambda reg: costs.get(reg, 0) / (degree[reg] or 1)))
 
-        # Return statement
-        elif line.startswith("return"):
-            asm_code.append("HALT")
+    colors = {}
+    spilled = []
+    for reg in reversed(stack):
+        taken = {colors[n] for n in interference[reg] if n in colors}
+        free = [color for color in ALLOCATABLE if color not in taken]
+        if not free:
+            spilled.append(reg)
             continue
+        preferred = [colors[m] for m in sorted(moves.get(reg, ()))
+                     if m in colors and colors[m] in free]
+        colors[reg] = preferred[0] if preferred else free[0]
+    return colors, spilled
+
+
+def allocate_registers(instructions, stats=None, spill_slots=SPILL_SLOTS):
+    """Map virtual registers onto R1..R7, spilling to memory slots when needed.
+
+    Spilled registers are reloaded before each use and stored after each
+    definition with YOGRAB/YOSTASH, except registers only ever set to one
+    constant, which are simply reloaded with YOLOAD. At most `spill_slots`
+    slots are used: as many as the target encoding's immediate can address.
+    """
+    next_virtual = 1 + max(
+        (reg for instruction in instructions for reg in instruction.regs if is_virtual(reg)),
+        default=virtual(0),
+    )
+    unspillable = set()
+    slots = {}
+    spill_count = 0
+    spill_instructions = 0
+    pressure = None
+
+    while True:
+        interference, moves, unit_pressure = analyze(instructions)
+        if pressure is None:
+            pressure = unit_pressure
+        depths = loop_depths(instructions)
+        costs = {}
+        for index, instruction in enumerate(instructions):
+            for reg in instruction.regs:
+                if is_virtual(reg):
+                    costs[reg] = costs.get(reg, 0) + 10 ** depths[index]
+        for reg in unspillable:
+            costs[reg] = float("inf")
+
+        colors, spilled = color_graph(interference, moves, costs)
+        if not spilled:
+            break
+
+        spill_count += len(spilled)
+        constants = {}
+        for instruction in instructions:
+            if instruction.op is None:
+                continue
+            for d in defs_and_uses(instruction)[0]:
+                if d in spilled:
+                    constants.setdefault(d, set()).add(instruction.value if instruction.op == Op.YOLOAD else None)
+        rematerialize = {reg: values.pop() for reg, values in constants.items()
+                         if len(values) == 1 and None not in values}
+        for reg in spilled:
+            if reg not in rematerialize and reg not in slots:
+                if len(slots) == spill_slots:
+                    raise ValueError("Out of spill slots!")
+                slots[reg] = len(slots)
+
+        rewritten = []
+        for instruction in instructions:
+            if instruction.op is None or not any(reg in spilled for reg in instruction.regs):
+                rewritten.append(instruction)
+                continue
+            defs, uses = defs_and_uses(instruction)
+            if instruction.op == Op.YOLOAD and instruction.regs[0] in rematerialize:
+                continue
+            renamed = {}
+            for reg in dict.fromkeys(list(defs) + list(uses)):
+                if reg in spilled:
+                    renamed[reg] = next_virtual
+                    unspillable.add(renamed[reg])
+                    next_virtual += 1
+            for reg in dict.fromkeys(uses):
+                if reg in renamed:
+                    if reg in rematerialize:
+                        rewritten.append(Instruction(Op.YOLOAD, (renamed[reg],), rematerialize[reg]))
+                    else:
+                        rewritten.append(Instruction(Op.YOGRAB, (renamed[reg],), slots[reg]))
+                    spill_instructions += 1
+            rewritten.append(instruction.replace(regs=tuple(renamed.get(reg, reg) for reg in instruction.regs)))
+            for reg in dict.fromkeys(defs):
+                if reg in renamed and reg not in rematerialize:
+                    rewritten.append(Instruction(Op.YOSTASH, (renamed[reg],), slots[reg]))
+                    spill_instructions += 1
+        instructions = rewritten
+
+    if stats is not None:
+        stats.update(pressure=pressure, spills=spill_count,
+                     spill_instructions=spill_instructions, spill_slots=len(slots))
+
+    allocated = []
+    for instruction in instructions:
+        if instruction.op is not None:
+            instruction = instruction.replace(regs=tuple(colors.get(reg, reg) for reg in instruction.regs))
+            if is_move(instruction) and instruction.regs[0] == instruction.regs[1]:
+                continue
+        allocated.append(instruction)
+    return allocated
+
+
+def compile_source(c_code, stats=None, opt_level=0, encoding=NARROW, unroll=1):
+    """Compile C source text to assembly text, in memory; raises ValueError on bad input."""
+    return generate(parse(c_code), stats, opt_level, encoding, unroll)
 
-    # Add string literals at the beginning
-    string_definitions = [f"{label}: .STRING \"{text}\"" for label, text in string_literals.items()]
-    full_asm = string_definitions + [""] + asm_code
 
-    return "\n".join(full_asm)
+def compile_program(c_code, stats=None, opt_level=0, encoding=NARROW, unroll=1):
+    """Compile C source text to an ir.AsmProgram for assembler.assemble_program()."""
+    return lower(parse(c_code), stats, opt_level, encoding, unroll)
+
+
+def c_to_asm_final_file(input_filename, stats=None, opt_level=0, encoding=NARROW, unroll=1):
+    try:
+        with open(input_filename, 'r') as infile:
+            c_code = infile.read()
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_filename}' not found.")
+        return None
+
+    return compile_source(c_code, stats, opt_level, encoding, unroll)
 
 if __name__ == "__main__":
+    opt_level = next((int(arg[2:]) for arg in sys.argv[1:] if arg.startswith("-O")), 0)
+    encoding = WIDE if "--wide" in sys.argv[1:] else NARROW
+    unroll = next((int(arg.split("=", 1)[1]) for arg in sys.argv[1:] if arg.startswith("--unroll=")), 1)
     c_files = ["addition.c", "conditional.c", "fizzbuzz.c"]
     for c_file in c_files:
-        assembly_output = c_to_asm_final_file(c_file)
+        stats = {}
+        assembly_output = c_to_asm_final_file(c_file, stats, opt_level, encoding, unroll)
+        for function, report in stats.items():
+            print(f"{c_file}: {function}: register pressure {report['pressure']}, "
+                  f"{report['spills']} spilled ({report['spill_instructions']} spill instructions)")
         if assembly_output:
             output_filename = c_file.replace(".c", ".asm")
             try:
@@ -248,4 +922,4 @@ if __name__ == "__main__":
                     outfile.write(assembly_output)
                 print(f"Assembly code for '{c_file}' written to '{output_filename}'")
             except Exception as e:
-                print(f"Error writing to output file '{output_filename}': {e}")
\ No newline at end of file
+                print(f"Error writing to output file '{output_filename}': {e}")
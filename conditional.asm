@@ -1,10 +1,7 @@
 CUSTOM_MSG_0: .STRING "Positive\\n"
 
-YOLOAD R2, 5(R0)
-YOLOAD R3, 0(R0)
-GREATERTHAN R2, R3, IF_BODY_1
-YEET END_IF_2
-IF_BODY_1:
+YOLOAD R1, 5(R0)
+NOTGREATEROREQUAL R0, R1, END_IF_1
 YELLSTR CUSTOM_MSG_0
-END_IF_2:
+END_IF_1:
 HALT
\ No newline at end of file
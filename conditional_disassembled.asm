@@ -1,8 +1,7 @@
 STRING_LITERAL_0: .STRING "UNKNOWN_STRING_0\n"
 
-YOLOAD R2, 5(R0)
-YOLOAD R3, 0(R0)
-GREATERTHAN R2, R3, LABEL_TARGET_8
-YEET LABEL_TARGET_10
+YOLOAD R1, 5(R0)
+NOTGREATEROREQUAL R0, R1, LABEL_0
 YELLSTR STRING_LITERAL_0
+LABEL_0:
 HALT
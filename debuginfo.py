@@ -0,0 +1,160 @@
+import mmap
+import struct
+
+from mcimage import checksum, strings_checksum
+
+# Debug-info sidecar (.dbg) written next to an assembled image. It keeps
+# what the machine code drops, so the disassembler can rebuild the source
+# exactly instead of inventing LABEL_n / STRING_LITERAL_n placeholders:
+#
+#   header        magic, format version, flags, instruction count, CRC-32s of
+#                 the instruction words and of the image string table (see
+#                 mcimage), label count, string definition count, name count,
+#                 source line count
+#   label index   uint32 per instruction address 0..count (inclusive), plus
+#                 a sentinel: labels at address i are entries
+#                 index[i] .. index[i + 1] of the label table
+#   labels        (address, name id, source line) per label, in address order
+#   instructions  (source line, operand name id) per instruction; the name
+#                 is the label or string the source referenced, NO_NAME if none
+#   strings       (name id, literal id, source line) per .STRING definition
+#   names         uint32 offsets (name count + 1), then the UTF-8 bytes
+#
+# Version 1 lacked the string table CRC-32 and is not read.
+#
+# Every section has a fixed record size and its offset follows from the
+# header counts, so any lookup by address is a seek rather than a scan.
+MAGIC = b"YDBG"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIIIIII")
+FLAG_TRAILING_NEWLINE = 0x1
+NO_NAME = 0xFFFFFFFF
+CHUNK_RECORDS = 4096
+
+U32 = struct.Struct("<I")
+LABEL = struct.Struct("<III")
+INSTRUCTION = struct.Struct("<II")
+STRING = struct.Struct("<III")
+
+
+def write_debug_info(path, words, image_strings, labels, instructions, strings, line_count, trailing_newline=True):
+    """Write a .dbg sidecar for the program `words` with string table `image_strings`.
+
+    `labels` is [(instruction index, name, line)], `instructions` is
+    [(line, operand name or None)] per instruction and `strings` is
+    [(name, literal as written, line)].
+    """
+    count = len(words)
+    names = {}
+
+    def name_id(name):
+        return NO_NAME if name is None else names.setdefault(name, len(names))
+
+    by_address = [[] for _ in range(count + 1)]
+    for index, name, line in labels:
+        by_address[index].append((index, name_id(name), line))
+    label_index = []
+    label_records = []
+    for entries in by_address:
+        label_index.append(len(label_records))
+        label_records += entries
+    label_index.append(len(label_records))
+
+    instruction_records = [(line, name_id(name)) for line, name in instructions]
+    string_records = [(name_id(name), name_id(literal), line) for name, literal, line in strings]
+
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = [0]
+    for blob in encoded:
+        offsets.append(offsets[-1] + len(blob))
+
+    flags = FLAG_TRAILING_NEWLINE if trailing_newline else 0
+    with open(path, "wb") as outfile:
+        outfile.write(HEADER.pack(MAGIC, VERSION, flags, count, checksum(words), strings_checksum(image_strings),
+                                  len(label_records), len(string_records), len(names), line_count))
+        outfile.write(b"".join(U32.pack(offset) for offset in label_index))
+        outfile.write(b"".join(LABEL.pack(*record) for record in label_records))
+        outfile.write(b"".join(INSTRUCTION.pack(*record) for record in instruction_records))
+        outfile.write(b"".join(STRING.pack(*record) for record in string_records))
+        outfile.write(b"".join(U32.pack(offset) for offset in offsets))
+        outfile.write(b"".join(encoded))
+
+
+class DebugInfo:
+    """A mapped .dbg file; every lookup reads straight from the mapping."""
+
+    def __init__(self, path):
+        with open(path, "rb") as infile:
+            self._mapping = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, flags, self.count, self.checksum, self.strings_checksum, label_count, string_count, name_count,
+             self.line_count) = HEADER.unpack_from(self._mapping, 0)
+            if magic != MAGIC:
+                raise ValueError(f"'{path}' is not a debug-info file")
+            if version != VERSION:
+                raise ValueError(f"'{path}' has unsupported debug-info version {version}")
+        except Exception:
+            self._mapping.close()
+            raise
+        self.trailing_newline = bool(flags & FLAG_TRAILING_NEWLINE)
+        self.label_count = label_count
+        self.string_count = string_count
+        self._names = {}
+        self._label_index = HEADER.size
+        self._labels = self._label_index + U32.size * (self.count + 2)
+        self._instructions = self._labels + LABEL.size * label_count
+        self._strings = self._instructions + INSTRUCTION.size * self.count
+        self._name_offsets = self._strings + STRING.size * string_count
+        self._name_blob = self._name_offsets + U32.size * (name_count + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mapping.close()
+
+    def name(self, name_id):
+        if name_id == NO_NAME:
+            return None
+        name = self._names.get(name_id)
+        if name is None:
+            start, end = struct.unpack_from("<II", self._mapping, self._name_offsets + U32.size * name_id)
+            name = self._names[name_id] = self._mapping[self._name_blob + start:self._name_blob + end].decode("utf-8")
+        return name
+
+    def _records(self, record, offset, count):
+        """Iterate a section in fixed-size chunks, so a long walk neither copies it whole nor pins the mapping."""
+        for start in range(0, count, CHUNK_RECORDS):
+            end = min(count, start + CHUNK_RECORDS)
+            yield from record.iter_unpack(self._mapping[offset + record.size * start:offset + record.size * end])
+
+    def labels_at(self, index):
+        """[(name, line)] of the labels at instruction `index` (0..count), in source order."""
+        start, end = struct.unpack_from("<II", self._mapping, self._label_index + U32.size * index)
+        return [(self.name(name_id), line)
+                for _, name_id, line in LABEL.iter_unpack(
+                    self._mapping[self._labels + LABEL.size * start:self._labels + LABEL.size * end])]
+
+    def labels(self):
+        """Yield (instruction index, name, line) for every label, in address order."""
+        for index, name_id, line in self._records(LABEL, self._labels, self.label_count):
+            yield index, self.name(name_id), line
+
+    def instruction(self, index):
+        """(source line, operand name or None) of instruction `index`."""
+        line, name_id = INSTRUCTION.unpack_from(self._mapping, self._instructions + INSTRUCTION.size * index)
+        return line, self.name(name_id)
+
+    def instructions(self):
+        """Yield (source line, operand name or None) for every instruction, in address order."""
+        for line, name_id in self._records(INSTRUCTION, self._instructions, self.count):
+            yield line, self.name(name_id)
+
+    def strings(self):
+        """[(name, literal as written, line)] of every .STRING definition, in source order."""
+        return [(self.name(name_id), self.name(literal_id), line)
+                for name_id, literal_id, line in STRING.iter_unpack(
+                    self._mapping[self._strings:self._strings + STRING.size * self.string_count])]
@@ -1,172 +1,281 @@
 import sys
 import os
-import re
-
-op_codes_reverse = {
-    "0001": "YOLOAD",
-    "0010": "ADD",
-    "0011": "GREATERTHAN",
-    "0100": "YEET",
-    "0101": "YOLO",
-    "0110": "SAMEBRO",
-    "0111": "MODULOIZE",
-    "1000": "INCREMENT",
-    "1001": "YELLSTR",
-    "1010": "YELLVAL",
-    "1111": "HALT",
-    "1100": "NOTGREATEROREQUAL"
-}
+from itertools import islice
+
+from debuginfo import DebugInfo
+from isa import DECODE_BITS, INSTRUCTIONS, NARROW, decode_slot, decode_table, escape
+from mcimage import checksum, file_encoding, strings_checksum, is_image, read_image, text_from_word, word_from_text
+
+op_codes_reverse = {f"{instruction.opcode:04b}": instruction.name for instruction in INSTRUCTIONS}
 
 registers_reverse = {f"{i:03b}": f"R{i}" for i in range(8)}
 
-def disassemble(mc_file: str, outfile_path: str):
-    try:
+CHUNK_LINES = 4096
+
+
+def read_instructions(mc_file: str):
+    """Yield the instructions of a .bin image or .mc file one at a time, as left-aligned words."""
+    if is_image(mc_file):
+        with read_image(mc_file) as image:
+            yield from image.words
+    else:
         with open(mc_file, "r") as infile:
-            machine_code_lines = [line.strip() for line in infile if line.strip()]
-    except FileNotFoundError:
-        print(f"Error: Input file '{mc_file}' not found.")
-        return
+            for line in infile:
+                line = line.strip()
+                if line:
+                    yield word_from_text(line)
+
+
+def scan(mc_file: str, encoding=NARROW):
+    """First pass over a .bin image or .mc file; see scan_words()."""
+    return scan_words(read_instructions(mc_file), encoding)
+
+
+def scan_words(words, encoding=NARROW):
+    """First pass: collect what the output header and label names depend on.
+
+    Returns the instruction count, the branch targets as a bytearray indexed
+    by byte address, and the string indices in order of first use. Both are
+    bounded by the encoding's field widths, so memory does not grow with the input.
+    """
+    table = decode_table(encoding)
+    label_targets = bytearray(1 << encoding.address.bits)
+    strings_seen = bytearray(1 << encoding.string.bits)
+    string_indices = []
+    count = 0
+    for word in words:
+        count += 1
+        decoded = table[word >> DECODE_BITS] or decode_slot(word >> DECODE_BITS, encoding)
+        if decoded.operand_kind == "label":
+            label_targets[(word >> decoded.operand_shift) & decoded.operand_mask] = 1
+        elif decoded.operand_kind == "string":
+            string_index = (word >> decoded.operand_shift) & decoded.operand_mask
+            if not strings_seen[string_index]:
+                strings_seen[string_index] = 1
+                string_indices.append(string_index)
+    return count, label_targets, string_indices
+
+
+def decode_instructions(words, label_targets: bytearray, count: int, encoding=NARROW):
+    """Second pass: yield assembly lines, with a label line before every branch target.
+
+    Each word is decoded with one lookup in the shared decode table. Labels
+    are numbered in address order, so a target's name is the number of
+    targets below it and forward references resolve as well as backward ones.
+    """
+    table = decode_table(encoding)
+    label_names = {}
+    # A target just past the last instruction (a label at the end of the source) is kept too.
+    for address in range(0, min(len(label_targets), count * 2 + 1), 2):
+        if label_targets[address]:
+            label_names[address] = f"LABEL_{len(label_names)}"
 
-    assembly_lines = []
-    string_literals_discovered = {}
-    string_literal_counter = 0
-    instruction_address = 0
-
-    # First Pass: Identify potential label targets (for jumps/branches)
-    label_targets = set()
-    for instruction_code in machine_code_lines:
-        opcode = instruction_code[0:4]
-        if opcode in ["0011", "0100", "0101", "0110", "1100"]:  # Instructions with a label/address
-            label_address_bin = instruction_code[7:]
-            # While we don't know the actual label name yet, we mark the target address
-            try:
-                label_target = int(label_address_bin, 2) * 2 # Assuming each instruction is 2 bytes
-                label_targets.add(label_target)
-            except ValueError:
-                pass # Handle potential errors in binary conversion
-
-    # Second Pass: Disassemble instructions
-    address_to_label = {}
     current_address = 0
-    for instruction_code in machine_code_lines:
-        opcode = instruction_code[0:4]
-        asm_instruction = ""
-
-        if current_address in label_targets and current_address not in address_to_label:
-            new_label = f"LABEL_{len(address_to_label)}"
-            assembly_lines.append(f"{new_label}:")
-            address_to_label[current_address] = new_label
-
-        if opcode in op_codes_reverse:
-            instruction_name = op_codes_reverse[opcode]
-            asm_instruction += instruction_name
-
-            if instruction_name == "YOLOAD":
-                dest_reg_bin = instruction_code[4:7]
-                immediate_bin = instruction_code[10:16]
-                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
-                immediate = int(immediate_bin, 2)
-                asm_instruction += f" {dest_reg}, {immediate}(R0)"
-            elif instruction_name == "ADD":
-                dest_reg_bin = instruction_code[4:7]
-                src1_reg_bin = instruction_code[7:10]
-                src2_reg_bin = instruction_code[10:13]
-                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
-                src1_reg = registers_reverse.get(src1_reg_bin, "UNKNOWN")
-                src2_reg = registers_reverse.get(src2_reg_bin, "UNKNOWN")
-                asm_instruction += f" {dest_reg}, {src1_reg}, {src2_reg}"
-            elif instruction_name == "GREATERTHAN":
-                reg1_bin = instruction_code[4:7]
-                reg2_bin = instruction_code[7:10]
-                label_address_bin = instruction_code[10:]
-                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
-                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
-                try:
-                    label_target_address = int(label_address_bin, 2) * 2
-                    label = address_to_label.get(label_target_address, f"LABEL_TARGET_{label_target_address // 2}")
-                    asm_instruction += f" {reg1}, {reg2}, {label}"
-                except ValueError:
-                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
-            elif instruction_name in ["YEET", "YOLO"]:
-                label_address_bin = instruction_code[7:]
-                try:
-                    label_target_address = int(label_address_bin, 2) * 2
-                    label = address_to_label.get(label_target_address, f"LABEL_TARGET_{label_target_address // 2}")
-                    asm_instruction += f" {label}"
-                except ValueError:
-                    asm_instruction += " UNKNOWN_LABEL"
-            elif instruction_name == "SAMEBRO":
-                reg1_bin = instruction_code[4:7]
-                reg2_bin = instruction_code[7:10]
-                label_address_bin = instruction_code[10:]
-                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
-                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
-                try:
-                    label_target_address = int(label_address_bin, 2) * 2
-                    label = address_to_label.get(label_target_address, f"LABEL_TARGET_{label_target_address // 2}")
-                    asm_instruction += f" {reg1}, {reg2}, {label}"
-                except ValueError:
-                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
-            elif instruction_name == "MODULOIZE":
-                dest_reg_bin = instruction_code[4:7]
-                src_reg_bin = instruction_code[7:10]
-                mod_reg_bin = instruction_code[10:13]
-                dest_reg = registers_reverse.get(dest_reg_bin, "UNKNOWN")
-                src_reg = registers_reverse.get(src_reg_bin, "UNKNOWN")
-                mod_reg = registers_reverse.get(mod_reg_bin, "UNKNOWN")
-                asm_instruction += f" {dest_reg}, {src_reg}, {mod_reg}"
-            elif instruction_name == "INCREMENT":
-                reg_bin = instruction_code[4:7]
-                reg = registers_reverse.get(reg_bin, "UNKNOWN")
-                asm_instruction += f" {reg}"
-            elif instruction_name == "YELLSTR":
-                string_index_bin = instruction_code[7:]
-                try:
-                    string_index = int(string_index_bin, 2)
-                    string_label = f"STRING_LITERAL_{string_index}"
-                    asm_instruction += f" {string_label}"
-                    if string_label not in string_literals_discovered:
-                        string_literals_discovered[string_label] = f"\"UNKNOWN_STRING_{string_index}\\n\"" # Placeholder
-                except ValueError:
-                    asm_instruction += " UNKNOWN_STRING"
-            elif instruction_name == "YELLVAL":
-                reg_bin = instruction_code[4:7]
-                reg = registers_reverse.get(reg_bin, "UNKNOWN")
-                asm_instruction += f" {reg}"
-            elif instruction_name == "HALT":
-                pass # No operands
-            elif instruction_name == "NOTGREATEROREQUAL":
-                reg1_bin = instruction_code[4:7]
-                reg2_bin = instruction_code[7:10]
-                label_address_bin = instruction_code[10:]
-                reg1 = registers_reverse.get(reg1_bin, "UNKNOWN")
-                reg2 = registers_reverse.get(reg2_bin, "UNKNOWN")
-                try:
-                    label_target_address = int(label_address_bin, 2) * 2
-                    label = address_to_label.get(label_target_address, f"LABEL_TARGET_{label_target_address // 2}")
-                    asm_instruction += f" {reg1}, {reg2}, {label}"
-                except ValueError:
-                    asm_instruction += f" {reg1}, {reg2}, UNKNOWN_LABEL"
-
-            assembly_lines.append(asm_instruction)
+    for word in words:
+        if current_address in label_names:
+            yield f"{label_names[current_address]}:"
+
+        decoded = table[word >> DECODE_BITS] or decode_slot(word >> DECODE_BITS, encoding)
+        if decoded.operand_kind == "label":
+            address = (word >> decoded.operand_shift) & decoded.operand_mask
+            yield decoded.text + label_names.get(address, f"LABEL_TARGET_{address // 2}")
+        elif decoded.operand_kind == "string":
+            yield f"{decoded.text}STRING_LITERAL_{(word >> decoded.operand_shift) & decoded.operand_mask}"
+        elif decoded.operand_kind == "imm":
+            yield f"{decoded.text}{(word >> decoded.operand_shift) & decoded.operand_mask}(R0)"
+        elif decoded.instruction is not None:
+            yield decoded.text
         else:
-            assembly_lines.append(f".UNKNOWN_INSTRUCTION {instruction_code}")
+            yield f".UNKNOWN_INSTRUCTION {text_from_word(word, encoding)}"
 
         current_address += 2
 
-    # Add string literals at the beginning of the disassembled file
-    string_definitions = [f"{label}: .STRING {literal}" for label, literal in string_literals_discovered.items()]
-    full_assembly = string_definitions + [""] + assembly_lines
+    if current_address in label_names:
+        yield f"{label_names[current_address]}:"
+
+
+def source_lines(words, info: DebugInfo, encoding=NARROW):
+    """Yield the original source lines, rebuilt from a debug-info sidecar.
+
+    Labels, string definitions and operand names come from the sidecar and
+    every line goes back to its recorded source line, so no scan pass is
+    needed. Blank lines are restored; whitespace within a line is not kept.
+    """
+    table = decode_table(encoding)
+    names = {}
+    pending_strings = [(line, f"{name}: .STRING {literal}") for name, literal, line in info.strings()]
+    pending_strings.reverse()
+    next_line = 1
+
+    def emit(line, text):
+        nonlocal next_line
+        while pending_strings and pending_strings[-1][0] < line:
+            yield from emit(*pending_strings.pop())
+        while next_line < line:
+            yield ""
+            next_line += 1
+        yield text
+        next_line = line + 1
+
+    labels = info.labels()
+    label = next(labels, None)
+    for index, (word, (line, name)) in enumerate(zip(words, info.instructions())):
+        decoded = table[word >> DECODE_BITS] or decode_slot(word >> DECODE_BITS, encoding)
+        if decoded.operand_kind == "label":
+            if name is None:
+                address = (word >> decoded.operand_shift) & decoded.operand_mask
+                name = names.get(address)
+                if name is None:
+                    targets = info.labels_at(address // 2) if address // 2 <= info.count else []
+                    name = names[address] = targets[0][0] if targets else f"LABEL_TARGET_{address // 2}"
+            text = decoded.text + name
+        elif decoded.operand_kind == "string":
+            if name is None:
+                name = f"STRING_LITERAL_{(word >> decoded.operand_shift) & decoded.operand_mask}"
+            text = decoded.text + name
+        elif decoded.operand_kind == "imm":
+            text = f"{decoded.text}{(word >> decoded.operand_shift) & decoded.operand_mask}(R0)"
+        elif decoded.instruction is not None:
+            text = decoded.text
+        else:
+            text = f".UNKNOWN_INSTRUCTION {text_from_word(word, encoding)}"
+
+        while label is not None and label[0] == index:
+            _, label_name, label_line = label
+            if label_line == line:
+                text = f"{label_name}: {text}"
+            else:
+                yield from emit(label_line, f"{label_name}:")
+            label = next(labels, None)
+        yield from emit(line, text)
+
+    while label is not None:
+        yield from emit(label[2], f"{label[1]}:")
+        label = next(labels, None)
+    while pending_strings:
+        yield from emit(*pending_strings.pop())
+    while next_line <= info.line_count:
+        yield ""
+        next_line += 1
+
+
+def listing(lines, strings, string_indices):
+    """Yield a placeholder-named disassembly: the string definitions, a blank line, then `lines`.
+
+    Strings an image carries are restored verbatim; the rest of those the
+    code uses (`string_indices`) get placeholder literals.
+    """
+    string_literals_discovered = {f"STRING_LITERAL_{i}": f"\"{escape(text)}\"" for i, text in enumerate(strings)}
+    for string_index in string_indices:
+        string_label = f"STRING_LITERAL_{string_index}"
+        if string_label not in string_literals_discovered:
+            string_literals_discovered[string_label] = f"\"UNKNOWN_STRING_{string_index}\\n\""  # Placeholder
+    for label, literal in string_literals_discovered.items():
+        yield f"{label}: .STRING {literal}"
+    yield ""
+    yield from lines
+
+
+def disassemble_words(words, strings=(), encoding=NARROW):
+    """Disassemble a sequence of left-aligned words in memory; yields the lines of the listing.
+
+    `strings` is the program's string table, if known. `words` is walked
+    twice (scan, then decode), so it must be a sequence, not an iterator.
+    """
+    count, label_targets, string_indices = scan_words(words, encoding)
+    return listing(decode_instructions(words, label_targets, count, encoding), strings, string_indices)
+
+
+def _write_lines(outfile, lines, trailing_newline=True):
+    separator = ""
+    while True:
+        chunk = list(islice(lines, CHUNK_LINES))
+        if not chunk:
+            break
+        outfile.write(separator + "\n".join(chunk))
+        separator = "\n"
+    if separator and trailing_newline:
+        outfile.write("\n")
+
+
+def _open_debug_info(mc_file: str, debug_file: str):
+    """The sidecar for `mc_file` if there is one that matches it, else None."""
+    if debug_file is None:
+        debug_file = os.path.splitext(mc_file)[0] + ".dbg"
+        if not os.path.exists(debug_file):
+            return None
+    try:
+        info = DebugInfo(debug_file)
+    except (OSError, ValueError) as e:
+        print(f"Error: Cannot read debug info '{debug_file}': {e}")
+        return None
+    if is_image(mc_file):
+        with read_image(mc_file) as image:
+            matches = (len(image.words), checksum(image.words), strings_checksum(image.strings)) == (
+                info.count, info.checksum, info.strings_checksum)
+    else:
+        count = 0
+
+        def counted(words):
+            nonlocal count
+            for count, word in enumerate(words, 1):
+                yield word
+
+        crc = checksum(counted(read_instructions(mc_file)))
+        matches = (count, crc) == (info.count, info.checksum)  # .mc files carry no strings
+    if not matches:
+        print(f"Error: Debug info '{debug_file}' does not match '{mc_file}'; ignoring it.")
+        info.close()
+        return None
+    return info
+
+
+def disassemble(mc_file: str, outfile_path: str, debug_file: str = None):
+    """Disassemble `mc_file`, streaming so memory stays flat however large the input.
+
+    With a debug-info sidecar (`debug_file`, or a .dbg next to `mc_file`)
+    the source is rebuilt exactly in one pass; without one, a scan pass
+    finds the branch targets and strings and placeholder names stand in.
+    The instruction encoding comes from the image header, or from the
+    width of a .mc file's lines.
+    """
+    strings = []
+    try:
+        encoding = file_encoding(mc_file)
+        info = _open_debug_info(mc_file, debug_file)
+        if info is not None:
+            with info:
+                with open(outfile_path, "w") as outfile:
+                    lines = source_lines(read_instructions(mc_file), info, encoding)
+                    _write_lines(outfile, lines, info.trailing_newline)
+            print(f"Disassembled '{mc_file}' -> '{outfile_path}'")
+            return
+        if is_image(mc_file):
+            with read_image(mc_file) as image:
+                strings = image.strings
+        count, label_targets, string_indices = scan(mc_file, encoding)
+    except FileNotFoundError:
+        print(f"Error: Input file '{mc_file}' not found.")
+        return
+    except ValueError as e:
+        print(f"Error: '{mc_file}' is not valid machine code: {e}")
+        return
+    except OSError as e:
+        print(f"Error writing to output file '{outfile_path}': {e}")
+        return
 
+    lines = decode_instructions(read_instructions(mc_file), label_targets, count, encoding)
     try:
         with open(outfile_path, "w") as outfile:
-            outfile.write("\n".join(full_assembly) + "\n")
+            _write_lines(outfile, listing(lines, strings, string_indices))
         print(f"Disassembled '{mc_file}' -> '{outfile_path}'")
     except Exception as e:
         print(f"Error writing to output file '{outfile_path}': {e}")
 
 if __name__ == "__main__":
-    mc_files = ["addition.mc", "conditional.mc", "fizzbuzz.mc"]
-    for mc_file in mc_files:
-        asm_file = mc_file.replace(".mc", "_disassembled.asm")
+    extension = ".mc" if "--text" in sys.argv[1:] else ".bin"
+    mc_files = ["addition", "conditional", "fizzbuzz"]
+    for name in mc_files:
+        mc_file = name + extension
+        asm_file = name + "_disassembled.asm"
         disassemble(mc_file, asm_file)
\ No newline at end of file
@@ -1,23 +1,42 @@
 STRING_LITERAL_0: .STRING "UNKNOWN_STRING_0\n"
+STRING_LITERAL_1: .STRING "UNKNOWN_STRING_1\n"
+STRING_LITERAL_2: .STRING "UNKNOWN_STRING_2\n"
 
-YOLOAD R1, 1(R0)
-YOLOAD R0, 3(R0)
-MODULOIZE R2, R1, R0
-SAMEBRO R2, R0, LABEL_TARGET_16
-YEET LABEL_TARGET_28
-YOLOAD R0, 5(R0)
-MODULOIZE R3, R1, R0
-SAMEBRO R3, R0, LABEL_TARGET_24
+YOLOAD R2, 1(R0)
 LABEL_0:
-YEET LABEL_TARGET_28
-YELLSTR STRING_LITERAL_0
-YEET LABEL_TARGET_44
-YELLSTR STRING_LITERAL_0
-YELLSTR STRING_LITERAL_0
-YELLSTR STRING_LITERAL_0
-YELLVAL R1
-YOLOAD R2, 10(R0)
+YOLOAD R1, 10(R0)
+GREATERTHAN R2, R1, LABEL_9
+YOLOAD R1, 3(R0)
+MODULOIZE R1, R2, R1
+SAMEBRO R1, R0, LABEL_1
+YEET LABEL_3
 LABEL_1:
-NOTGREATEROREQUAL R1, R2, LABEL_TARGET_44
-INCREMENT R1
+YOLOAD R1, 5(R0)
+MODULOIZE R1, R2, R1
+SAMEBRO R1, R0, LABEL_2
+YEET LABEL_3
+LABEL_2:
+YELLSTR STRING_LITERAL_0
+YEET LABEL_8
+LABEL_3:
+YOLOAD R1, 3(R0)
+MODULOIZE R1, R2, R1
+SAMEBRO R1, R0, LABEL_4
+YEET LABEL_5
+LABEL_4:
+YELLSTR STRING_LITERAL_1
+YEET LABEL_8
+LABEL_5:
+YOLOAD R1, 5(R0)
+MODULOIZE R1, R2, R1
+SAMEBRO R1, R0, LABEL_6
+YEET LABEL_7
+LABEL_6:
+YELLSTR STRING_LITERAL_2
+YEET LABEL_8
+LABEL_7:
+YELLVAL R2
+LABEL_8:
+INCREMENT R2
 YOLO LABEL_0
+LABEL_9:
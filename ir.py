@@ -0,0 +1,167 @@
+import re
+from collections import namedtuple
+from enum import IntEnum
+
+from isa import FORMATS, INSTRUCTIONS
+
+# Instruction-level intermediate representation shared by the compiler, the
+# optimizer and the assembler, so code passes between them without being
+# formatted as text and parsed back.
+#
+# An Instruction is an opcode plus its operands in source order, split by
+# kind: `regs` holds the register fields as ints, `value` the immediate (the
+# YOLOAD constant or YOSTASH/YOGRAB memory slot) and `symbol` the branch
+# target or YELLSTR string label. A label definition is an Instruction with
+# no opcode whose `symbol` is the label's name.
+#
+# Registers R0..R7 are 0..7. The compiler works over unlimited virtual
+# registers before allocation; V<n> is VIRTUAL_BASE + n.
+Op = IntEnum("Op", [(instruction.name, instruction.opcode) for instruction in INSTRUCTIONS])
+
+R0 = 0
+VIRTUAL_BASE = 8
+
+# Operand kinds in source order, per opcode (see isa.FORMATS).
+KINDS = {Op[instruction.name]: tuple(field.kind for field in FORMATS[instruction.format])
+         for instruction in INSTRUCTIONS}
+
+# What parse_operands() looks up per line, by mnemonic and by register
+# name. Every format lists its registers first and then at most one other
+# operand, so a mnemonic maps to (op, operand count, register count, kind of
+# the other operand or None).
+_PARSE = {op.name: (op, len(kinds), kinds.count("reg"), kinds[-1] if kinds and kinds[-1] != "reg" else None)
+          for op, kinds in KINDS.items()}
+_REGISTER_NAMES = {f"R{number}": number for number in range(VIRTUAL_BASE)}
+
+REGISTER_RE = re.compile(r"([RV])(\d+)$")
+IMMEDIATE_RE = re.compile(r"(\d+)\(R0\)$")
+
+
+class Instruction:
+    """One instruction or label definition; treated as an immutable value."""
+
+    __slots__ = ("op", "regs", "value", "symbol")
+
+    def __init__(self, op, regs=(), value=None, symbol=None):
+        self.op = op
+        self.regs = tuple(regs)
+        self.value = value
+        self.symbol = symbol
+
+    def replace(self, regs=None, symbol=None):
+        """A copy with new registers and/or a new symbol."""
+        return Instruction(self.op, self.regs if regs is None else regs, self.value,
+                           self.symbol if symbol is None else symbol)
+
+    def _key(self):
+        return self.op, self.regs, self.value, self.symbol
+
+    def __eq__(self, other):
+        return isinstance(other, Instruction) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Instruction({format_instruction(self)!r})"
+
+
+def label(name):
+    return Instruction(None, symbol=name)
+
+
+def virtual(number):
+    return VIRTUAL_BASE + number
+
+
+def is_virtual(reg):
+    return reg >= VIRTUAL_BASE
+
+
+def register_name(reg):
+    return f"V{reg - VIRTUAL_BASE}" if reg >= VIRTUAL_BASE else f"R{reg}"
+
+
+def register_from_name(name):
+    match = REGISTER_RE.match(name)
+    if not match:
+        raise ValueError(f"Unknown register '{name}'")
+    number = int(match.group(2))
+    if match.group(1) == "V":
+        return virtual(number)
+    if number >= VIRTUAL_BASE:
+        raise ValueError(f"Unknown register '{name}'")
+    return number
+
+
+# Compiler output: `strings` maps each string label to its literal as a
+# .STRING line writes it (escapes not yet decoded), `instructions` is the code.
+AsmProgram = namedtuple("AsmProgram", "strings instructions")
+
+
+def format_instruction(instruction):
+    if instruction.op is None:
+        return f"{instruction.symbol}:"
+    regs = iter(instruction.regs)
+    operands = []
+    for kind in KINDS[instruction.op]:
+        if kind == "reg":
+            operands.append(register_name(next(regs)))
+        elif kind == "imm":
+            operands.append(f"{instruction.value}(R0)")
+        else:
+            operands.append(instruction.symbol)
+    return f"{instruction.op.name} {', '.join(operands)}" if operands else instruction.op.name
+
+
+def format_asm(instructions):
+    """Assembly lines for `instructions`; labels end with ':'."""
+    return [format_instruction(instruction) for instruction in instructions]
+
+
+def format_program(program):
+    """The full assembly text of an AsmProgram: string definitions, a blank line, then the code."""
+    lines = [f"{name}: .STRING \"{text}\"" for name, text in program.strings.items()]
+    return "\n".join(lines + [""] + format_asm(program.instructions))
+
+
+def parse_instruction(line):
+    """Inverse of format_instruction(); raises ValueError on anything else."""
+    if line.endswith(":"):
+        return label(line[:-1])
+    return Instruction(*parse_operands(line))
+
+
+def parse_operands(line):
+    """(op, regs, value, symbol) of an instruction line; the parsing behind parse_instruction().
+
+    The assembler encodes straight from these, without an Instruction.
+    """
+    parts = line.split(None, 1)
+    name = parts[0] if parts else ""
+    if name not in _PARSE:
+        raise ValueError(f"Unknown instruction in line: {line}")
+    op, count, reg_count, kind = _PARSE[name]
+    operands = parts[1].replace(",", " ").split() if len(parts) > 1 else []
+    if len(operands) != count:
+        raise ValueError(f"Invalid {name} format in line: {line}")
+    try:
+        regs = [_REGISTER_NAMES[operand] for operand in operands[:reg_count]]
+    except KeyError:
+        try:
+            regs = [register_from_name(operand) for operand in operands[:reg_count]]
+        except ValueError as e:
+            raise ValueError(f"{e} in line: {line}") from None
+    value = symbol = None
+    if kind == "imm":
+        match = IMMEDIATE_RE.match(operands[-1])
+        if not match:
+            raise ValueError(f"Invalid immediate value '{operands[-1]}' in line: {line}")
+        value = int(match.group(1))
+    elif kind is not None:
+        symbol = operands[-1]
+    return op, regs, value, symbol
+
+
+def parse_asm(lines):
+    return [parse_instruction(line) for line in lines]
@@ -0,0 +1,155 @@
+from collections import namedtuple
+
+# The instruction set, described once. The assembler's encoder, the image
+# word widths and the decode table shared by the disassembler and the
+# emulator are all derived from these tables.
+#
+# Words are handled as left-aligned 32-bit integers (the .mc '0'/'1' text
+# shifted up so the opcode is always bits 31-28). A field is an operand
+# kind plus where it sits in that word.
+Field = namedtuple("Field", "kind shift bits")
+Instruction = namedtuple("Instruction", "name opcode format width")
+
+REG_A = Field("reg", 25, 3)
+REG_B = Field("reg", 22, 3)
+REG_C = Field("reg", 19, 3)
+IMMEDIATE = Field("imm", 16, 6)  # written "k(R0)"; also the YOSTASH/YOGRAB memory slot
+ADDRESS = Field("label", 12, 10)  # byte address, two bytes per instruction
+STRING = Field("string", 12, 10)  # index into the string table
+
+# The wide encoding keeps the opcode and registers where they are and moves
+# the other operand to the low bits of a full 32-bit word.
+WIDE_IMMEDIATE = Field("imm", 0, 16)
+WIDE_ADDRESS = Field("label", 0, 20)
+WIDE_STRING = Field("string", 0, 16)
+
+
+def _formats(immediate, address, string):
+    return {
+        "reg_imm": (REG_A, immediate),
+        "reg3": (REG_A, REG_B, REG_C),
+        "reg2_label": (REG_A, REG_B, address),
+        "label": (address,),
+        "reg": (REG_A,),
+        "string": (string,),
+        "none": (),
+    }
+
+
+FORMATS = _formats(IMMEDIATE, ADDRESS, STRING)
+WIDE_FORMATS = _formats(WIDE_IMMEDIATE, WIDE_ADDRESS, WIDE_STRING)
+
+INSTRUCTIONS = (
+    Instruction("YOLOAD", 0b0001, "reg_imm", 16),
+    Instruction("ADD", 0b0010, "reg3", 16),
+    Instruction("GREATERTHAN", 0b0011, "reg2_label", 20),
+    Instruction("YEET", 0b0100, "label", 20),
+    Instruction("YOLO", 0b0101, "label", 20),
+    Instruction("SAMEBRO", 0b0110, "reg2_label", 20),
+    Instruction("MODULOIZE", 0b0111, "reg3", 16),
+    Instruction("INCREMENT", 0b1000, "reg", 18),
+    Instruction("YELLSTR", 0b1001, "string", 20),
+    Instruction("YELLVAL", 0b1010, "reg", 18),
+    Instruction("HALT", 0b1111, "none", 20),
+    Instruction("NOTGREATEROREQUAL", 0b1100, "reg2_label", 20),
+    Instruction("YOSTASH", 0b1011, "reg_imm", 16),
+    Instruction("YOGRAB", 0b1101, "reg_imm", 16),
+)
+BY_NAME = {instruction.name: instruction for instruction in INSTRUCTIONS}
+BY_OPCODE = {instruction.opcode: instruction for instruction in INSTRUCTIONS}
+
+# Numeric opcodes, for the emulator, the JIT and the profiler to dispatch on.
+YOLOAD = BY_NAME["YOLOAD"].opcode
+ADD = BY_NAME["ADD"].opcode
+GREATERTHAN = BY_NAME["GREATERTHAN"].opcode
+YEET = BY_NAME["YEET"].opcode
+YOLO = BY_NAME["YOLO"].opcode
+SAMEBRO = BY_NAME["SAMEBRO"].opcode
+MODULOIZE = BY_NAME["MODULOIZE"].opcode
+INCREMENT = BY_NAME["INCREMENT"].opcode
+YELLSTR = BY_NAME["YELLSTR"].opcode
+YELLVAL = BY_NAME["YELLVAL"].opcode
+HALT = BY_NAME["HALT"].opcode
+NOTGREATEROREQUAL = BY_NAME["NOTGREATEROREQUAL"].opcode
+YOSTASH = BY_NAME["YOSTASH"].opcode
+YOGRAB = BY_NAME["YOGRAB"].opcode
+
+# Encodings, numbered by the version an image records. NARROW (1) is the
+# original packing: Instruction.width bits each, 6-bit immediates and 10-bit
+# branch addresses, so at most 512 instructions. WIDE (2) spends 32 bits on
+# every instruction for 16-bit immediates and 20-bit branch addresses.
+# `widths` maps opcode to encoded width.
+Encoding = namedtuple("Encoding", "version name immediate address string formats widths")
+
+NARROW = Encoding(1, "narrow", IMMEDIATE, ADDRESS, STRING, FORMATS,
+                  {instruction.opcode: instruction.width for instruction in INSTRUCTIONS})
+WIDE = Encoding(2, "wide", WIDE_IMMEDIATE, WIDE_ADDRESS, WIDE_STRING, WIDE_FORMATS,
+                {instruction.opcode: 32 for instruction in INSTRUCTIONS})
+ENCODINGS = {encoding.version: encoding for encoding in (NARROW, WIDE)}
+
+# The C-style escapes a .STRING literal may use, shared by the assembler
+# (which decodes them) and the disassembler (which writes them back).
+ESCAPES = {"n": "\n", "t": "\t", "0": "\0", "\\": "\\", '"': '"'}
+ESCAPED = {char: "\\" + code for code, char in ESCAPES.items()}
+
+
+def escape(text):
+    """Write `text` back out as the body of a .STRING literal."""
+    return "".join(ESCAPED.get(char, char) for char in text)
+
+
+DECODE_BITS = 16
+
+# One decode-table slot. The non-register operand, if the format has one,
+# is (word >> operand_shift) & operand_mask and `operand_kind` says which
+# it is: "imm", "label" (a branch byte address) or "string". `text` is the
+# disassembly with the registers filled in, ending where that operand goes.
+# Wide words keep the operand outside the top 16 bits, so it is never part
+# of `text` and every encoding shares one layout.
+Decoded = namedtuple("Decoded", "instruction opcode ra rb rc operand_kind operand_shift operand_mask text")
+
+
+def _decode_slot(top, encoding):
+    word = top << DECODE_BITS
+    opcode = word >> 28
+    ra, rb, rc = (word >> 25) & 0b111, (word >> 22) & 0b111, (word >> 19) & 0b111
+    instruction = BY_OPCODE.get(opcode)
+    if instruction is None:
+        return Decoded(None, opcode, ra, rb, rc, None, 0, 0, None)
+
+    operands = []
+    operand_kind, operand_shift, operand_mask = None, 0, 0
+    for field in encoding.formats[instruction.format]:
+        if field.kind == "reg":
+            operands.append(f"R{(word >> field.shift) & ((1 << field.bits) - 1)}")
+        else:
+            operands.append("")
+            operand_kind, operand_shift, operand_mask = field.kind, field.shift, (1 << field.bits) - 1
+    text = instruction.name + (" " + ", ".join(operands) if operands else "")
+    return Decoded(instruction, opcode, ra, rb, rc, operand_kind, operand_shift, operand_mask, text)
+
+
+_decode_tables = {}
+
+
+def decode_table(encoding=NARROW):
+    """The 65536-slot table for `encoding`, indexed by the top 16 bits of a word.
+
+    Opcode and registers sit in those bits in every encoding, so one index
+    decodes them; the remaining operand is masked out of the word with the
+    slot's shift and mask. A program only uses a few of the slots and
+    building all of them took most of a short disassembly or run, so they
+    start out None and decode_slot() builds each on first use:
+
+        decoded = table[top] or decode_slot(top, encoding)
+    """
+    table = _decode_tables.get(encoding.version)
+    if table is None:
+        table = _decode_tables[encoding.version] = [None] * (1 << DECODE_BITS)
+    return table
+
+
+def decode_slot(top, encoding=NARROW):
+    """Build slot `top` of decode_table(encoding), store it there and return it."""
+    slot = decode_table(encoding)[top] = _decode_slot(top, encoding)
+    return slot
@@ -0,0 +1,145 @@
+from isa import (
+    ADD, GREATERTHAN, HALT, INCREMENT, MODULOIZE, NOTGREATEROREQUAL, SAMEBRO, YEET, YELLSTR, YELLVAL, YOGRAB,
+    YOLO, YOLOAD, YOSTASH,
+)
+
+# Basic-block JIT for vm.Machine. When a branch target gets hot, the
+# basic blocks reachable from it are translated into one generated Python
+# function (a "region") that keeps the registers in locals and switches
+# between blocks on `pc`, so the per-instruction tuple unpacking and
+# opcode dispatch of the interpreter disappear. Control leaves the region
+# through HALT, or by branching to a block the region does not contain.
+HOT_THRESHOLD = 50  # Taken branches to an address before its region is compiled
+MAX_REGION_BLOCKS = 64
+
+CONDITIONS = {SAMEBRO: "==", GREATERTHAN: ">", NOTGREATEROREQUAL: ">="}
+JUMPS = {YEET, YOLO}
+BLOCK_ENDS = set(CONDITIONS) | JUMPS | {HALT}
+STRAIGHT_LINE = {YOLOAD, ADD, MODULOIZE, INCREMENT, YELLSTR, YELLVAL, YOSTASH, YOGRAB}
+REGISTERS = ", ".join(f"r{i}" for i in range(8))
+
+
+def block_leaders(code):
+    """Indices where a basic block starts: 0, every branch target and every instruction after a branch."""
+    leaders = {0}
+    for index, (op, _, _, _, x) in enumerate(code):
+        if op in BLOCK_ENDS:
+            leaders.add(index + 1)
+            if op != HALT:
+                leaders.add(x)
+    return leaders
+
+
+def basic_block(code, start, leaders):
+    """(start, end) of the block at `start`; `end` is one past its last instruction, or None if it cannot compile."""
+    index = start
+    while index < len(code):
+        op = code[index][0]
+        if op in BLOCK_ENDS:
+            return start, index + 1
+        if op not in STRAIGHT_LINE:
+            return (start, index) if index > start else None
+        index += 1
+        if index in leaders:
+            return start, index
+    return (start, index) if index > start else None
+
+
+def successors(code, end):
+    op, _, _, _, x = code[end - 1]
+    if op == HALT:
+        return []
+    if op in JUMPS:
+        return [x]
+    if op in CONDITIONS:
+        return [x, end]
+    return [end]
+
+
+def region_blocks(code, entry, leaders):
+    """Blocks reachable from `entry`, at most MAX_REGION_BLOCKS of them."""
+    blocks = {}
+    pending = [entry]
+    while pending and len(blocks) < MAX_REGION_BLOCKS:
+        start = pending.pop()
+        if start in blocks or not 0 <= start < len(code):
+            continue
+        block = basic_block(code, start, leaders)
+        if block is None:
+            continue
+        blocks[start] = block[1]
+        pending.extend(successors(code, block[1]))
+    return blocks
+
+
+def translate(code, start, end, strings):
+    """Python statements for one block; the last one always sets pc (or stops on HALT)."""
+    lines = [f"steps += {end - start}"]
+    for op, a, b, c, x in code[start:end]:
+        if op == YOLOAD:
+            lines.append(f"r{a} = {x}")
+        elif op == ADD:
+            lines.append(f"r{a} = r{b} + r{c}")
+        elif op == MODULOIZE:
+            lines.append(f"r{a} = r{b} % r{c}")
+        elif op == INCREMENT:
+            lines.append(f"r{a} += 1")
+        elif op == YELLVAL:
+            lines += [f"buffer += b'%d\\n' % r{a}", "if len(buffer) >= limit:", "    flush()"]
+        elif op == YELLSTR:
+            text = strings[x] if x < len(strings) else f"UNKNOWN_STRING_{x}\n"
+            lines += [f"buffer += {text.encode('utf-8')!r}", "if len(buffer) >= limit:", "    flush()"]
+        elif op == YOGRAB:
+            lines.append(f"r{a} = memory[{x}]")
+        elif op == YOSTASH:
+            lines.append(f"memory[{x}] = r{a}")
+        elif op in CONDITIONS:
+            lines.append(f"pc = {x} if r{a} {CONDITIONS[op]} r{b} else {end}")
+        elif op in JUMPS:
+            lines.append(f"pc = {x}")
+        elif op == HALT:
+            lines += [f"pc = {end}", "halted = True", "break"]
+    if code[end - 1][0] not in BLOCK_ENDS:
+        lines.append(f"pc = {end}")
+    return lines
+
+
+def compile_region(code, entry, strings, leaders):
+    """Compile the region entered at `entry`.
+
+    Returns (function, covered instruction indices), or None when the
+    entry block cannot be compiled. The function takes (registers, memory,
+    output buffer, flush threshold, flush) and returns (next pc,
+    instructions executed, halted).
+    """
+    blocks = region_blocks(code, entry, leaders)
+    if not blocks:
+        return None
+
+    source = [
+        "def region(r, memory, buffer, limit, flush):",
+        f"    {REGISTERS} = r",
+        f"    pc = {entry}",
+        "    steps = 0",
+        "    halted = False",
+        "    try:",
+        "        while True:",
+    ]
+    keyword = "if"
+    for start in sorted(blocks):
+        source.append(f"            {keyword} pc == {start}:")
+        source += [f"                {line}" for line in translate(code, start, blocks[start], strings)]
+        keyword = "elif"
+    source += [
+        "            else:",
+        "                break",
+        "    finally:",
+        f"        r[:] = {REGISTERS}",
+        "    return pc, steps, halted",
+    ]
+    namespace = {}
+    exec(compile("\n".join(source) + "\n", f"<jit region {entry * 2}>", "exec"), namespace)
+    covered = set()
+    for start, end in blocks.items():
+        covered.update(range(start, end))
+    return namespace["region"], covered
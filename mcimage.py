@@ -0,0 +1,219 @@
+import sys
+import zlib
+import mmap
+import struct
+from array import array
+from itertools import islice
+
+from isa import ENCODINGS, INSTRUCTIONS, NARROW, WIDE
+
+# Binary machine-code image (.bin):
+#
+#   header   magic, format version, instruction encoding (isa.ENCODINGS),
+#            instruction count, byte offset of the string table
+#   words    one little-endian uint32 per instruction
+#   strings  uint32 count, then a uint32 length + UTF-8 bytes per string
+#
+# Instructions are 16, 18 or 20 bits wide depending on the opcode, so they
+# do not fit a uint16. Each word holds the same bits as its '0'/'1' line in
+# a .mc file, left-aligned so the opcode is always the top nibble and the
+# text form can be recovered exactly. Wide-encoded words are a full 32 bits.
+#
+# Version 1 images had an unused flags field where the encoding now is;
+# they are always narrow. Versions 1 and 2 also had an entry point after
+# it that nothing ever set or read; execution always starts at address 0.
+MAGIC = b"YOLO"
+VERSION = 3
+HEADER = struct.Struct("<4sHHII")
+OLD_HEADER = struct.Struct("<4sHHIII")  # Versions 1 and 2
+WORD_SIZE = 4
+
+# Encoded width of each instruction, keyed by opcode bits.
+WORD_BITS = {f"{instruction.opcode:04b}": instruction.width for instruction in INSTRUCTIONS}
+
+_WORD_TYPECODE = next(code for code in "IL" if array(code).itemsize == WORD_SIZE)
+
+
+def word_from_text(code: str) -> int:
+    return int(code, 2) << (32 - len(code))
+
+
+def text_from_word(word: int, encoding=NARROW) -> str:
+    bits = encoding.widths.get(word >> 28, 32)
+    return f"{word >> (32 - bits):0{bits}b}"
+
+
+def text_encoding(code: str):
+    """The encoding of a '0'/'1' instruction: wide words are the only 32-character ones."""
+    return WIDE if len(code) == 32 else NARROW
+
+
+def file_encoding(path: str):
+    """The encoding of a .bin image or .mc file, from the header or the first instruction."""
+    if is_image(path):
+        with read_image(path) as image:
+            return image.encoding
+    with open(path, "r") as infile:
+        for line in infile:
+            if line.strip():
+                return text_encoding(line.strip())
+    return NARROW
+
+
+def checksum(words) -> int:
+    """CRC-32 of instruction words in image byte order; ties sidecar files to one program."""
+    if sys.byteorder == "little" and isinstance(words, (array, memoryview)):
+        return zlib.crc32(words)
+    crc = 0
+    words = iter(words)
+    while True:
+        chunk = array(_WORD_TYPECODE, islice(words, 65536))
+        if not chunk:
+            return crc
+        if sys.byteorder != "little":
+            chunk.byteswap()
+        crc = zlib.crc32(chunk, crc)
+
+
+def strings_checksum(strings) -> int:
+    """CRC-32 of a string table as an image stores it."""
+    crc = 0
+    for text in strings:
+        encoded = text.encode("utf-8")
+        crc = zlib.crc32(struct.pack("<I", len(encoded)) + encoded, crc)
+    return crc
+
+
+class Image:
+    """A loaded .bin file.
+
+    `words` is a memoryview straight onto the mapped file, so opening a large
+    image costs no copy; call close() (or use the image as a context manager)
+    once done with it.
+    """
+
+    def __init__(self, words, strings, mapping=None, views=(), encoding=NARROW):
+        self.words = words
+        self.strings = strings
+        self.encoding = encoding
+        self._mapping = mapping
+        self._views = list(views)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def instruction_strings(self):
+        """Yield every instruction in its .mc text form."""
+        for word in self.words:
+            yield text_from_word(word, self.encoding)
+
+
+def is_image(path: str) -> bool:
+    try:
+        with open(path, "rb") as infile:
+            return infile.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def image_bytes(words, strings=(), encoding=NARROW) -> bytes:
+    """A .bin image of left-aligned instruction words and a string table, in memory."""
+    words = array(_WORD_TYPECODE, words)
+    if sys.byteorder != "little":
+        words.byteswap()
+    string_table = [struct.pack("<I", len(strings))]
+    for text in strings:
+        encoded = text.encode("utf-8")
+        string_table.append(struct.pack("<I", len(encoded)) + encoded)
+    string_offset = HEADER.size + len(words) * WORD_SIZE
+    return b"".join([HEADER.pack(MAGIC, VERSION, encoding.version, len(words), string_offset),
+                     words.tobytes()] + string_table)
+
+
+def write_image(path: str, words, strings=(), encoding=NARROW):
+    """Write left-aligned instruction words and a string table as a .bin image."""
+    data = image_bytes(words, strings, encoding)
+    with open(path, "wb") as outfile:
+        outfile.write(data)
+
+
+def _parse_image(buffer, name):
+    """Validate an image header and read its string table; returns (encoding, words offset, count, strings)."""
+    if len(buffer) < HEADER.size:
+        raise ValueError(f"'{name}' has a truncated image header")
+    magic, version, encoding_version = HEADER.unpack_from(buffer, 0)[:3]
+    if magic != MAGIC:
+        raise ValueError(f"'{name}' is not a machine-code image")
+    if version not in (1, 2, VERSION):
+        raise ValueError(f"'{name}' has unsupported image version {version}")
+    header = HEADER if version == VERSION else OLD_HEADER
+    if len(buffer) < header.size:
+        raise ValueError(f"'{name}' has a truncated image header")
+    count, string_offset = header.unpack_from(buffer, 0)[-2:]
+    if header.size + count * WORD_SIZE > len(buffer):
+        raise ValueError(f"'{name}' is truncated: it holds fewer than its {count} instructions")
+    if version == 1:
+        encoding_version = NARROW.version
+    encoding = ENCODINGS.get(encoding_version)
+    if encoding is None:
+        raise ValueError(f"'{name}' uses unknown instruction encoding {encoding_version}")
+
+    truncated = ValueError(f"'{name}' has a truncated string table")
+    if string_offset + 4 > len(buffer):
+        raise truncated
+    strings = []
+    (string_count,) = struct.unpack_from("<I", buffer, string_offset)
+    position = string_offset + 4
+    for _ in range(string_count):
+        if position + 4 > len(buffer):
+            raise truncated
+        (length,) = struct.unpack_from("<I", buffer, position)
+        position += 4
+        if position + length > len(buffer):
+            raise truncated
+        strings.append(bytes(buffer[position:position + length]).decode("utf-8"))
+        position += length
+    return encoding, header.size, count, strings
+
+
+def image_from_bytes(data) -> Image:
+    """Load an image from bytes (as image_bytes() returns) rather than from a file."""
+    encoding, offset, count, strings = _parse_image(data, "<bytes>")
+    words = array(_WORD_TYPECODE, data[offset:offset + count * WORD_SIZE])
+    if sys.byteorder != "little":
+        words.byteswap()
+    return Image(words, strings, encoding=encoding)
+
+
+def read_image(path: str) -> Image:
+    with open(path, "rb") as infile:
+        mapping = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        encoding, offset, count, strings = _parse_image(mapping, path)
+        if sys.byteorder != "little":
+            words = array(_WORD_TYPECODE, mapping[offset:offset + count * WORD_SIZE])
+            words.byteswap()
+            mapping.close()
+            return Image(words, strings, encoding=encoding)
+    except Exception:
+        mapping.close()
+        raise
+
+    # The views must be released, innermost first, before the mapping can close.
+    raw = memoryview(mapping)[offset:offset + count * WORD_SIZE]
+    words = raw.cast(_WORD_TYPECODE)
+    return Image(words, strings, mapping, views=(words, raw), encoding=encoding)
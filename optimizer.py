@@ -0,0 +1,503 @@
+import sys
+from functools import partial
+
+from ir import R0, Instruction, Op, format_asm, is_virtual, parse_asm
+from isa import NARROW, WIDE
+
+# The passes work on ir.Instruction lists; labels are Instructions without an op.
+CONDITIONAL_BRANCHES = {Op.GREATERTHAN, Op.SAMEBRO, Op.NOTGREATEROREQUAL}
+JUMPS = {Op.YEET, Op.YOLO}
+IMMEDIATE_MAX = (1 << NARROW.immediate.bits) - 1  # Largest YOLOAD immediate in the narrow encoding
+
+# Branch and operand swap that takes the jump exactly when the original would not.
+# SAMEBRO has no inverse: the ISA has no "not equal" branch.
+INVERTED_BRANCHES = {
+    Op.GREATERTHAN: Op.NOTGREATEROREQUAL,  # !(a > b)  ==  b >= a
+    Op.NOTGREATEROREQUAL: Op.GREATERTHAN,  # !(a >= b) ==  b > a
+}
+
+MAX_ROUNDS = 10
+
+
+# The registers each opcode writes and reads, as slices of Instruction.regs.
+_NONE = slice(0, 0)
+_FIRST = slice(0, 1)
+REGISTER_ROLES = dict.fromkeys(list(Op) + [None], (_NONE, _NONE))
+REGISTER_ROLES.update({
+    Op.YOLOAD: (_FIRST, _NONE),
+    Op.YOGRAB: (_FIRST, _NONE),
+    Op.ADD: (_FIRST, slice(1, 3)),
+    Op.MODULOIZE: (_FIRST, slice(1, 3)),
+    Op.INCREMENT: (_FIRST, _FIRST),
+    Op.YELLVAL: (_NONE, _FIRST),
+    Op.YOSTASH: (_NONE, _FIRST),
+})
+REGISTER_ROLES.update((op, (_NONE, slice(0, 2))) for op in CONDITIONAL_BRANCHES)
+
+
+def defs_and_uses(instruction):
+    """Registers an instruction writes and reads."""
+    defs, uses = REGISTER_ROLES[instruction.op]
+    return instruction.regs[defs], instruction.regs[uses]
+
+
+def is_move(instruction):
+    return instruction.op == Op.ADD and instruction.regs[2] == R0
+
+
+def is_branch(op):
+    return op in CONDITIONAL_BRANCHES or op in JUMPS
+
+
+def label_positions(instructions):
+    return {instruction.symbol: index for index, instruction in enumerate(instructions) if instruction.op is None}
+
+
+def build_blocks(instructions):
+    """Split instructions into basic blocks.
+
+    Returns the blocks as index ranges and each block's successor blocks.
+    """
+    starts = {0}
+    label_index = {}
+    for index, instruction in enumerate(instructions):
+        if instruction.op is None:
+            label_index[instruction.symbol] = index
+            starts.add(index)
+        elif is_branch(instruction.op) or instruction.op == Op.HALT:
+            starts.add(index + 1)
+    starts = sorted(start for start in starts if start < len(instructions))
+    block_of = {start: number for number, start in enumerate(starts)}
+    blocks = [(start, end) for start, end in zip(starts, starts[1:] + [len(instructions)])]
+
+    successors = []
+    for number, (start, end) in enumerate(blocks):
+        last = instructions[end - 1]
+        targets = []
+        if is_branch(last.op):
+            target = label_index.get(last.symbol)
+            if target is not None and target < len(instructions):
+                targets.append(block_of[target])
+        if last.op not in JUMPS and last.op != Op.HALT and number + 1 < len(blocks):
+            targets.append(number + 1)
+        successors.append(targets)
+    return blocks, successors
+
+
+def block_liveness(blocks, successors, registers_used):
+    """Iterate live-in/live-out sets per block to a fixed point.
+
+    `registers_used` holds, per instruction, the (defs, uses) to track or
+    None for labels.
+    """
+    gen = []
+    kill = []
+    for start, end in blocks:
+        block_gen = set()
+        block_kill = set()
+        for entry in registers_used[start:end]:
+            if entry is None:
+                continue
+            defs, uses = entry
+            block_gen.update(u for u in uses if u not in block_kill)
+            block_kill.update(defs)
+        gen.append(block_gen)
+        kill.append(block_kill)
+
+    live_in = [set() for _ in blocks]
+    live_out = [set() for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        for number in reversed(range(len(blocks))):
+            out = set()
+            for successor in successors[number]:
+                out |= live_in[successor]
+            new_in = gen[number] | (out - kill[number])
+            if new_in != live_in[number]:
+                live_in[number] = new_in
+                changed = True
+            live_out[number] = out
+    return live_in, live_out
+
+
+def loop_depths(instructions):
+    """Nesting depth of backward-branch ranges covering each instruction."""
+    label_index = label_positions(instructions)
+    delta = [0] * (len(instructions) + 1)
+    for index, instruction in enumerate(instructions):
+        if is_branch(instruction.op):
+            target = label_index.get(instruction.symbol)
+            if target is not None and target <= index:
+                delta[target] += 1
+                delta[index + 1] -= 1
+    depths = []
+    depth = 0
+    for change in delta[:-1]:
+        depth += change
+        depths.append(depth)
+    return depths
+
+
+# ---------------------------------------------------------------------------
+# Passes: each takes the instruction list and returns (instructions, changed)
+# ---------------------------------------------------------------------------
+
+def thread_jumps(instructions):
+    """Retarget branches whose destination is itself an unconditional jump."""
+    label_index = label_positions(instructions)
+
+    def final_target(label):
+        seen = set()
+        while label not in seen:
+            seen.add(label)
+            index = label_index.get(label)
+            if index is None:
+                break
+            while index < len(instructions) and instructions[index].op is None:
+                index += 1
+            if index == len(instructions) or instructions[index].op not in JUMPS:
+                break
+            label = instructions[index].symbol
+        return label
+
+    changed = False
+    result = []
+    for instruction in instructions:
+        if is_branch(instruction.op):
+            target = final_target(instruction.symbol)
+            if target != instruction.symbol:
+                instruction = instruction.replace(symbol=target)
+                changed = True
+        result.append(instruction)
+    return result, changed
+
+
+def labels_after(instructions, index):
+    """Names of the labels directly following position `index`."""
+    names = set()
+    index += 1
+    while index < len(instructions) and instructions[index].op is None:
+        names.add(instructions[index].symbol)
+        index += 1
+    return names
+
+
+def invert_branches(instructions):
+    """`BR a, b, L1 / YEET L2 / L1:` becomes `!BR a, b, L2 / L1:`."""
+    changed = False
+    result = []
+    index = 0
+    while index < len(instructions):
+        instruction = instructions[index]
+        if (instruction.op in INVERTED_BRANCHES and index + 1 < len(instructions)
+                and instructions[index + 1].op in JUMPS
+                and instruction.symbol in labels_after(instructions, index + 1)):
+            a, b = instruction.regs
+            result.append(Instruction(INVERTED_BRANCHES[instruction.op], (b, a), symbol=instructions[index + 1].symbol))
+            index += 2
+            changed = True
+            continue
+        result.append(instruction)
+        index += 1
+    return result, changed
+
+
+def rotate_loops(instructions):
+    """Replace a jump back to a loop test with an inverted copy of that test.
+
+    `L: BR a, b, END / body / YOLO L / END:` becomes
+    `L: BR a, b, END / L_BODY: body / !BR a, b, L_BODY / END:`, saving the
+    jump on every iteration. Applies to any jump whose target starts with an
+    invertible branch to the label right after the jump.
+    """
+    label_index = label_positions(instructions)
+    for index, instruction in enumerate(instructions):
+        if instruction.op not in JUMPS or instruction.symbol not in label_index:
+            continue
+        test = label_index[instruction.symbol]
+        while test < len(instructions) and instructions[test].op is None:
+            test += 1
+        if test == len(instructions) or test == index:
+            continue
+        test_instruction = instructions[test]
+        if (test_instruction.op not in INVERTED_BRANCHES
+                or test_instruction.symbol not in labels_after(instructions, index)):
+            continue
+
+        body_label = f"{instruction.symbol}_BODY"
+        if body_label in label_index and label_index[body_label] != test + 1:
+            continue
+        a, b = test_instruction.regs
+        inverted = Instruction(INVERTED_BRANCHES[test_instruction.op], (b, a), symbol=body_label)
+        result = instructions[:index] + [inverted] + instructions[index + 1:]
+        if body_label not in label_index:
+            result.insert(test + 1, Instruction(None, symbol=body_label))
+        return result, True
+    return instructions, False
+
+
+def remove_jumps_to_next(instructions):
+    """Drop branches and jumps to a label that immediately follows them."""
+    keep = [
+        not (is_branch(instruction.op) and instruction.symbol in labels_after(instructions, index))
+        for index, instruction in enumerate(instructions)
+    ]
+    if all(keep):
+        return instructions, False
+    return [instruction for instruction, kept in zip(instructions, keep) if kept], True
+
+
+def remove_unreachable(instructions):
+    """Drop basic blocks that cannot be reached from the first instruction."""
+    if not instructions:
+        return instructions, False
+    blocks, successors = build_blocks(instructions)
+    reachable = {0}
+    pending = [0]
+    while pending:
+        for successor in successors[pending.pop()]:
+            if successor not in reachable:
+                reachable.add(successor)
+                pending.append(successor)
+    if len(reachable) == len(blocks):
+        return instructions, False
+    result = []
+    for number, (start, end) in enumerate(blocks):
+        if number in reachable:
+            result.extend(instructions[start:end])
+    return result, True
+
+
+def remove_dead_labels(instructions):
+    referenced = {instruction.symbol for instruction in instructions if is_branch(instruction.op)}
+    result = [instruction for instruction in instructions
+              if instruction.op is not None or instruction.symbol in referenced]
+    return result, len(result) != len(instructions)
+
+
+def fold_constants(instructions, immediate_max=IMMEDIATE_MAX):
+    """Propagate YOLOAD constants within basic blocks and fold what they feed.
+
+    Arithmetic on known values becomes a single YOLOAD when the result fits
+    an immediate (up to `immediate_max`), and branches on known values become a YEET or disappear.
+    R0 counts as zero unless the program writes to it.
+    """
+    r0_is_zero = not any(
+        instruction.op is not None and R0 in defs_and_uses(instruction)[0] for instruction in instructions
+    )
+    changed = False
+    result = []
+    known = {}
+    for instruction in instructions:
+        op = instruction.op
+        if op is None or op in JUMPS or op == Op.HALT:
+            known = {}
+            result.append(instruction)
+            continue
+        if r0_is_zero:
+            known[R0] = 0
+
+        defs, uses = defs_and_uses(instruction)
+        values = [known.get(reg) for reg in uses]
+        value = None
+        if op == Op.YOLOAD:
+            value = instruction.value
+        elif None not in values:
+            if op == Op.ADD:
+                value = values[0] + values[1]
+            elif op == Op.MODULOIZE and values[1]:
+                value = values[0] % values[1]
+            elif op == Op.INCREMENT:
+                value = values[0] + 1
+            elif op in CONDITIONAL_BRANCHES:
+                a, b = values
+                taken = {Op.GREATERTHAN: a > b, Op.NOTGREATEROREQUAL: a >= b, Op.SAMEBRO: a == b}[op]
+                if taken:
+                    result.append(Instruction(Op.YEET, symbol=instruction.symbol))
+                    known = {}
+                changed = True
+                continue
+
+        if value is not None and op != Op.YOLOAD and 0 <= value <= immediate_max:
+            instruction = Instruction(Op.YOLOAD, instruction.regs[:1], value)
+            changed = True
+        result.append(instruction)
+        for reg in defs:
+            known.pop(reg, None)
+        if value is not None:
+            known[defs[0]] = value
+    return result, changed
+
+
+def remove_dead_definitions(instructions):
+    """Delete side-effect-free writes to virtual registers nobody reads."""
+    used = set()
+    for instruction in instructions:
+        if instruction.op is not None:
+            used.update(defs_and_uses(instruction)[1])
+    result = [
+        instruction for instruction in instructions
+        if instruction.op not in (Op.YOLOAD, Op.ADD, Op.MODULOIZE, Op.INCREMENT)
+        or not is_virtual(instruction.regs[0]) or instruction.regs[0] in used
+    ]
+    return result, len(result) != len(instructions)
+
+
+def merge_constants(instructions):
+    """Reuse one virtual register for a constant loaded twice in the same block.
+
+    Only registers written exactly once are merged, so the first load
+    dominates the second and every use of it.
+    """
+    def_count = {}
+    for instruction in instructions:
+        if instruction.op is not None:
+            for reg in defs_and_uses(instruction)[0]:
+                def_count[reg] = def_count.get(reg, 0) + 1
+
+    renamed = {}
+    block_constants = {}
+    for instruction in instructions:
+        if instruction.op is None or is_branch(instruction.op):
+            block_constants = {}
+        elif (instruction.op == Op.YOLOAD and is_virtual(instruction.regs[0])
+              and def_count[instruction.regs[0]] == 1):
+            first = block_constants.setdefault(instruction.value, instruction.regs[0])
+            if first != instruction.regs[0]:
+                renamed[instruction.regs[0]] = first
+    if not renamed:
+        return instructions, False
+
+    result = []
+    for instruction in instructions:
+        if instruction.op == Op.YOLOAD and instruction.regs[0] in renamed:
+            continue
+        if instruction.op is not None:
+            instruction = instruction.replace(regs=tuple(renamed.get(reg, reg) for reg in instruction.regs))
+        result.append(instruction)
+    return result, True
+
+
+def hoist_loop_invariants(instructions):
+    """Move constant loads out of loops into the code just before the loop header.
+
+    A loop is the range from a label back to the last branch targeting it.
+    `YOLOAD Rn, k` is hoisted when every write to Rn inside the loop is that
+    same load, Rn is not live on entry to the header, and nothing outside
+    the loop jumps into it past the header.
+    """
+    label_index = label_positions(instructions)
+    loops = {}
+    for index, instruction in enumerate(instructions):
+        if is_branch(instruction.op):
+            header = label_index.get(instruction.symbol)
+            if header is not None and header < index:
+                loops[header] = index
+
+    blocks, successors = build_blocks(instructions)
+    registers_used = [
+        None if instruction.op is None else tuple(
+            [reg for reg in regs if reg != R0] for regs in defs_and_uses(instruction)
+        )
+        for instruction in instructions
+    ]
+    live_in = block_liveness(blocks, successors, registers_used)[0]
+    block_at = {start: number for number, (start, end) in enumerate(blocks)}
+
+    # Innermost loops first, so their constants can move outward on the next round.
+    for header, latch in sorted(loops.items(), key=lambda loop: loop[1] - loop[0]):
+        inside = range(header, latch + 1)
+        if any(
+            is_branch(instruction.op) and header <= label_index.get(instruction.symbol, -1) <= latch
+            for index, instruction in enumerate(instructions) if index not in inside
+        ):
+            continue
+
+        writes = {}
+        for index in inside:
+            if instructions[index].op is not None:
+                for reg in defs_and_uses(instructions[index])[0]:
+                    writes.setdefault(reg, []).append(index)
+        hoisted = []
+        for reg, indices in writes.items():
+            forms = {instructions[index] for index in indices}
+            if (reg != R0 and len(forms) == 1 and next(iter(forms)).op == Op.YOLOAD
+                    and reg not in live_in[block_at[header]]):
+                hoisted.append((reg, indices))
+        if not hoisted:
+            continue
+
+        drop = {index for _, indices in hoisted for index in indices}
+        preheader = [instructions[indices[0]] for _, indices in hoisted]
+        result = instructions[:header] + preheader + [
+            instruction for index, instruction in enumerate(instructions[header:], header)
+            if index not in drop
+        ]
+        return result, True
+    return instructions, False
+
+
+O1_PASSES = [
+    thread_jumps, invert_branches, rotate_loops, remove_jumps_to_next, remove_unreachable,
+    remove_dead_labels,
+]
+O2_PASSES = [fold_constants, remove_dead_definitions, merge_constants, hoist_loop_invariants] + O1_PASSES
+
+
+def optimize(instructions, level=1, immediate_max=IMMEDIATE_MAX):
+    """Run the -O`level` pipeline over a list of ir.Instructions; returns a new list.
+
+    -O1 cleans up control flow: jump threading, branch inversion, loop
+    rotation, and dead jump, code and label removal. -O2 adds constant folding, dead
+    definition removal, constant merging and loop-invariant load hoisting.
+    Folded constants are kept within `immediate_max`, the largest YOLOAD
+    immediate of the target encoding.
+    """
+    if level <= 0:
+        return list(instructions)
+    passes = O2_PASSES if level >= 2 else O1_PASSES
+    passes = [partial(fold_constants, immediate_max=immediate_max) if optimization is fold_constants else optimization
+              for optimization in passes]
+    for _ in range(MAX_ROUNDS):
+        changed = False
+        for optimization in passes:
+            instructions, pass_changed = optimization(instructions)
+            changed = changed or pass_changed
+        if not changed:
+            break
+    return instructions
+
+
+def optimize_file(asm_file: str, outfile_path: str, level=1, encoding=NARROW):
+    """Optimize an .asm file for `encoding`; string definitions and blank lines pass through."""
+    try:
+        with open(asm_file, "r") as infile:
+            lines = [line.strip() for line in infile]
+    except FileNotFoundError:
+        print(f"Error: Input file '{asm_file}' not found.")
+        return
+
+    data = [line for line in lines if ".STRING" in line]
+    code = [line for line in lines if line and ".STRING" not in line]
+    try:
+        optimized = format_asm(optimize(parse_asm(code), level, (1 << encoding.immediate.bits) - 1))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    try:
+        with open(outfile_path, "w") as outfile:
+            outfile.write("\n".join(data + [""] + optimized) + "\n")
+        print(f"Optimized '{asm_file}' -> '{outfile_path}' (-O{level}): "
+              f"{len(code)} -> {len(optimized)} lines")
+    except Exception as e:
+        print(f"Error writing to output file '{outfile_path}': {e}")
+
+
+if __name__ == "__main__":
+    # --wide folds constants up to the 32-bit encoding's immediate limit.
+    level = next((int(arg[2:]) for arg in sys.argv[1:] if arg.startswith("-O")), 1)
+    encoding = WIDE if "--wide" in sys.argv[1:] else NARROW
+    asm_files = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
+    for asm_file in asm_files:
+        optimize_file(asm_file, asm_file, level, encoding)
@@ -0,0 +1,26 @@
+import os
+
+# Worker pools for the tools that spread independent jobs across processes:
+# build.py (one source file per job), batch.py (one execution per job) and
+# the toolchain daemon (one request per job). All of them take the number
+# of workers as a -j<n> flag and default to one per CPU.
+
+
+def jobs_option(args):
+    """The <n> of a -j<n> flag in `args`, or None when there is none."""
+    return next((int(arg[2:]) for arg in args if arg.startswith("-j")), None)
+
+
+def worker_count(jobs=None):
+    """`jobs` workers if given, else one per CPU."""
+    return jobs or os.cpu_count() or 1
+
+
+def pool_map(function, tasks, workers, initializer=None, initargs=()):
+    """list(map(function, tasks)) across a pool of `workers` processes; results keep task order."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Many short jobs: ship them in batches rather than one IPC round trip each.
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        return list(executor.map(function, tasks, chunksize=chunksize))
@@ -0,0 +1,188 @@
+import sys
+import os
+from array import array
+from bisect import bisect_right
+
+import jit
+import vm
+from isa import BY_NAME, GREATERTHAN, NOTGREATEROREQUAL, SAMEBRO, YEET, YELLSTR, YELLVAL, YOLO
+
+# Execution profiler for vm.Machine. A Profile passed to the Machine makes
+# run() go through Machine.run_interpreter() with a trace callback that
+# counts each instruction as it runs, so profiled code executes exactly as
+# it does unprofiled (minus the JIT). Every instruction costs one cycle,
+# the same unit Machine.steps counts in.
+#
+# Addresses are mapped back to assembler labels through the symbol map
+# assembler.assemble() writes when given a `symbol_file`: one
+# "<byte address> <label>" line per label, in address order.
+CONDITIONAL_BRANCHES = {GREATERTHAN, SAMEBRO, NOTGREATEROREQUAL}
+BRANCHES = CONDITIONAL_BRANCHES | {YEET, YOLO}
+OPCODE_NAMES = {instruction.opcode: instruction.name for instruction in BY_NAME.values()}
+
+
+def read_symbol_map(path):
+    """Labels by instruction index, from a symbol map written by the assembler."""
+    symbols = {}
+    with open(path, "r") as infile:
+        for line in infile:
+            address, _, label = line.strip().partition(" ")
+            if label:
+                symbols.setdefault(int(address, 0) // 2, label)
+    return symbols
+
+
+class Profile:
+    def __init__(self, symbols=None, root="program"):
+        self.symbols = symbols or {}
+        self.symbol_indices = sorted(self.symbols)
+        self.root = root
+        self.counts = array("Q")
+        self.taken = array("Q")
+        self.yellstr_count = self.yellstr_bytes = 0
+        self.yellval_count = self.yellval_bytes = 0
+        self.code = []
+
+    def run(self, machine):
+        """Execute `machine` in its own interpreter loop, counting every instruction it runs.
+
+        Any pc other than the one after the previous instruction means that
+        instruction was a branch and was taken; a branch to the very next
+        instruction counts as not taken.
+        """
+        code = machine.program.table()
+        if len(self.counts) < len(code):
+            grow = len(code) - len(self.counts)
+            self.counts.extend(array("Q", [0]) * grow)
+            self.taken.extend(array("Q", [0]) * grow)
+        self.code = code
+        counts = self.counts
+        taken = self.taken
+        r = machine.registers
+        yellvals = {index for index, (op, _, _, _, _) in enumerate(code) if op == YELLVAL}
+        yellstrs = {index: counts[index] for index, (op, _, _, _, _) in enumerate(code) if op == YELLSTR}
+        last = machine.pc - 1
+        yellval_count = yellval_bytes = 0
+
+        def trace(pc):
+            nonlocal last, yellval_count, yellval_bytes
+            counts[pc] += 1
+            if pc != last + 1:
+                taken[last] += 1
+            last = pc
+            if pc in yellvals:
+                yellval_count += 1
+                yellval_bytes += len(b"%d\n" % r[code[pc][1]])
+
+        try:
+            return machine.run_interpreter(trace)
+        finally:
+            if machine.pc == len(code) != last + 1:
+                taken[last] += 1  # The last instruction branched to the end of the program
+            strings = machine.program.strings
+            for index, before in yellstrs.items():
+                x = code[index][4]
+                text = strings[x] if x < len(strings) else f"UNKNOWN_STRING_{x}\n"
+                self.yellstr_count += counts[index] - before
+                self.yellstr_bytes += (counts[index] - before) * len(text.encode("utf-8"))
+            self.yellval_count += yellval_count
+            self.yellval_bytes += yellval_bytes
+
+    def name(self, index):
+        """The label at `index`, else the nearest label before it plus a byte offset."""
+        position = bisect_right(self.symbol_indices, index)
+        if not position:
+            return f"0x{index * 2:04x}"
+        start = self.symbol_indices[position - 1]
+        label = self.symbols[start]
+        return label if start == index else f"{label}+{(index - start) * 2}"
+
+    def blocks(self):
+        """(start, end, cycles) for every basic block that executed."""
+        leaders = sorted(jit.block_leaders(self.code) | set(self.symbols) | {len(self.code)})
+        result = []
+        for start, end in zip(leaders, leaders[1:]):
+            if start >= len(self.code):
+                break
+            cycles = sum(self.counts[start:end])
+            if cycles:
+                result.append((start, end, cycles))
+        return result
+
+    def loops(self):
+        """(head, tail) of every backward branch, outermost first."""
+        spans = {(x, index) for index, (op, _, _, _, x) in enumerate(self.code)
+                 if op in BRANCHES and x <= index}
+        return sorted(spans, key=lambda span: (span[0], -span[1]))
+
+    def collapsed_stacks(self):
+        """Flame-graph input: "root;loop;...;block cycles" per executed block.
+
+        There are no calls to unwind, so the enclosing loops (spans of
+        backward branches) stand in for the stack.
+        """
+        loops = self.loops()
+        lines = []
+        for start, end, cycles in self.blocks():
+            frames = [self.root] + [self.name(head) for head, tail in loops if head <= start <= tail]
+            block = self.name(start)
+            if frames[-1] != block:
+                frames.append(block)
+            lines.append(f"{';'.join(frames)} {cycles}")
+        return lines
+
+    def write_collapsed(self, path):
+        with open(path, "w") as outfile:
+            outfile.write("\n".join(self.collapsed_stacks()) + "\n")
+
+    def report(self, out=None, top=10):
+        out = out if out is not None else sys.stdout
+        total = sum(self.counts)
+        out.write(f"{total} cycles\n")
+
+        out.write("\nHottest instructions:\n")
+        hottest = sorted(range(len(self.code)), key=lambda index: -self.counts[index])[:top]
+        for index in hottest:
+            if self.counts[index]:
+                op = self.code[index][0]
+                out.write(f"  {self.name(index):<24} {OPCODE_NAMES.get(op, op):<18} {self.counts[index]:>12}\n")
+
+        out.write("\nBasic blocks:\n")
+        for start, end, cycles in sorted(self.blocks(), key=lambda block: -block[2])[:top]:
+            out.write(f"  {self.name(start):<24} {end - start:>3} instructions {cycles:>12} cycles "
+                      f"({100 * cycles / total:5.1f}%)\n")
+
+        out.write("\nBranches (taken / executed):\n")
+        for index, (op, _, _, _, x) in enumerate(self.code):
+            if op in CONDITIONAL_BRANCHES and self.counts[index]:
+                ratio = self.taken[index] / self.counts[index]
+                out.write(f"  {self.name(index):<24} -> {self.name(x):<24} "
+                          f"{self.taken[index]:>10} / {self.counts[index]:<10} {100 * ratio:5.1f}% taken\n")
+
+        out.write(f"\nOutput: YELLSTR {self.yellstr_count} calls, {self.yellstr_bytes} bytes; "
+                  f"YELLVAL {self.yellval_count} calls, {self.yellval_bytes} bytes\n")
+
+
+def profile_file(mc_file, symbol_file=None, folded_file=None, out=None):
+    """Run a program under the profiler; writes a collapsed-stack file and returns the Profile."""
+    program = vm.load_program(mc_file)
+    if program is None:
+        return None
+    base = os.path.splitext(mc_file)[0]
+    symbol_file = symbol_file or base + ".sym"
+    symbols = read_symbol_map(symbol_file) if os.path.exists(symbol_file) else {}
+    profile = Profile(symbols, os.path.basename(base))
+    machine = vm.Machine(program, out, profile=profile)
+    machine.run()
+    profile.write_collapsed(folded_file or base + ".folded")
+    return profile
+
+
+if __name__ == "__main__":
+    with open(os.devnull, "w") as sink:
+        for mc_file in sys.argv[1:] or ["addition.bin", "conditional.bin", "fizzbuzz.bin"]:
+            profile = profile_file(mc_file, out=sink)
+            if profile is not None:
+                print(f"Profile of '{mc_file}':")
+                profile.report()
+                print()
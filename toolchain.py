@@ -0,0 +1,164 @@
+import sys
+import os
+import io
+import contextlib
+
+# One command line for the whole toolchain:
+#
+#   python -m toolchain compile [-O<n>] [--wide] [--unroll=<n>] <file.c>...        -> <file>.asm
+#   python -m toolchain assemble [--text] [--wide] [--symbols] [--debug] <file.asm>...
+#                                                    -> <file>.bin (.mc with --text), .sym, .dbg
+#   python -m toolchain disassemble <file.bin | file.mc>...                  -> <file>_disassembled.asm
+#   python -m toolchain run [--jit] <file.bin | file.mc>...
+#
+# --output=<path> names the output when there is a single input file. The
+# exit status is 0 when every file succeeded, 1 when any failed and 2 for a
+# bad command line.
+#
+# Build scripts call this once per file, so start-up is most of the cost of
+# a short invocation: only sys, os, io and contextlib (all loaded by
+# `python -m` itself) are imported up front, and each command imports the
+# modules it needs when it runs. Running a program never loads the compiler
+# or the assembler, for instance. bench/startup.py keeps this in check.
+USAGE = """usage: python -m toolchain <command> [options] <file>...
+
+commands:
+  compile      [-O<n>] [--wide] [--unroll=<n>] <file.c>...
+  assemble     [--text] [--wide] [--symbols] [--debug] <file.asm>...
+  disassemble  <file.bin | file.mc>...
+  run          [--jit] <file.bin | file.mc>...
+
+--output=<path> names the output of a single input file."""
+
+
+class UsageError(Exception):
+    pass
+
+
+def _int_option(options, prefix, default):
+    value = next((option[len(prefix):] for option in options if option.startswith(prefix)), None)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise UsageError(f"'{prefix}' expects a number, not '{value}'") from None
+
+
+def _report(work):
+    """Run `work`, passing on what it prints; False if that included an "Error" line.
+
+    The tools report problems by printing rather than raising, as build.py
+    relies on too.
+    """
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            work()
+    finally:
+        sys.stdout.write(log.getvalue())
+    return not any(line.startswith("Error") for line in log.getvalue().splitlines())
+
+
+def compile_files(files, options, outputs):
+    from compiler import c_to_asm_final_file
+    from isa import NARROW, WIDE
+
+    opt_level = _int_option(options, "-O", 0)
+    unroll = _int_option(options, "--unroll=", 1)
+    encoding = WIDE if "--wide" in options else NARROW
+    ok = True
+    for c_file, asm_file in zip(files, outputs(".asm")):
+        try:
+            assembly = c_to_asm_final_file(c_file, None, opt_level, encoding, unroll)
+        except ValueError as e:
+            print(f"Error: {c_file}: {e}")
+            assembly = None
+        if assembly is None:
+            ok = False
+            continue
+        try:
+            with open(asm_file, "w") as outfile:
+                outfile.write(assembly)
+            print(f"Assembly code for '{c_file}' written to '{asm_file}'")
+        except OSError as e:
+            print(f"Error writing to output file '{asm_file}': {e}")
+            ok = False
+    return ok
+
+
+def assemble_files(files, options, outputs):
+    from assembler import assemble, op_codes, registers
+    from isa import NARROW, WIDE
+
+    encoding = WIDE if "--wide" in options else NARROW
+    ok = True
+    for asm_file, mc_file in zip(files, outputs(".mc" if "--text" in options else ".bin")):
+        base = os.path.splitext(mc_file)[0]
+        symbol_file = base + ".sym" if "--symbols" in options else None
+        debug_file = base + ".dbg" if "--debug" in options else None
+        ok &= _report(lambda: assemble(asm_file, mc_file, op_codes, registers, symbol_file, debug_file, encoding))
+    return ok
+
+
+def disassemble_files(files, options, outputs):
+    from dissassmbler import disassemble
+
+    ok = True
+    for mc_file, asm_file in zip(files, outputs("_disassembled.asm")):
+        ok &= _report(lambda: disassemble(mc_file, asm_file))
+    return ok
+
+
+def run_files(files, options, outputs):
+    from vm import run
+
+    ok = True
+    for mc_file in files:
+        try:
+            machine = run(mc_file, use_jit="--jit" in options)
+        except (OSError, ValueError, ArithmeticError) as e:  # ArithmeticError: MODULOIZE by zero
+            print(f"Error: '{mc_file}' could not be run: {e}")
+            machine = None
+        ok &= machine is not None
+    return ok
+
+
+COMMANDS = {
+    "compile": compile_files,
+    "assemble": assemble_files,
+    "disassemble": disassemble_files,
+    "run": run_files,
+}
+
+
+def main(args):
+    if not args or args[0] in ("-h", "--help"):
+        print(USAGE)
+        return 0 if args else 2
+    command = COMMANDS.get(args[0])
+    options = [arg for arg in args[1:] if arg.startswith("-")]
+    files = [arg for arg in args[1:] if not arg.startswith("-")]
+    output = next((option.split("=", 1)[1] for option in options if option.startswith("--output=")), None)
+
+    def outputs(suffix):
+        if output is not None:
+            return [output]
+        return [os.path.splitext(path)[0] + suffix for path in files]
+
+    try:
+        if command is None:
+            raise UsageError(f"unknown command '{args[0]}'")
+        if not files:
+            raise UsageError(f"'{args[0]}' needs at least one input file")
+        if output is not None and len(files) > 1:
+            raise UsageError("--output needs a single input file")
+        return 0 if command(files, options, outputs) else 1
+    except UsageError as e:
+        print(f"Error: {e}")
+        print(USAGE)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
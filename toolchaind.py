@@ -0,0 +1,276 @@
+import sys
+import os
+import io
+import json
+import base64
+import socket
+import contextlib
+from collections import namedtuple
+
+from pool import jobs_option, worker_count
+
+# A resident toolchain for callers that rebuild often, such as an editor
+# recompiling on every save. Starting Python and importing the toolchain
+# costs more than compiling a small file, so the daemon does both once and
+# then answers requests over a Unix socket:
+#
+#   python -m toolchaind serve [-j<n>] [--socket=<path>]
+#   python -m toolchaind <compile|assemble|disassemble|run> [options] <file>...
+#
+# The second form is the thin client: it sends each file to the daemon and
+# writes the artifacts that come back next to it, exactly where
+# `python -m toolchain` would have. Options are the toolchain's own.
+#
+# Protocol: one JSON object per line each way. A request is
+#
+#   {"id": ..., "command": "compile", "name": "addition", "options": ["-O2"],
+#    "inputs": {".c": <base64>}}
+#
+# where `inputs` maps a file suffix to its contents, the file being worked on
+# first and sidecars such as a ".dbg" after it. The response echoes the id:
+#
+#   {"id": ..., "ok": true, "output": "<what the command printed>",
+#    "artifacts": {".asm": <base64>}}
+#
+# The daemon runs each request with the toolchain's command functions in a
+# scratch directory of its own, on a pool of warm worker processes, so
+# requests on different connections run in parallel. Requests on one
+# connection are answered in order. The socket is created accessible to its
+# owner only; nothing a request names can reach outside its scratch directory.
+DEFAULT_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"toolchaind-{os.getuid()}.sock")
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+COMMAND_NAMES = ("compile", "assemble", "disassemble", "run")
+
+Response = namedtuple("Response", "ok output artifacts")
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _decode(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"), validate=True)
+
+
+def _warm():
+    """Worker initializer: import the whole toolchain before the first request."""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the daemon shuts us down
+    import toolchain
+    import compiler
+    import assembler
+    import dissassmbler
+    import vm
+
+
+def handle(command, name, inputs, options):
+    """Run one toolchain command in a scratch directory; returns (ok, output, artifacts).
+
+    `inputs` maps suffix to contents, the file to work on first. Every file
+    the command leaves behind is returned, keyed by its suffix after `name`.
+    """
+    import tempfile
+    import toolchain
+
+    log = io.StringIO()
+    with tempfile.TemporaryDirectory(prefix="toolchaind-") as scratch:
+        base = os.path.join(scratch, name)
+        for suffix, data in inputs.items():
+            with open(base + suffix, "wb") as outfile:
+                outfile.write(data)
+        try:
+            with contextlib.redirect_stdout(log):
+                ok = toolchain.COMMANDS[command]([base + next(iter(inputs))], options, lambda suffix: [base + suffix])
+        except toolchain.UsageError as e:
+            print(f"Error: {e}", file=log)
+            ok = False
+
+        artifacts = {}
+        for entry in os.scandir(scratch):
+            suffix = entry.name[len(name):]
+            if entry.name.startswith(name) and suffix not in inputs:
+                with open(entry.path, "rb") as infile:
+                    artifacts[suffix] = infile.read()
+        output = log.getvalue().replace(scratch + os.sep, "")
+    return ok, output, artifacts
+
+
+def _check_request(request):
+    """Raise ValueError unless `request` is well formed and stays inside its scratch directory."""
+    command, name, inputs, options = (request.get(key) for key in ("command", "name", "inputs", "options"))
+    if command not in COMMAND_NAMES:
+        raise ValueError(f"unknown command {command!r}")
+    if not isinstance(name, str) or not name or name in (".", "..") or os.path.basename(name) != name:
+        raise ValueError(f"'name' must be a plain file name, not {name!r}")
+    if not isinstance(inputs, dict) or not inputs:
+        raise ValueError("'inputs' must map at least one suffix to its contents")
+    for suffix in inputs:
+        if os.sep in suffix or (os.altsep and os.altsep in suffix):
+            raise ValueError(f"bad input suffix {suffix!r}")
+    if not isinstance(options, list) or not all(isinstance(option, str) for option in options):
+        raise ValueError("'options' must be a list of strings")
+    if any(option.startswith("--output=") for option in options):
+        raise ValueError("--output is not supported; artifacts are returned instead")
+
+
+def _response(request_id, ok, output, artifacts):
+    response = {"id": request_id, "ok": ok, "output": output,
+                "artifacts": {suffix: _encode(data) for suffix, data in artifacts.items()}}
+    return json.dumps(response).encode() + b"\n"
+
+
+async def _respond(loop, pool, line):
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("a request must be a JSON object")
+        request_id = request.get("id")
+        request.setdefault("options", [])
+        _check_request(request)
+        inputs = {suffix: _decode(data) for suffix, data in request["inputs"].items()}
+    except (AttributeError, TypeError, ValueError) as e:
+        return _response(request_id, False, f"Error: bad request: {e}\n", {})
+    try:
+        ok, output, artifacts = await loop.run_in_executor(
+            pool, handle, request["command"], request["name"], inputs, request["options"])
+    except Exception as e:
+        ok, output, artifacts = False, f"Error: {type(e).__name__}: {e}\n", {}
+    return _response(request_id, ok, output, artifacts)
+
+
+async def _serve(path, jobs):
+    import asyncio
+    import signal
+    from concurrent.futures import ProcessPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_warm) as pool:
+        # Start every worker now, so no request waits for one to spawn.
+        await asyncio.gather(*(loop.run_in_executor(pool, int) for _ in range(jobs)))
+
+        async def connection(reader, writer):
+            try:
+                while line := await reader.readline():
+                    writer.write(await _respond(loop, pool, line))
+                    await writer.drain()
+            except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                pass  # The client went away, or sent a line over MAX_REQUEST_BYTES
+            finally:
+                writer.close()
+
+        previous_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(connection, path, limit=MAX_REQUEST_BYTES)
+        finally:
+            os.umask(previous_umask)
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        print(f"Serving on '{path}' with {jobs} workers", flush=True)
+        async with server:
+            await stop.wait()
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+def serve(path=DEFAULT_SOCKET, jobs=None):
+    """Run the daemon until SIGINT or SIGTERM; returns False if one already serves `path`."""
+    import asyncio
+
+    if os.path.exists(path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+            print(f"Error: a daemon is already serving '{path}'")
+            return False
+        except ConnectionRefusedError:
+            os.unlink(path)  # Left behind by a daemon that did not shut down cleanly
+    asyncio.run(_serve(path, worker_count(jobs)))
+    return True
+
+
+class Client:
+    """A connection to a running daemon. Plain blocking sockets, so it starts fast."""
+
+    def __init__(self, path=DEFAULT_SOCKET):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(path)
+        except OSError:
+            self._socket.close()
+            raise
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def request(self, command, name, inputs, options=()) -> Response:
+        """Run `command` on `inputs` ({suffix: bytes}, the file to work on first) in the daemon."""
+        self._next_id += 1
+        request = {"id": self._next_id, "command": command, "name": name, "options": list(options),
+                   "inputs": {suffix: _encode(data) for suffix, data in inputs.items()}}
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        response = json.loads(line)
+        artifacts = {suffix: _decode(data) for suffix, data in response["artifacts"].items()}
+        return Response(response["ok"], response["output"], artifacts)
+
+    def build(self, command, path, options=()) -> bool:
+        """Like `python -m toolchain <command> <path>`: artifacts are written next to `path`.
+
+        The daemon's messages name files without their directory.
+        """
+        base, suffix = os.path.splitext(path)
+        try:
+            with open(path, "rb") as infile:
+                inputs = {suffix: infile.read()}
+        except FileNotFoundError:
+            print(f"Error: Input file '{path}' not found.")
+            return False
+        if command == "disassemble" and os.path.exists(base + ".dbg"):
+            with open(base + ".dbg", "rb") as infile:
+                inputs[".dbg"] = infile.read()
+
+        response = self.request(command, os.path.basename(base), inputs, options)
+        sys.stdout.write(response.output)
+        for artifact_suffix, data in response.artifacts.items():
+            try:
+                with open(base + artifact_suffix, "wb") as outfile:
+                    outfile.write(data)
+            except OSError as e:
+                print(f"Error writing to output file '{base + artifact_suffix}': {e}")
+                return False
+        return response.ok
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    socket_path = next((arg.split("=", 1)[1] for arg in args if arg.startswith("--socket=")), DEFAULT_SOCKET)
+    args = [arg for arg in args if not arg.startswith("--socket=")]
+    if args[:1] == ["serve"]:
+        sys.exit(0 if serve(socket_path, jobs_option(args)) else 1)
+    if not args or args[0] not in COMMAND_NAMES:
+        print("usage: python -m toolchaind serve [-j<n>] [--socket=<path>]\n"
+              "       python -m toolchaind <compile|assemble|disassemble|run> [options] [--socket=<path>] <file>...")
+        sys.exit(2)
+    options = [arg for arg in args[1:] if arg.startswith("-")]
+    files = [arg for arg in args[1:] if not arg.startswith("-")]
+    try:
+        with Client(socket_path) as client:
+            ok = all([client.build(args[0], path, options) for path in files])
+    except OSError as e:
+        print(f"Error: cannot reach the daemon on '{socket_path}': {e}")
+        sys.exit(1)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,481 @@
+import io
+import sys
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+import jit
+from isa import (
+    ADD, DECODE_BITS, GREATERTHAN, HALT, INCREMENT, MODULOIZE, NARROW, NOTGREATEROREQUAL, SAMEBRO, YEET,
+    YELLSTR, YELLVAL, YOGRAB, YOLO, YOLOAD, YOSTASH, decode_slot, decode_table,
+)
+from mcimage import file_encoding, is_image, read_image, word_from_text
+
+FLUSH_THRESHOLD = 64 * 1024
+
+# Machine snapshot (Machine.snapshot()):
+#
+#   header     magic, format version, flags, the instruction count and
+#              encoding version of the program it belongs to, pc, steps,
+#              number of non-zero memory slots, output length
+#   registers  int64 per register
+#   memory     (uint32 slot, int64 value) per non-zero slot
+#   output     the buffered output not yet flushed, as UTF-8 bytes
+#
+# Memory is mostly zeros (and 65536 slots in the wide encoding), so only the
+# slots in use are stored.
+SNAPSHOT_MAGIC = b"YSNP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHHIHIQII")
+SNAPSHOT_REGISTERS = struct.Struct("<8q")
+SNAPSHOT_SLOT = struct.Struct("<Iq")
+FLAG_HALTED = 0x1
+
+# A decoded snapshot; `memory` maps slot to value for the non-zero slots.
+Snapshot = namedtuple("Snapshot", "registers memory pc steps halted output program_length encoding_version")
+
+
+class OutputBuffer:
+    """Collects YELLSTR/YELLVAL output in a bytearray and writes it out in chunks.
+
+    The dispatch loops append encoded bytes to `buffer` directly and call
+    flush() once it reaches `flush_threshold` bytes; Machine.run() flushes
+    whatever is left when the program halts or stops. Output goes to `fd`
+    with os.write() when one is given, otherwise to `target` (a text or
+    binary stream, sys.stdout by default). A threshold of 0 flushes after
+    every instruction.
+    """
+
+    def __init__(self, target=None, flush_threshold=FLUSH_THRESHOLD, fd=None):
+        self.target = target if target is not None or fd is not None else sys.stdout
+        self.fd = fd
+        self.flush_threshold = flush_threshold
+        self.buffer = bytearray()
+        self._binary = isinstance(self.target, (io.RawIOBase, io.BufferedIOBase))
+
+    def write(self, text):
+        self.buffer += text.encode("utf-8")
+        if len(self.buffer) >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.fd is not None:
+            view = memoryview(self.buffer)
+            while view:
+                view = view[os.write(self.fd, view):]
+            view.release()
+        elif self._binary:
+            self.target.write(self.buffer)
+        else:
+            self.target.write(self.buffer.decode("utf-8"))
+        # clear() keeps the bytearray object, which the dispatch loops hold on to.
+        self.buffer.clear()
+
+
+class Program:
+    """A pre-decoded .mc image.
+
+    Every word is decoded exactly once into parallel arrays: the opcode, the
+    three register fields and one integer operand (the YOLOAD immediate, the
+    YOSTASH/YOGRAB memory slot, the YELLSTR string index, or a branch target
+    already converted from a byte address to an instruction index).
+    `encoding` is the isa encoding the words use.
+    """
+
+    def __init__(self, words=(), strings=None, encoding=NARROW):
+        self.ops = array("B")
+        self.ra = array("B")
+        self.rb = array("B")
+        self.rc = array("B")
+        self.operand = array("l")
+        self.strings = list(strings) if strings else []
+        self.encoding = encoding
+        self._decode = decode_table(encoding)
+        self._table = None
+        for word in words:
+            self.append(word)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def append(self, word):
+        """Decode one '0'/'1' instruction string and add it to the table."""
+        self.append_word(word_from_text(word))
+
+    def append_word(self, word):
+        """Decode one left-aligned image word with a single decode-table lookup."""
+        self.extend_words((word,))
+
+    def extend_words(self, words):
+        self._table = None
+        decode, encoding = self._decode, self.encoding
+        ops, ra, rb, rc, operands = self.ops.append, self.ra.append, self.rb.append, self.rc.append, self.operand.append
+        for word in words:
+            top = word >> DECODE_BITS
+            _, opcode, a, b, c, kind, shift, mask, _ = decode[top] or decode_slot(top, encoding)
+            ops(opcode)
+            ra(a)
+            rb(b)
+            rc(c)
+            if kind == "label":
+                operands(((word >> shift) & mask) >> 1)  # Labels are byte addresses, two bytes per instruction
+            else:
+                operands((word >> shift) & mask)
+
+    def set_word(self, index, word):
+        """Replace the instruction at `index` with a new left-aligned word."""
+        top = word >> DECODE_BITS
+        _, opcode, a, b, c, kind, shift, mask, _ = self._decode[top] or decode_slot(top, self.encoding)
+        operand = (word >> shift) & mask
+        self._table = None
+        self.ops[index], self.ra[index], self.rb[index], self.rc[index] = opcode, a, b, c
+        self.operand[index] = operand >> 1 if kind == "label" else operand
+
+    def table(self):
+        """Return the instruction table as a list of tuples for the dispatch loop.
+
+        Built once and kept until the code changes, so running the same
+        program many times does not rebuild it; callers must not modify it.
+        """
+        if self._table is None:
+            self._table = list(zip(self.ops, self.ra, self.rb, self.rc, self.operand))
+        return self._table
+
+
+def program_from_tables(ops, ra, rb, rc, operand, strings=None, encoding=NARROW):
+    """A Program over already decoded tables (any sequences, e.g. memoryviews onto shared memory).
+
+    Nothing is decoded or copied here; table() still copies the tables into
+    the program's own dispatch table when it first runs. The program must
+    not be modified when the tables are shared.
+    """
+    program = Program(strings=strings, encoding=encoding)
+    program.ops, program.ra, program.rb, program.rc, program.operand = ops, ra, rb, rc, operand
+    return program
+
+
+def load_program(mc_file: str, strings=None):
+    if is_image(mc_file):
+        with read_image(mc_file) as image:
+            program = Program(strings=strings or image.strings, encoding=image.encoding)
+            program.extend_words(image.words)
+        return program
+    try:
+        encoding = file_encoding(mc_file)
+        with open(mc_file, "r") as infile:
+            return Program((line.strip() for line in infile if line.strip()), strings, encoding)
+    except FileNotFoundError:
+        print(f"Error: Input file '{mc_file}' not found.")
+        return None
+
+
+class _TracedCode:
+    """An instruction table that calls `trace` with each pc as the dispatch loop fetches it."""
+
+    __slots__ = ("code", "trace")
+
+    def __init__(self, code, trace):
+        self.code = code
+        self.trace = trace
+
+    def __getitem__(self, pc):
+        self.trace(pc)
+        return self.code[pc]
+
+
+class Machine:
+    def __init__(self, program, out=None, use_jit=False, hot_threshold=jit.HOT_THRESHOLD, profile=None):
+        self.program = program
+        self.out = out if isinstance(out, OutputBuffer) else OutputBuffer(out)
+        self.registers = [0] * 8
+        # One slot per value of the YOSTASH/YOGRAB slot field.
+        self.memory = [0] * (1 << program.encoding.immediate.bits)
+        self.pc = 0
+        self.steps = 0
+        self.halted = False
+        self.use_jit = use_jit
+        self.hot_threshold = hot_threshold
+        # Compiled regions by entry index, each with the instruction indices it covers.
+        self.regions = {}
+        # A profiler.Profile; when set, run() counts every instruction (and skips the JIT).
+        self.profile = profile
+
+    def snapshot(self) -> bytes:
+        """The machine's registers, memory, pc, step count and buffered output as a compact blob.
+
+        Compiled JIT regions are not part of the state; they are rebuilt as needed.
+        """
+        memory = [(slot, value) for slot, value in enumerate(self.memory) if value]
+        try:
+            parts = [
+                SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, FLAG_HALTED if self.halted else 0,
+                                     len(self.program), self.program.encoding.version, self.pc, self.steps,
+                                     len(memory), len(self.out.buffer)),
+                SNAPSHOT_REGISTERS.pack(*self.registers),
+            ]
+            parts.extend(SNAPSHOT_SLOT.pack(slot, value) for slot, value in memory)
+        except struct.error as e:
+            raise ValueError(f"machine state does not fit a snapshot: {e}") from None
+        parts.append(self.out.buffer)
+        return b"".join(parts)
+
+    def restore(self, blob):
+        """Return to the state in a snapshot() blob taken of a machine running the same program."""
+        state = read_snapshot(blob)
+        if (state.program_length, state.encoding_version) != (len(self.program), self.program.encoding.version):
+            raise ValueError(f"snapshot is of a different program ({state.program_length} instructions, "
+                             f"encoding {state.encoding_version})")
+        if state.pc > len(self.program) or any(slot >= len(self.memory) for slot in state.memory):
+            raise ValueError("snapshot state is out of range for this program")
+        self.registers[:] = state.registers
+        self.memory[:] = [0] * len(self.memory)
+        for slot, value in state.memory.items():
+            self.memory[slot] = value
+        self.pc = state.pc
+        self.steps = state.steps
+        self.halted = state.halted
+        # Replaced in place: the dispatch loops hold on to the bytearray.
+        self.out.buffer[:] = state.output
+
+    def write_code(self, index, word):
+        """Patch one instruction, dropping every compiled region that covers it."""
+        self.program.set_word(index, word)
+        self.regions = {entry: region for entry, region in self.regions.items() if index not in region[1]}
+
+    def run(self):
+        """Execute until HALT or the end of the program; return the instructions executed."""
+        try:
+            if self.profile is not None:
+                return self.profile.run(self)
+            if self.use_jit:
+                return self.run_jit()
+            return self.run_interpreter()
+        finally:
+            self.out.flush()
+
+    def run_interpreter(self, trace=None):
+        """The dispatch loop behind run(). A `trace` is called with each pc before it executes."""
+        code = self.program.table()
+        strings = [text.encode("utf-8") for text in self.program.strings]
+        buffer = self.out.buffer
+        limit = self.out.flush_threshold
+        flush = self.out.flush
+        r = self.registers
+        memory = self.memory
+        pc = self.pc
+        steps = 0
+        end = len(code)
+        # Opcodes bound as locals: global lookups dominate a loop this tight.
+        (
+            yoload, add, greaterthan, yeet, yolo, samebro, moduloize,
+            increment, yellstr, yellval, halt, notgreaterorequal, yostash, yograb,
+        ) = (
+            YOLOAD, ADD, GREATERTHAN, YEET, YOLO, SAMEBRO, MODULOIZE,
+            INCREMENT, YELLSTR, YELLVAL, HALT, NOTGREATEROREQUAL, YOSTASH, YOGRAB,
+        )
+        nstrings = len(strings)
+
+        if trace is not None:
+            # Chosen once, here: the untraced loop indexes the plain list.
+            code = _TracedCode(code, trace)
+
+        while pc < end:
+            op, a, b, c, x = code[pc]
+            pc += 1
+            steps += 1
+            if op == moduloize:
+                r[a] = r[b] % r[c]
+            elif op == samebro:
+                if r[a] == r[b]:
+                    pc = x
+            elif op == yeet or op == yolo:
+                pc = x
+            elif op == notgreaterorequal:
+                if r[a] >= r[b]:
+                    pc = x
+            elif op == increment:
+                r[a] += 1
+            elif op == yellval:
+                buffer += b"%d\n" % r[a]
+                if len(buffer) >= limit:
+                    flush()
+            elif op == yellstr:
+                buffer += strings[x] if x < nstrings else b"UNKNOWN_STRING_%d\n" % x
+                if len(buffer) >= limit:
+                    flush()
+            elif op == yoload:
+                r[a] = x
+            elif op == add:
+                r[a] = r[b] + r[c]
+            elif op == yograb:
+                r[a] = memory[x]
+            elif op == yostash:
+                memory[x] = r[a]
+            elif op == greaterthan:
+                if r[a] > r[b]:
+                    pc = x
+            elif op == halt:
+                self.halted = True
+                break
+            else:
+                self.pc = pc - 1
+                self.steps += steps
+                raise ValueError(f"Unknown opcode {op:04b} at address {(pc - 1) * 2}")
+
+        self.pc = pc
+        self.steps += steps
+        return steps
+
+    def run_jit(self):
+        """Like run(), but hot branch targets are compiled into regions (see jit.py).
+
+        Cold code runs in the same dispatch loop as run(), except that every
+        taken branch bumps a counter on its target and, once the target is
+        hot or already compiled, hands control back here to enter its region.
+        """
+        code = self.program.table()
+        strings = self.program.strings
+        encoded = [text.encode("utf-8") for text in strings]
+        buffer = self.out.buffer
+        limit = self.out.flush_threshold
+        flush = self.out.flush
+        r = self.registers
+        memory = self.memory
+        regions = self.regions
+        leaders = jit.block_leaders(code)
+        hot = self.hot_threshold
+        heat = [0] * (len(code) + 1)
+        for entry in regions:
+            heat[entry] = hot
+        pc = self.pc
+        steps = 0
+        end = len(code)
+        (
+            yoload, add, greaterthan, yeet, yolo, samebro, moduloize,
+            increment, yellstr, yellval, halt, notgreaterorequal, yostash, yograb,
+        ) = (
+            YOLOAD, ADD, GREATERTHAN, YEET, YOLO, SAMEBRO, MODULOIZE,
+            INCREMENT, YELLSTR, YELLVAL, HALT, NOTGREATEROREQUAL, YOSTASH, YOGRAB,
+        )
+        nstrings = len(strings)
+
+        while pc < end:
+            region = regions.get(pc)
+            if region is None and heat[pc] >= hot:
+                region = jit.compile_region(code, pc, strings, leaders)
+                if region is None:
+                    heat[pc] = -(1 << 62)  # Not compilable; never try again
+                else:
+                    regions[pc] = region
+            if region is not None:
+                pc, executed, halted = region[0](r, memory, buffer, limit, flush)
+                steps += executed
+                if halted:
+                    self.halted = True
+                    break
+                continue
+
+            while pc < end:
+                op, a, b, c, x = code[pc]
+                pc += 1
+                steps += 1
+                if op == moduloize:
+                    r[a] = r[b] % r[c]
+                elif op == samebro:
+                    if r[a] == r[b]:
+                        pc = x
+                        heat[x] += 1
+                        if heat[x] >= hot:
+                            break
+                elif op == yeet or op == yolo:
+                    pc = x
+                    heat[x] += 1
+                    if heat[x] >= hot:
+                        break
+                elif op == notgreaterorequal:
+                    if r[a] >= r[b]:
+                        pc = x
+                        heat[x] += 1
+                        if heat[x] >= hot:
+                            break
+                elif op == increment:
+                    r[a] += 1
+                elif op == yellval:
+                    buffer += b"%d\n" % r[a]
+                    if len(buffer) >= limit:
+                        flush()
+                elif op == yellstr:
+                    buffer += encoded[x] if x < nstrings else b"UNKNOWN_STRING_%d\n" % x
+                    if len(buffer) >= limit:
+                        flush()
+                elif op == yoload:
+                    r[a] = x
+                elif op == add:
+                    r[a] = r[b] + r[c]
+                elif op == yograb:
+                    r[a] = memory[x]
+                elif op == yostash:
+                    memory[x] = r[a]
+                elif op == greaterthan:
+                    if r[a] > r[b]:
+                        pc = x
+                        heat[x] += 1
+                        if heat[x] >= hot:
+                            break
+                elif op == halt:
+                    self.halted = True
+                    self.pc = pc
+                    self.steps += steps
+                    return steps
+                else:
+                    self.pc = pc - 1
+                    self.steps += steps
+                    raise ValueError(f"Unknown opcode {op:04b} at address {(pc - 1) * 2}")
+
+        self.pc = pc
+        self.steps += steps
+        return steps
+
+
+def read_snapshot(blob) -> Snapshot:
+    """Decode a Machine.snapshot() blob; raises ValueError if it is not one."""
+    blob = memoryview(blob)
+    try:
+        (magic, version, flags, program_length, encoding_version, pc, steps, memory_count,
+         output_length) = SNAPSHOT_HEADER.unpack_from(blob, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a machine snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+        registers = list(SNAPSHOT_REGISTERS.unpack_from(blob, SNAPSHOT_HEADER.size))
+        offset = SNAPSHOT_HEADER.size + SNAPSHOT_REGISTERS.size
+        memory = dict(SNAPSHOT_SLOT.iter_unpack(blob[offset:offset + memory_count * SNAPSHOT_SLOT.size]))
+        offset += memory_count * SNAPSHOT_SLOT.size
+    except struct.error as e:
+        raise ValueError(f"truncated machine snapshot: {e}") from None
+    if len(blob) != offset + output_length:
+        raise ValueError(f"machine snapshot is {len(blob)} bytes, expected {offset + output_length}")
+    return Snapshot(registers, memory, pc, steps, bool(flags & FLAG_HALTED), bytes(blob[offset:]),
+                    program_length, encoding_version)
+
+
+def run(mc_file: str, out=None, strings=None, use_jit=False):
+    program = load_program(mc_file, strings)
+    if program is None:
+        return None
+    machine = Machine(program, out, use_jit)
+    machine.run()
+    return machine
+
+
+if __name__ == "__main__":
+    use_jit = "--jit" in sys.argv[1:]
+    mc_files = [arg for arg in sys.argv[1:] if arg != "--jit"] or ["addition.mc", "conditional.mc", "fizzbuzz.mc"]
+    for mc_file in mc_files:
+        print(f"Running '{mc_file}'")
+        machine = run(mc_file, use_jit=use_jit)
+        if machine:
+            print(f"Executed {machine.steps} instructions, registers: {machine.registers}")